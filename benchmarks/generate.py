@@ -0,0 +1,235 @@
+"""Synthetic supplier price lists for benchmarks.
+
+Usage:
+    python benchmarks/generate.py prices.xlsx --rows 100000 [--columns 10] [--dirty 0.05] [--seed 1]
+
+Files look like real supplier lists: mixed Russian/English headers in random
+column positions, a few hundred brands, articles with separators, filler
+columns, and a share of dirty values ('1 234,50', '12.5 руб', 'n/a', '>10',
+blanks, stray spaces). A supplier config mapping the generated columns is
+written next to the file (``prices.json``) unless --no-config is given.
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_DIR))
+
+from pricelist.conversion import column_index_letter  # noqa: E402
+
+# XLSX sheets hold 1,048,576 rows including the header
+MAX_XLSX_ROWS = 1048575
+
+# Rows generated (and written) at a time, so 5M-row CSVs need little memory
+GENERATE_CHUNK_ROWS = 250000
+
+HEADER_VARIANTS = {
+    "Brand Name": ["Бренд", "Производитель", "Brand", "Manufacturer", "Марка"],
+    "Article": ["Артикул", "Part Number", "SKU", "Номер детали", "Article"],
+    "Quantity": ["Количество", "Остаток", "Qty", "Stock", "Количество, шт"],
+    "MOQ": ["Мин. заказ", "MOQ", "Min. qty", "Минимальный заказ"],
+    "MSRP": ["РРЦ", "Розничная цена", "MSRP", "Retail price"],
+    "Price": ["Цена", "Price", "Стоимость", "Unit price"],
+    "Lead Time": ["Срок поставки", "Delivery time", "Lead time"],
+}
+# Mapped columns in the order they are added when fewer columns are requested
+MAPPED_ORDER = ["Brand Name", "Article", "Price", "Quantity", "MSRP", "MOQ", "Lead Time"]
+FILLER_HEADERS = ["Наименование", "Description", "Вес, кг", "Штрихкод", "Примечание",
+                  "Группа", "Страна", "Ед. изм.", "Склад", "Comment"]
+
+BRAND_STEMS = ["Bosch", "Mann", "Febi", "Lemforder", "Sachs", "Valeo", "Denso", "NGK", "Mahle", "Gates",
+               "Лада", "Автодеталь", "Трек", "Волга", "Урал", "Сибирь", "Кама", "Бирюса"]
+ARTICLE_PREFIXES = np.array(["", "A", "BX-", "KL ", "0", "W.", "LF/", "СТ-"])
+DESCRIPTION_WORDS = np.array(["фильтр", "масляный", "колодки", "тормозные", "ремень", "свеча", "oil",
+                              "filter", "pad", "belt", "spark", "plug", "комплект", "передний", "задний"])
+
+
+def brand_pool(rng, count=300):
+    """Distinct brand names such as 'Bosch 17' or 'Лада-Трек 3'"""
+    names = set()
+    while len(names) < count:
+        stem = rng.choice(BRAND_STEMS)
+        if rng.random() < 0.3:
+            stem = f"{stem}-{rng.choice(BRAND_STEMS)}"
+        names.add(f"{stem} {rng.integers(1, 100)}" if rng.random() < 0.7 else stem)
+    return np.array(sorted(names), dtype=object)
+
+
+def choose_headers(rng, columns):
+    """Return (headers, roles, mapping): roles holds the output column of each position (None for fillers)"""
+    mapped = MAPPED_ORDER[:min(columns, len(MAPPED_ORDER))]
+    positions = rng.permutation(columns)
+    headers = [None] * columns
+    roles = [None] * columns
+    mapping = {}
+    for output_col, position in zip(mapped, positions):
+        headers[position] = str(rng.choice(HEADER_VARIANTS[output_col]))
+        roles[position] = output_col
+        mapping[output_col] = column_index_letter(position)
+    filler = 0
+    for position in range(columns):
+        if headers[position] is None:
+            name = FILLER_HEADERS[filler % len(FILLER_HEADERS)]
+            if filler >= len(FILLER_HEADERS):
+                name = f"{name} {filler // len(FILLER_HEADERS) + 1}"
+            headers[position] = name
+            filler += 1
+    return headers, roles, mapping
+
+
+def _dirty(rng, values, share, choices):
+    """Replace a share of values with entries drawn from choices (values becomes object dtype)"""
+    if share <= 0:
+        return values
+    mask = rng.random(len(values)) < share
+    if not mask.any():
+        return values
+    values = values.astype(object)
+    values[mask] = rng.choice(np.array(choices, dtype=object), mask.sum())
+    return values
+
+
+def _format_dirty_amounts(rng, amounts):
+    """Amounts written the way suppliers do: '1 234,50', '12.5 руб', '99,9'"""
+    style = rng.integers(0, 3, len(amounts))
+    text = np.empty(len(amounts), dtype=object)
+    for i, (amount, kind) in enumerate(zip(amounts, style)):
+        if kind == 0:
+            text[i] = f"{amount:,.2f}".replace(",", " ").replace(".", ",")
+        elif kind == 1:
+            text[i] = f"{amount} руб"
+        else:
+            text[i] = f"{amount}".replace(".", ",")
+    return text
+
+
+def generate_chunk(rng, output_cols, rows, brands, dirty):
+    """Generate the values of the mapped and filler columns for one chunk of rows"""
+    columns = {}
+    price = np.round(rng.lognormal(6, 1.5, rows), 2)
+    for output_col in output_cols:
+        if output_col == "Brand Name":
+            values = brands[rng.zipf(1.3, rows) % len(brands)]
+            # Stray spaces around and inside brand names
+            spaced = rng.random(rows) < dirty
+            values[spaced] = [f"  {v.replace(' ', '  ')} " for v in values[spaced]]
+            values = _dirty(rng, values, dirty, ["", " ", None])
+        elif output_col == "Article":
+            prefixes = ARTICLE_PREFIXES[rng.integers(0, len(ARTICLE_PREFIXES), rows)]
+            numbers = rng.integers(0, 10 ** 7, rows).astype(str)
+            values = np.char.add(prefixes.astype(str), numbers).astype(object)
+            # Some suppliers use plain numeric articles
+            numeric = rng.random(rows) < 0.2
+            values[numeric] = rng.integers(10 ** 5, 10 ** 9, numeric.sum())
+        elif output_col == "Quantity":
+            values = _dirty(rng, rng.integers(0, 500, rows), dirty, [">10", "10+", "", "n/a", "-", "много"])
+        elif output_col == "MOQ":
+            values = _dirty(rng, rng.choice([1, 1, 1, 2, 5, 10, 50, 100], rows), dirty, ["", "1 шт"])
+        elif output_col in ("Price", "MSRP"):
+            amounts = price if output_col == "Price" else np.round(price * rng.uniform(1.1, 1.6, rows), 2)
+            values = amounts.astype(object)
+            mask = rng.random(rows) < dirty
+            values[mask] = _format_dirty_amounts(rng, amounts[mask])
+            values = _dirty(rng, values, dirty / 4, ["", "n/a", "по запросу", -1])
+        else:  # Lead Time
+            values = _dirty(rng, rng.integers(1, 60, rows), dirty, ["3-5", "под заказ", ""])
+        columns[output_col] = values
+    return columns
+
+
+def filler_values(rng, header, rows):
+    if header.startswith(("Наименование", "Description", "Примечание", "Comment")):
+        words = DESCRIPTION_WORDS[rng.integers(0, len(DESCRIPTION_WORDS), (rows, 3))]
+        return np.array([" ".join(row) for row in words], dtype=object)
+    if header.startswith("Вес"):
+        return np.round(rng.uniform(0.01, 25, rows), 3)
+    if header.startswith("Штрихкод"):
+        return rng.integers(4 * 10 ** 12, 5 * 10 ** 12, rows)
+    return rng.choice(np.array(["A", "B", "C", "RU", "CN", "DE", "шт", "компл"], dtype=object), rows)
+
+
+def iter_chunks(rows, columns=10, dirty=0.05, seed=1):
+    """Yield (headers, mapping, DataFrame chunk) for a synthetic price list"""
+    rng = np.random.default_rng(seed)
+    headers, roles, mapping = choose_headers(rng, columns)
+    brands = brand_pool(rng)
+    for start in range(0, rows, GENERATE_CHUNK_ROWS):
+        count = min(GENERATE_CHUNK_ROWS, rows - start)
+        mapped = generate_chunk(rng, list(mapping), count, brands, dirty)
+        data = {position: mapped[role] if role else filler_values(rng, header, count)
+                for position, (header, role) in enumerate(zip(headers, roles))}
+        chunk = pd.DataFrame(data)
+        chunk.columns = headers
+        yield headers, mapping, chunk
+
+
+def generate_price_list(path, rows, columns=10, dirty=0.05, seed=1, write_config=True):
+    """Write a synthetic price list to path (.xlsx or .csv) and return its column mapping"""
+    path = Path(path)
+    suffix = path.suffix.lower()
+    if suffix not in ('.xlsx', '.csv'):
+        raise ValueError("Output must be a .xlsx or .csv file")
+    if suffix == '.xlsx' and rows > MAX_XLSX_ROWS:
+        raise ValueError(f"XLSX files hold at most {MAX_XLSX_ROWS:,} data rows")
+    if columns < 2:
+        raise ValueError("At least 2 columns are needed")
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    mapping = {}
+    if suffix == '.csv':
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            for i, (headers, mapping, chunk) in enumerate(iter_chunks(rows, columns, dirty, seed)):
+                chunk.to_csv(f, index=False, header=i == 0)
+    else:
+        from openpyxl import Workbook
+
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet("Прайс")
+        for i, (headers, mapping, chunk) in enumerate(iter_chunks(rows, columns, dirty, seed)):
+            if i == 0:
+                sheet.append(headers)
+            for row in chunk.itertuples(index=False, name=None):
+                sheet.append([None if value is None or value == "" else _excel_value(value) for value in row])
+        workbook.save(path)
+
+    if not mapping:
+        # No rows: the header and mapping still come from the same generator
+        headers, roles, mapping = choose_headers(np.random.default_rng(seed), columns)
+    if write_config:
+        with open(path.with_suffix('.json'), 'w', encoding='utf-8') as f:
+            json.dump(mapping, f, indent=2, ensure_ascii=False)
+    return mapping
+
+
+def _excel_value(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a synthetic supplier price list")
+    parser.add_argument("output", help="File to write (.xlsx or .csv)")
+    parser.add_argument("--rows", type=int, default=100000, help="Data rows to generate")
+    parser.add_argument("--columns", type=int, default=10, help="Total columns (7 of them are mapped)")
+    parser.add_argument("--dirty", type=float, default=0.05, help="Share of dirty values in each mapped column")
+    parser.add_argument("--seed", type=int, default=1, help="Random seed (same seed, same file)")
+    parser.add_argument("--no-config", action="store_true", help="Do not write the matching supplier config")
+    args = parser.parse_args(argv)
+    try:
+        mapping = generate_price_list(args.output, args.rows, args.columns, args.dirty, args.seed,
+                                      write_config=not args.no_config)
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+    print(json.dumps(mapping, ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,244 @@
+"""Benchmark the conversion stages on synthetic price lists.
+
+Usage:
+    python benchmarks/run.py [--rows 10000 100000 1000000] [--formats csv xlsx]
+                             [--columns 10] [--dirty 0.05] [--output results.json]
+                             [--reader auto|calamine|openpyxl]
+                             [--baseline previous.json] [--tolerance 0.25]
+
+For every combination of rows, format and column count a price list is
+generated (and kept in --workdir for later runs), then converted stage by
+stage in a fresh process: read (read_input_file), detect (detect_columns),
+process (process_dataframe) and write (generate_output). Each stage records
+wall time, CPU time, rows in and out, and memory: by default the peak
+resident set size sampled while the stage runs (``peak_rss_mb``, and
+``rss_growth_mb`` over its start), or with --memory trace the peak of
+tracemalloc (exact per allocation, but it slows pandas and openpyxl down
+several times, so timings are not comparable). The process stage also
+reports the memory held by the processed frame in its compact dtypes
+(``frame_mb``) and as the all-text frame it would be if every value were a
+Python string (``text_frame_mb``, how processed frames used to be held).
+XLSX cases above 1,048,575 rows are skipped.
+
+Results are written as JSON. With --baseline, stages that got slower than
+the baseline by more than --tolerance are listed and the exit code is 1.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from pathlib import Path
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_DIR))
+
+from benchmarks.generate import MAX_XLSX_ROWS, generate_price_list  # noqa: E402
+from pricelist.backends import AUTO_BACKEND, READER_BACKENDS, available_backends  # noqa: E402
+from pricelist.metrics import RssSampler  # noqa: E402
+
+DEFAULT_ROWS = [10000, 100000, 1000000]
+MEMORY_MODES = ["rss", "trace", "none"]
+
+
+class StageTimer:
+    """Measure wall time, CPU time and peak memory of named stages"""
+
+    def __init__(self, memory="rss"):
+        self.memory = memory
+        self.stages = {}
+
+    def run(self, name, func, rows_in=None):
+        if self.memory == "trace":
+            tracemalloc.start()
+            tracemalloc.reset_peak()
+        sampler = RssSampler() if self.memory == "rss" else None
+        wall_started = time.perf_counter()
+        cpu_started = time.process_time()
+        if sampler:
+            with sampler:
+                result = func()
+        else:
+            result = func()
+        stage = {
+            "seconds": round(time.perf_counter() - wall_started, 4),
+            "cpu_seconds": round(time.process_time() - cpu_started, 4),
+        }
+        if self.memory == "trace":
+            stage["traced_peak_mb"] = round(tracemalloc.get_traced_memory()[1] / (1024 * 1024), 1)
+            tracemalloc.stop()
+        elif sampler and sampler.start_rss is not None:
+            stage["peak_rss_mb"] = round(sampler.peak_rss / (1024 * 1024), 1)
+            stage["rss_growth_mb"] = round((sampler.peak_rss - sampler.start_rss) / (1024 * 1024), 1)
+        if rows_in is not None:
+            stage["rows_in"] = rows_in
+        if hasattr(result, "shape"):
+            stage["rows_out"] = result.shape[0]
+        self.stages[name] = stage
+        return result
+
+
+def frame_mb(df):
+    return round(df.memory_usage(deep=True).sum() / (1024 * 1024), 1)
+
+
+def input_path(workdir, fmt, rows, columns, dirty, seed):
+    return Path(workdir) / "inputs" / f"prices_{rows}_{columns}c_{dirty:g}d_{seed}s.{fmt}"
+
+
+def run_case(case, workdir, memory="rss", write_workers=1, reader_backend="auto"):
+    """Convert one generated file stage by stage and return its measurements (runs in a worker)"""
+    from pricelist.conversion import (
+        NUMERIC_COLUMNS,
+        ConversionEngine,
+        ConversionSettings,
+        detect_columns,
+        read_input_file,
+    )
+    from pricelist.output import output_text
+
+    path = Path(case["input"])
+    with open(path.with_suffix('.json'), 'r', encoding='utf-8') as f:
+        config = json.load(f)
+    output_dir = Path(workdir) / "outputs" / path.stem / case["format"]
+    shutil.rmtree(output_dir, ignore_errors=True)
+    output_dir.mkdir(parents=True)
+
+    settings = ConversionSettings(input_file=str(path), output_directory=str(output_dir), lead_time="7",
+                                  currency_rate="3,67", markup_percentage="15", write_workers=write_workers,
+                                  reader_backend=reader_backend)
+    engine = ConversionEngine(settings)
+    timer = StageTimer(memory)
+    started = time.perf_counter()
+    df = timer.run("read", lambda: read_input_file(str(path), backend=reader_backend))
+    timer.run("detect", lambda: detect_columns(df), rows_in=len(df))
+    processed = timer.run("process", lambda: engine.process_dataframe(df, config), rows_in=len(df))
+    del df
+    timer.stages["process"]["frame_mb"] = frame_mb(processed)
+    timer.stages["process"]["text_frame_mb"] = frame_mb(output_text(processed, NUMERIC_COLUMNS).astype(object))
+    created_files = timer.run("write", lambda: engine.generate_output(processed, str(path)), rows_in=len(processed))
+
+    result = dict(case)
+    result.update({
+        "stages": timer.stages,
+        "total_seconds": round(time.perf_counter() - started, 4),
+        "output_files": len(created_files),
+        "output_bytes": sum(os.path.getsize(f) for f in created_files),
+    })
+    try:
+        import resource
+
+        # Linux reports kilobytes
+        result["max_rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    except ImportError:
+        pass
+    return result
+
+
+def environment():
+    import numpy
+    import openpyxl
+    import pandas
+
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "pandas": pandas.__version__,
+        "numpy": numpy.__version__,
+        "openpyxl": openpyxl.__version__,
+        "reader_backends": available_backends(),
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Return the stages slower than in baseline by more than tolerance"""
+    def key(case):
+        return case["format"], case["rows"], case["columns"], case["dirty"]
+
+    previous = {key(case): case for case in baseline.get("cases", [])}
+    regressions = []
+    for case in results["cases"]:
+        old = previous.get(key(case))
+        if old is None:
+            continue
+        for stage, measured in case["stages"].items():
+            old_seconds = old["stages"].get(stage, {}).get("seconds")
+            if old_seconds and measured["seconds"] > old_seconds * (1 + tolerance):
+                regressions.append({
+                    "format": case["format"], "rows": case["rows"], "columns": case["columns"], "stage": stage,
+                    "seconds": measured["seconds"], "baseline_seconds": old_seconds,
+                    "ratio": round(measured["seconds"] / old_seconds, 2),
+                })
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the converter on synthetic price lists")
+    parser.add_argument("--rows", type=int, nargs="+", default=DEFAULT_ROWS, help="Data rows per generated file")
+    parser.add_argument("--formats", nargs="+", choices=["csv", "xlsx"], default=["csv", "xlsx"])
+    parser.add_argument("--columns", type=int, nargs="+", default=[10], help="Total columns per file")
+    parser.add_argument("--dirty", type=float, default=0.05, help="Share of dirty values in mapped columns")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--workdir", default="benchmark_data", help="Where generated inputs and outputs are kept")
+    parser.add_argument("--output", default=None, help="Write the JSON results here (default: print them)")
+    parser.add_argument("--write-workers", type=int, default=1, help="Processes encoding the output")
+    parser.add_argument("--memory", choices=MEMORY_MODES, default="rss",
+                        help="How to measure memory: sampled RSS (default), tracemalloc (slow) or not at all")
+    parser.add_argument("--reader", choices=[AUTO_BACKEND] + READER_BACKENDS, default=AUTO_BACKEND,
+                        help="XLSX reader backend used by the read stage")
+    parser.add_argument("--baseline", default=None, help="Earlier results to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown vs the baseline (0.25 = 25%%)")
+    args = parser.parse_args(argv)
+
+    cases = []
+    for fmt in args.formats:
+        for rows in args.rows:
+            if fmt == "xlsx" and rows > MAX_XLSX_ROWS:
+                print(f"Skipping xlsx with {rows:,} rows (more than a sheet holds)", file=sys.stderr)
+                continue
+            for columns in args.columns:
+                path = input_path(args.workdir, fmt, rows, columns, args.dirty, args.seed)
+                case = {"format": fmt, "rows": rows, "columns": columns, "dirty": args.dirty, "input": str(path)}
+                if not path.exists() or not path.with_suffix('.json').exists():
+                    print(f"Generating {path.name}...", file=sys.stderr)
+                    started = time.perf_counter()
+                    generate_price_list(path, rows, columns, args.dirty, args.seed)
+                    case["generate_seconds"] = round(time.perf_counter() - started, 2)
+                case["input_bytes"] = path.stat().st_size
+                cases.append(case)
+
+    results = {"created": time.strftime("%Y-%m-%dT%H:%M:%S"), "environment": environment(), "cases": []}
+    for case in cases:
+        print(f"Running {case['format']} {case['rows']:,} rows x {case['columns']} columns...", file=sys.stderr)
+        # A fresh process per case keeps memory peaks and caches from leaking between cases
+        with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as executor:
+            result = executor.submit(run_case, case, args.workdir, args.memory, args.write_workers,
+                                     args.reader).result()
+        results["cases"].append(result)
+
+    exit_code = 0
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            results["regressions"] = compare(results, json.load(f), args.tolerance)
+        for regression in results["regressions"]:
+            print(f"Slower: {regression['format']} {regression['rows']:,} rows {regression['stage']}: "
+                  f"{regression['seconds']}s vs {regression['baseline_seconds']}s", file=sys.stderr)
+        exit_code = 1 if results["regressions"] else 0
+
+    text = json.dumps(results, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+    else:
+        print(text)
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
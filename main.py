@@ -1,15 +1,27 @@
+import time
+STARTED = time.perf_counter()  # for --startup-time
+
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
-import pandas as pd
 import json
+import multiprocessing
 import os
+import sys
 from pathlib import Path
+import argparse
+import queue
 import threading
-import re
-from difflib import SequenceMatcher
+# pandas and the conversion modules are imported on first use (and warmed up in
+# the background once the window is shown), so the window appears right away
+from pricelist.logpump import DEFAULT_MAX_LINES, DRAIN_INTERVAL_MS, LogPump
+from pricelist.progress import ConversionCancelled, ProgressTracker
+from pricelist.registry import ConfigRegistry
+
+# Search waits this long after the last keystroke
+SEARCH_DEBOUNCE_MS = 150
 
 class PriceListConverter:
-    def __init__(self, root):
+    def __init__(self, root, log_file=None, log_lines=DEFAULT_MAX_LINES):
         self.root = root
         self.root.title("Price List Converter")
         self.root.geometry("800x750")
@@ -20,13 +32,41 @@ class PriceListConverter:
         self.lead_time = tk.StringVar(value="0")
         self.supplier_config = tk.StringVar()
         self.config_files = []
+        self.config_registry = ConfigRegistry(log=self.log_message)
+        self.search_after_id = None
+        self.suggest_after_id = None
         self.bypass_template = tk.BooleanVar(value=False)
         self.auto_detect_columns = tk.BooleanVar(value=True)
+        self.canonical_articles = tk.BooleanVar(value=False)
+        self.streaming_mode = tk.BooleanVar(value=False)
+        self.pipeline_mode = tk.BooleanVar(value=False)
+        self.all_sheets = tk.BooleanVar(value=False)
+        self.sheet_outputs = tk.BooleanVar(value=False)
+        self.write_metrics = tk.BooleanVar(value=False)
+        self.output_format = tk.StringVar(value="csv")
+        self.write_delta = tk.BooleanVar(value=False)
+        self.interruptible_read = tk.BooleanVar(value=False)
+        self.use_cache = tk.BooleanVar(value=True)
+        self.write_workers = tk.StringVar(value=str(min(4, os.cpu_count() or 1)))
         self.detected_columns = {}
-        self.input_dataframe = None
+        self.detected_matches = {}
+        self.input_sample = None
+        
+        # Log lines from any thread are queued and shown in batches
+        self.log_pump = LogPump(log_file, log_lines)
+        
+        # Background jobs report to the UI thread through this queue as (kind, job id, payload)
+        self.job_queue = queue.Queue()
+        self.analysis_job = 0
+        self.analysis_running = False
+        self.analysis_cancel = threading.Event()
+        self.conversion_job = 0
+        self.conversion_running = False
+        self.conversion_cancel = threading.Event()
         
         # New variables for currency and markup
         self.currency_rate = tk.StringVar()
+        self.currency_rates = tk.StringVar()
         self.markup_percentage = tk.StringVar()
         
         # Validation functions
@@ -36,6 +76,26 @@ class PriceListConverter:
         # Load config files before setting up UI so dropdown is populated
         self.load_config_files()
         self.setup_ui()
+        self.poll_jobs()
+        self.pump_log()
+        self.root.after_idle(self.start_background_loading)
+    
+    def start_background_loading(self):
+        """Import the conversion modules and read config metadata without holding up the window"""
+        thread = threading.Thread(target=self.load_in_background, args=(list(self.config_files),))
+        thread.daemon = True
+        thread.start()
+    
+    def load_in_background(self, config_names):
+        import pricelist.conversion  # noqa: F401 - loads pandas before the first analysis needs it
+        for config_name in config_names:
+            self.config_registry.metadata(config_name)
+    
+    def load_output_formats(self):
+        """Fill the output format choices just before the list opens"""
+        from pricelist.output import OUTPUT_FORMATS
+        
+        self.output_format_box['values'] = OUTPUT_FORMATS
     
     def validate_numeric_input(self, value):
         """Validate numeric input (allows digits, comma, dot)"""
@@ -57,64 +117,6 @@ class PriceListConverter:
         except ValueError:
             return False
         
-    def detect_columns(self, df):
-        """Automatically detect which columns match the required output columns"""
-        detected = {}
-        
-        # Define patterns for each column type (more comprehensive)
-        patterns = {
-            "Lead Time": [
-                r"lead\s*time", r"delivery\s*time", r"delivery", r"lead", r"time",
-                r"срок\s*поставки", r"время\s*доставки", r"поставка"
-            ],
-            "Brand Name": [
-                r"brand", r"manufacturer", r"maker", r"producer", r"company", r"mfg",
-                r"бренд", r"производитель", r"марка", r"фирма"
-            ],
-            "Article": [
-                r"article", r"part\s*number", r"part\s*no", r"sku", r"code", r"item\s*number",
-                r"product\s*code", r"model", r"артикул", r"номер\s*детали", r"код", r"товар"
-            ],
-            "Quantity": [
-                r"quantity", r"stock", r"qty", r"amount", r"count", r"available",
-                r"avl\s*qty", r"in\s*stock", r"количество", r"запас", r"остаток", r"шт"
-            ],
-            "MOQ": [
-                r"moq", r"minimum\s*order", r"min\s*order", r"min\s*qty", r"min\s*quantity",
-                r"мин\s*заказ", r"минимальный\s*заказ", r"мин\s*количество"
-            ],
-            "MSRP": [
-                r"msrp", r"list\s*price", r"retail\s*price", r"rrp", r"price\s*list",
-                r"suggested\s*price", r"recommended\s*price", r"total\s*price",
-                r"розничная\s*цена", r"список\s*цен", r"рекомендуемая\s*цена"
-            ],
-            "Price": [
-                r"price", r"cost", r"sale\s*price", r"selling\s*price", r"unit\s*price",
-                r"unit\s*cost", r"wholesale\s*price", r"цена", r"стоимость", r"продажная\s*цена"
-            ]
-        }
-        
-        # Get column names (convert to lowercase for matching)
-        columns = [col.lower().strip() for col in df.columns]
-        
-        for output_col, pattern_list in patterns.items():
-            best_match = None
-            best_score = 0
-            
-            for i, col in enumerate(columns):
-                for pattern in pattern_list:
-                    if re.search(pattern, col, re.IGNORECASE):
-                        # Calculate similarity score
-                        similarity = SequenceMatcher(None, col, pattern).ratio()
-                        if similarity > best_score:
-                            best_score = similarity
-                            best_match = df.columns[i]  # Use original column name
-            
-            if best_match and best_score > 0.2:  # Lower threshold for better detection
-                detected[output_col] = best_match
-                
-        return detected
-    
     def setup_ui(self):
         # Main frame
         main_frame = ttk.Frame(self.root, padding="10")
@@ -158,6 +160,10 @@ class PriceListConverter:
                                   validate='key', validatecommand=(self.validate_numeric, '%P'))
         currency_entry.pack(side=tk.LEFT)
         ttk.Label(currency_frame, text="(e.g., 1.0543 or 1,0543)").pack(side=tk.LEFT, padx=(10, 0))
+        # Rates file for configs that map a Currency column (rows in several currencies)
+        ttk.Label(currency_frame, text="Rates file:").pack(side=tk.LEFT, padx=(20, 0))
+        ttk.Entry(currency_frame, textvariable=self.currency_rates, width=25).pack(side=tk.LEFT, padx=(5, 0))
+        ttk.Button(currency_frame, text="Browse", command=self.browse_currency_rates).pack(side=tk.LEFT, padx=(5, 0))
         
         # Markup Percentage input
         ttk.Label(main_frame, text="Markup %:").grid(row=4, column=0, sticky=tk.W, pady=5)
@@ -184,6 +190,53 @@ class PriceListConverter:
                        variable=self.bypass_template,
                        command=self.toggle_bypass_template).grid(row=1, column=0, sticky=tk.W, pady=2)
         
+        # Streaming option for very large XLSX/CSV files
+        ttk.Checkbutton(options_frame, text="Stream large files (low memory)", 
+                       variable=self.streaming_mode).grid(row=2, column=0, sticky=tk.W, pady=2)
+        ttk.Checkbutton(options_frame, text="Overlap reading and writing", 
+                       variable=self.pipeline_mode).grid(row=2, column=1, sticky=tk.W, pady=2)
+        
+        # Multi-sheet workbooks: convert every sheet, combined or one output per sheet
+        ttk.Checkbutton(options_frame, text="Convert all sheets", 
+                       variable=self.all_sheets).grid(row=3, column=0, sticky=tk.W, pady=2)
+        ttk.Checkbutton(options_frame, text="One output file per sheet", 
+                       variable=self.sheet_outputs).grid(row=3, column=1, sticky=tk.W, pady=2)
+        
+        # Per-stage timing report next to the output files
+        ttk.Checkbutton(options_frame, text="Write metrics report", 
+                       variable=self.write_metrics).grid(row=4, column=0, sticky=tk.W, pady=2)
+        
+        # Plain, compressed or Parquet output; the choices are loaded with the conversion modules
+        format_frame = ttk.Frame(options_frame)
+        format_frame.grid(row=4, column=1, sticky=tk.W, pady=2)
+        ttk.Label(format_frame, text="Output format:").pack(side=tk.LEFT)
+        self.output_format_box = ttk.Combobox(format_frame, textvariable=self.output_format, values=["csv"],
+                                              width=10, state="readonly", postcommand=self.load_output_formats)
+        self.output_format_box.pack(side=tk.LEFT, padx=(5, 0))
+        
+        # Added/changed/removed rows against the output this conversion replaces
+        ttk.Checkbutton(options_frame, text="Write changes since previous output", 
+                       variable=self.write_delta).grid(row=5, column=0, sticky=tk.W, pady=2)
+        
+        # Article numbers as one key: "0 986-452.041" → "0986452041"
+        ttk.Checkbutton(options_frame, text="Canonical article numbers", 
+                       variable=self.canonical_articles).grid(row=5, column=1, sticky=tk.W, pady=2)
+        
+        # A whole-file read in a separate process, so Cancel does not wait for it to finish
+        ttk.Checkbutton(options_frame, text="Cancel reads at once (uses more memory)", 
+                       variable=self.interruptible_read).grid(row=6, column=0, sticky=tk.W, pady=2)
+        
+        # Processes encoding the rows of large outputs
+        workers_frame = ttk.Frame(options_frame)
+        workers_frame.grid(row=6, column=1, sticky=tk.W, pady=2)
+        ttk.Label(workers_frame, text="Write workers:").pack(side=tk.LEFT)
+        ttk.Spinbox(workers_frame, textvariable=self.write_workers, from_=1, to=os.cpu_count() or 1, width=5,
+                    validate='key', validatecommand=(self.validate_lead_time, '%P')).pack(side=tk.LEFT, padx=(5, 0))
+        
+        # Parsed columns kept in the cache folder for the next conversion of the same file
+        ttk.Checkbutton(options_frame, text="Cache parsed inputs", 
+                       variable=self.use_cache).grid(row=7, column=0, sticky=tk.W, pady=2)
+        
         # Supplier configuration selection with search
         config_frame = ttk.Frame(main_frame)
         config_frame.grid(row=6, column=0, columnspan=3, sticky=(tk.W, tk.E), pady=5)
@@ -217,7 +270,7 @@ class PriceListConverter:
         
         # Set up autocomplete and trace after config_combo is created
         self.setup_autocomplete()
-        self.config_search_var.trace_add('write', self.filter_configs)
+        self.config_search_var.trace_add('write', self.schedule_filter)
         
         # Config info label
         self.config_info_label = ttk.Label(config_frame, text="", font=('TkDefaultFont', 8))
@@ -227,12 +280,15 @@ class PriceListConverter:
         button_frame = ttk.Frame(main_frame)
         button_frame.grid(row=7, column=0, columnspan=3, pady=20)
         
-        ttk.Button(button_frame, text="Convert", command=self.start_conversion, style="Accent.TButton").pack(side=tk.LEFT, padx=5)
+        self.convert_button = ttk.Button(button_frame, text="Convert", command=self.start_conversion, style="Accent.TButton")
+        self.convert_button.pack(side=tk.LEFT, padx=5)
+        self.cancel_button = ttk.Button(button_frame, text="Cancel", command=self.cancel_jobs, state=tk.DISABLED)
+        self.cancel_button.pack(side=tk.LEFT, padx=5)
         ttk.Button(button_frame, text="Create New Config", command=self.create_config_window).pack(side=tk.LEFT, padx=5)
         ttk.Button(button_frame, text="Edit Config", command=self.edit_config_window).pack(side=tk.LEFT, padx=5)
         
         # Progress bar
-        self.progress = ttk.Progressbar(main_frame, mode='indeterminate')
+        self.progress = ttk.Progressbar(main_frame, mode='determinate', maximum=100)
         self.progress.grid(row=8, column=0, columnspan=3, sticky=(tk.W, tk.E), pady=10)
         
         # Status label
@@ -268,31 +324,57 @@ class PriceListConverter:
                 self.analyze_input_file()
     
     def analyze_input_file(self):
-        """Analyze the input file and detect columns"""
+        """Analyze the input file and detect columns in the background"""
+        if not self.input_file_path.get():
+            return
+        
+        # A newer analysis supersedes any that is still running
+        self.analysis_cancel.set()
+        self.analysis_cancel = threading.Event()
+        self.analysis_job += 1
+        self.analysis_running = True
+        self.update_cancel_button()
+        # Never convert with columns detected in a previously selected file
+        self.input_sample = None
+        self.detected_columns = {}
+        self.detected_matches = {}
+        
+        thread = threading.Thread(target=self.analyze_worker,
+                                  args=(self.analysis_job, self.analysis_cancel, self.input_file_path.get()))
+        thread.daemon = True
+        thread.start()
+    
+    def analyze_worker(self, job, cancel_event, input_path):
         try:
-            if not self.input_file_path.get():
+            from pricelist.conversion import ANALYSIS_SAMPLE_ROWS, count_input_rows, read_input_sample
+            from pricelist.detection import detect_column_matches
+            
+            # Only the header and a sample of rows are needed to detect columns
+            df = read_input_sample(input_path, ANALYSIS_SAMPLE_ROWS)
+            if cancel_event.is_set():
                 return
-                
-            input_path = Path(self.input_file_path.get())
-            if input_path.suffix.lower() == '.xlsx':
-                df = pd.read_excel(input_path)
-            else:
-                df = pd.read_csv(input_path)
-                
-            self.input_dataframe = df
-            self.detected_columns = self.detect_columns(df)
-            
-            # Log detected columns
-            self.log_message(f"Analyzed input file: {len(df)} rows, {len(df.columns)} columns")
-            if self.detected_columns:
-                self.log_message("Auto-detected columns:")
-                for output_col, input_col in self.detected_columns.items():
-                    self.log_message(f"  {output_col} → {input_col}")
-            else:
-                self.log_message("No columns could be auto-detected")
-                
+            self.job_queue.put(("analysis", job, (df, detect_column_matches(df))))
+            
+            # Counting rows can take a while on big files
+            num_rows, exact = count_input_rows(input_path)
+            if not cancel_event.is_set():
+                self.job_queue.put(("rows", job, (num_rows, exact)))
         except Exception as e:
-            self.log_message(f"Error analyzing input file: {str(e)}")
+            self.job_queue.put(("analysis_error", job, str(e)))
+    
+    def show_analysis(self, df, matches):
+        self.input_sample = df
+        self.detected_matches = matches
+        self.detected_columns = {output_col: match.column for output_col, match in matches.items()}
+        
+        # Log detected columns
+        self.log_message(f"Analyzed input file: {len(df.columns)} columns (first {len(df)} rows sampled)")
+        if self.detected_columns:
+            self.log_message("Auto-detected columns:")
+            for output_col, match in self.detected_matches.items():
+                self.log_message(f"  {output_col} → {match.column} ({match.confidence:.0%} confidence)")
+        else:
+            self.log_message("No columns could be auto-detected")
     
     def browse_input_file(self):
         filename = filedialog.askopenfilename(
@@ -304,32 +386,29 @@ class PriceListConverter:
             if self.auto_detect_columns.get():
                 self.analyze_input_file()
             
+    def browse_currency_rates(self):
+        filename = filedialog.askopenfilename(
+            title="Select Currency Rates File",
+            filetypes=[("Rates files", "*.csv *.json"), ("All files", "*.*")]
+        )
+        if filename:
+            self.currency_rates.set(filename)
+            
     def browse_output_directory(self):
         directory = filedialog.askdirectory(title="Select Output Directory")
         if directory:
             self.output_directory.set(directory)
             
-    def load_config_files(self):
-        config_dir = Path("configs")
-        if config_dir.exists():
-            self.config_files = [f.stem for f in config_dir.glob("*.json")]
-            self.config_metadata = {}
-            for config_file in config_dir.glob("*.json"):
-                try:
-                    with open(config_file, 'r', encoding='utf-8') as f:
-                        config_data = json.load(f)
-                    # Get file creation time
-                    creation_time = config_file.stat().st_ctime
-                    creation_date = pd.Timestamp.fromtimestamp(creation_time).strftime("%Y-%m-%d %H:%M")
-                    self.config_metadata[config_file.stem] = {
-                        'creation_date': creation_date,
-                        'file_path': config_file
-                    }
-                except Exception as e:
-                    self.log_message(f"Error loading metadata for {config_file.stem}: {str(e)}")
-        else:
-            self.config_files = []
-            self.config_metadata = {}
+    def load_config_files(self, force=False):
+        # Incremental: the directory is only rescanned when it has changed
+        self.config_registry.refresh(force)
+        self.config_files = self.config_registry.names
+    
+    def refresh_configs(self):
+        """Show configs added or removed by someone else since the last look"""
+        if self.config_registry.refresh():
+            self.config_files = self.config_registry.names
+            self.filter_configs()
     
     def filter_configs(self, *args):
         """Filter configs based on search term"""
@@ -340,7 +419,7 @@ class PriceListConverter:
             filtered_configs = self.config_files
         else:
             # Filter configs that contain the search term
-            filtered_configs = [config for config in self.config_files if search_term in config.lower()]
+            filtered_configs = self.config_registry.search(search_term)
         
         # Update main dropdown with filtered results
         self.config_combo['values'] = filtered_configs
@@ -354,8 +433,19 @@ class PriceListConverter:
         else:
             self.config_info_label.config(text="No configs found")
     
+    def schedule_filter(self, *args):
+        """Filter once typing pauses instead of on every keystroke"""
+        if self.search_after_id is not None:
+            self.root.after_cancel(self.search_after_id)
+        self.search_after_id = self.root.after(SEARCH_DEBOUNCE_MS, self.run_filter)
+    
+    def run_filter(self):
+        self.search_after_id = None
+        self.filter_configs()
+    
     def clear_search_placeholder(self, event):
         """Clear search placeholder when focused"""
+        self.refresh_configs()
         if self.config_search_var.get() == "Search configs...":
             self.config_search_var.set("")
     
@@ -380,11 +470,17 @@ class PriceListConverter:
         if event.keysym in ['BackSpace', 'Delete', 'Left', 'Right', 'Up', 'Down', 'Tab']:
             return
         
+        if self.suggest_after_id is not None:
+            self.root.after_cancel(self.suggest_after_id)
+        self.suggest_after_id = self.root.after(SEARCH_DEBOUNCE_MS, self.show_suggestions)
+    
+    def show_suggestions(self):
+        """Offer the configs starting with the search text"""
+        self.suggest_after_id = None
         current_text = self.config_search_var.get()
         if current_text and current_text != "Search configs...":
             # Filter configs that start with current text
-            matching_configs = [config for config in self.config_files 
-                              if config.lower().startswith(current_text.lower())]
+            matching_configs = self.config_registry.prefix(current_text)
             self.search_combo['values'] = matching_configs
             
             # Show dropdown if there are matches
@@ -396,14 +492,13 @@ class PriceListConverter:
         current_text = self.config_search_var.get()
         if current_text and current_text != "Search configs...":
             # Show all configs that contain the current text
-            matching_configs = [config for config in self.config_files 
-                              if current_text.lower() in config.lower()]
+            matching_configs = self.config_registry.search(current_text)
             self.search_combo['values'] = matching_configs
     
     def on_search_selected(self, event):
         """Handle selection from search dropdown"""
         selected_config = self.config_search_var.get()
-        if selected_config and selected_config in self.config_files:
+        if selected_config and selected_config in self.config_registry:
             # Update the main config dropdown
             self.supplier_config.set(selected_config)
             self.update_config_info()
@@ -414,9 +509,9 @@ class PriceListConverter:
     def update_config_info(self):
         """Update config info label with creation date"""
         selected_config = self.supplier_config.get()
-        if selected_config and selected_config in self.config_metadata:
-            creation_date = self.config_metadata[selected_config]['creation_date']
-            self.config_info_label.config(text=f"Created: {creation_date}")
+        metadata = self.config_registry.metadata(selected_config) if selected_config in self.config_registry else None
+        if metadata:
+            self.config_info_label.config(text=f"Created: {metadata['creation_date']}")
         else:
             self.config_info_label.config(text="")
             
@@ -473,9 +568,18 @@ class PriceListConverter:
             ttk.Label(row_frame, text=f"{col} (Output Col {column_letter}):", width=25).pack(side=tk.LEFT)
             entry = ttk.Entry(row_frame, width=10)
             entry.pack(side=tk.LEFT, padx=(5, 0))
-            ttk.Label(row_frame, text="Enter input column letter (A, B, C, etc.)", font=("TkDefaultFont", 8)).pack(side=tk.LEFT, padx=(5, 0))
+            ttk.Label(row_frame, text="Enter input column letter (A, B, ..., AA, AB, etc.)", font=("TkDefaultFont", 8)).pack(side=tk.LEFT, padx=(5, 0))
             self.mapping_entries[col] = entry
             
+        # Optional column with each row's currency, converted with the rates file
+        row_frame = ttk.Frame(mapping_frame)
+        row_frame.pack(fill=tk.X, pady=2)
+        ttk.Label(row_frame, text="Currency (optional):", width=25).pack(side=tk.LEFT)
+        entry = ttk.Entry(row_frame, width=10)
+        entry.pack(side=tk.LEFT, padx=(5, 0))
+        ttk.Label(row_frame, text="Input column with each row's currency code (EUR, USD, etc.)", font=("TkDefaultFont", 8)).pack(side=tk.LEFT, padx=(5, 0))
+        self.mapping_entries["Currency"] = entry
+            
         # Buttons
         button_frame = ttk.Frame(main_frame)
         button_frame.pack(pady=10)
@@ -496,7 +600,7 @@ class PriceListConverter:
             if value:
                 config[col] = value
                 
-        if len(config) < 3:  # At least 3 columns should be mapped
+        if len(config) - ("Currency" in config) < 3:  # At least 3 columns should be mapped
             messagebox.showerror("Error", "Please map at least 3 columns")
             return
         
@@ -517,7 +621,7 @@ class PriceListConverter:
             json.dump(config, f, indent=2, ensure_ascii=False)
             
         messagebox.showinfo("Success", f"Configuration '{config_name}' saved successfully")
-        self.load_config_files()
+        self.load_config_files(force=True)
         # Update the combobox values and search
         if hasattr(self, 'config_combo'):
             self.config_combo['values'] = self.config_files
@@ -581,10 +685,20 @@ class PriceListConverter:
             ttk.Label(row_frame, text=f"{col} (Output Col {column_letter}):", width=25).pack(side=tk.LEFT)
             entry = ttk.Entry(row_frame, width=10)
             entry.pack(side=tk.LEFT, padx=(5, 0))
-            ttk.Label(row_frame, text="Enter input column letter (A, B, C, etc.)", font=("TkDefaultFont", 8)).pack(side=tk.LEFT, padx=(5, 0))
+            ttk.Label(row_frame, text="Enter input column letter (A, B, ..., AA, AB, etc.)", font=("TkDefaultFont", 8)).pack(side=tk.LEFT, padx=(5, 0))
             entry.insert(0, existing_config.get(col, ""))
             self.edit_mapping_entries[col] = entry
             
+        # Optional column with each row's currency, converted with the rates file
+        row_frame = ttk.Frame(mapping_frame)
+        row_frame.pack(fill=tk.X, pady=2)
+        ttk.Label(row_frame, text="Currency (optional):", width=25).pack(side=tk.LEFT)
+        entry = ttk.Entry(row_frame, width=10)
+        entry.pack(side=tk.LEFT, padx=(5, 0))
+        ttk.Label(row_frame, text="Input column with each row's currency code (EUR, USD, etc.)", font=("TkDefaultFont", 8)).pack(side=tk.LEFT, padx=(5, 0))
+        entry.insert(0, existing_config.get("Currency", ""))
+        self.edit_mapping_entries["Currency"] = entry
+            
         # Buttons
         button_frame = ttk.Frame(main_frame)
         button_frame.pack(pady=10)
@@ -596,17 +710,20 @@ class PriceListConverter:
         
     def update_config(self, existing_config):
         config = {}
+        # Per-sheet mappings are not editable here; keep them as they are
+        if "sheets" in existing_config:
+            config["sheets"] = existing_config["sheets"]
         for col, entry in self.edit_mapping_entries.items():
             value = entry.get().strip()
             if value:
                 config[col] = value
                 
-        if len(config) < 3:
+        if len(config) - ("sheets" in config) - ("Currency" in config) < 3:
             messagebox.showerror("Error", "Please map at least 3 columns")
             return
         
         # Check for duplicate values
-        values = list(config.values())
+        values = [v for k, v in config.items() if k != "sheets"]
         if len(values) != len(set(values)):
             duplicates = [v for v in set(values) if values.count(v) > 1]
             messagebox.showerror("Error", f"Duplicate column mappings found: {', '.join(duplicates)}. All values must be different.")
@@ -618,7 +735,7 @@ class PriceListConverter:
             json.dump(config, f, indent=2, ensure_ascii=False)
             
         messagebox.showinfo("Success", f"Configuration '{self.supplier_config.get()}' updated successfully")
-        self.load_config_files()
+        self.load_config_files(force=True)
         # Update the combobox values and search
         if hasattr(self, 'config_combo'):
             self.config_combo['values'] = self.config_files
@@ -655,344 +772,208 @@ class PriceListConverter:
             messagebox.showerror("Error", "Please select a supplier configuration or enable 'Bypass template'")
             return
             
-        # Start conversion in a separate thread
-        self.progress.start()
+        if self.auto_detect_columns.get() and self.analysis_running and self.input_sample is None:
+            messagebox.showinfo("Please wait", "The input file is still being analyzed")
+            return
+            
+        # Snapshot settings on the UI thread; the worker never touches Tk variables
+        settings = self.get_conversion_settings()
+        
+        self.conversion_cancel = threading.Event()
+        self.conversion_job += 1
+        self.conversion_running = True
+        job = self.conversion_job
+        progress = ProgressTracker(report=lambda snapshot: self.job_queue.put(("progress", job, snapshot)),
+                                   cancel_event=self.conversion_cancel)
+        
+        self.progress.config(mode='determinate', value=0)
         self.status_label.config(text="Converting...")
+        self.convert_button.config(state=tk.DISABLED)
+        self.update_cancel_button()
         
-        thread = threading.Thread(target=self.convert_file)
+        # Start conversion in a separate thread
+        thread = threading.Thread(target=self.convert_file,
+                                  args=(job, settings, progress, dict(self.detected_columns)))
         thread.daemon = True
         thread.start()
+    
+    def get_conversion_settings(self):
+        """Collect the current form values into UI-independent conversion settings"""
+        from pricelist.cache import DEFAULT_CACHE_DIR
+        from pricelist.conversion import ConversionSettings
+        
+        return ConversionSettings(
+            input_file=self.input_file_path.get(),
+            output_directory=self.output_directory.get(),
+            lead_time=self.lead_time.get(),
+            supplier_config=self.supplier_config.get(),
+            currency_rate=self.currency_rate.get(),
+            currency_rates=self.currency_rates.get(),
+            markup_percentage=self.markup_percentage.get(),
+            bypass_template=self.bypass_template.get(),
+            auto_detect_columns=self.auto_detect_columns.get(),
+            canonical_articles=self.canonical_articles.get(),
+            streaming=self.streaming_mode.get(),
+            pipeline=self.pipeline_mode.get(),
+            cache_dir=DEFAULT_CACHE_DIR if self.use_cache.get() else "",
+            write_workers=int(self.write_workers.get() or 1),
+            all_sheets=self.all_sheets.get(),
+            sheet_outputs=self.sheet_outputs.get(),
+            metrics=self.write_metrics.get(),
+            output_format=self.output_format.get(),
+            delta=self.write_delta.get(),
+            interruptible_read=self.interruptible_read.get(),
+        )
         
-    def convert_file(self):
+    def convert_file(self, job, settings, progress, detected_columns):
         try:
-            self.log_message("Starting conversion...")
-            
-            # Determine configuration source
-            if self.bypass_template.get():
-                # Use auto-detected columns or original column names
-                if self.auto_detect_columns.get() and self.detected_columns:
-                    config = self.detected_columns
-                    self.log_message("Using auto-detected column mapping")
-                else:
-                    # Use original column names as-is
-                    if self.input_dataframe is not None:
-                        df = self.input_dataframe
-                    else:
-                        input_path = Path(self.input_file_path.get())
-                        if input_path.suffix.lower() == '.xlsx':
-                            df = pd.read_excel(input_path)
-                        else:
-                            df = pd.read_csv(input_path)
-                    
-                    # Create config that maps original columns to themselves
-                    config = {}
-                    for col in df.columns:
-                        config[col] = col
-                    self.log_message("Using original column names (bypassing template)")
-            else:
-                # Load configuration from file
-                config_file = Path("configs") / f"{self.supplier_config.get()}.json"
-                with open(config_file, 'r', encoding='utf-8') as f:
-                    config = json.load(f)
-                self.log_message(f"Loaded configuration: {self.supplier_config.get()}")
-            
-            # Read input file if not already loaded
-            if self.input_dataframe is None:
-                input_path = Path(self.input_file_path.get())
-                if input_path.suffix.lower() == '.xlsx':
-                    # Read Excel file
-                    excel_file = pd.ExcelFile(input_path)
-                    if len(excel_file.sheet_names) > 1:
-                        self.log_message(f"Multiple sheets found: {excel_file.sheet_names}")
-                        # Process first sheet for now, can be enhanced to process all
-                        df = pd.read_excel(input_path, sheet_name=0)
-                    else:
-                        df = pd.read_excel(input_path)
-                else:
-                    # Read CSV file
-                    df = pd.read_csv(input_path)
-            else:
-                df = self.input_dataframe
-                
-            self.log_message(f"Input file loaded: {len(df)} rows, {len(df.columns)} columns")
+            from pricelist.conversion import ConversionEngine
             
-            # Process data
-            processed_data = self.process_dataframe(df, config)
-            
-            # Generate output
-            self.generate_output(processed_data, self.input_file_path.get())
-            
-            self.log_message("Conversion completed successfully!")
-            
-            # Update UI in main thread
-            self.root.after(0, self.conversion_completed)
+            engine = ConversionEngine(settings, log=self.log_message, progress=progress)
+            # The engine reads the file itself; analysis only kept a sample
+            created_files = engine.convert_file(None, detected_columns)
+            self.job_queue.put(("done", job, created_files))
             
+        except ConversionCancelled:
+            self.log_message("Conversion cancelled, partial output files removed")
+            self.job_queue.put(("cancelled", job, None))
         except Exception as e:
             error_msg = f"Error during conversion: {str(e)}"
             self.log_message(error_msg)
-            self.root.after(0, lambda: self.conversion_error(error_msg))
-            
-    def process_dataframe(self, df, config):
-        # Always use the fixed 7-column template structure
-        output_columns = ["Lead Time", "Brand Name", "Article", "Quantity", "MOQ", "MSRP", "Price"]
-        output_df = pd.DataFrame(columns=output_columns)
-        
-        if self.bypass_template.get():
-            # Bypass template: use auto-detected columns or intelligent mapping
-            if self.auto_detect_columns.get() and self.detected_columns:
-                # Use auto-detected mapping
-                config = self.detected_columns
-                self.log_message("Using auto-detected column mapping")
-            else:
-                # Intelligent mapping based on column content and position
-                config = {}
-                columns = [col.lower().strip() for col in df.columns]
-                
-                for i, col in enumerate(columns):
-                    column_letter = chr(65 + i)  # A, B, C, etc.
-                    
-                    # Smart mapping based on column name patterns
-                    if any(word in col for word in ['part', 'sku', 'code', 'article', 'item', 'product']):
-                        config["Article"] = column_letter
-                    elif any(word in col for word in ['brand', 'manufacturer', 'maker', 'mfg', 'company']):
-                        config["Brand Name"] = column_letter
-                    elif any(word in col for word in ['quantity', 'stock', 'qty', 'amount', 'count', 'available']):
-                        config["Quantity"] = column_letter
-                    elif any(word in col for word in ['moq', 'minimum', 'min']):
-                        config["MOQ"] = column_letter
-                    elif any(word in col for word in ['msrp', 'list', 'retail', 'recommended', 'suggested']):
-                        config["MSRP"] = column_letter
-                    elif any(word in col for word in ['price', 'cost', 'unit', 'selling']):
-                        config["Price"] = column_letter
-                    elif any(word in col for word in ['lead', 'delivery', 'time']):
-                        config["Lead Time"] = column_letter
-                
-                # Fallback to position-based mapping if smart mapping didn't work
-                if not config:
-                    for i, col in enumerate(df.columns):
-                        column_letter = chr(65 + i)
-                        if i == 0:  # First column - usually Article/Part Number
-                            config["Article"] = column_letter
-                        elif i == 1:  # Second column - usually Brand
-                            config["Brand Name"] = column_letter
-                        elif i == 2:  # Third column - usually Description (skip)
-                            continue
-                        elif i == 3:  # Fourth column - usually Quantity
-                            config["Quantity"] = column_letter
-                        elif i == 4:  # Fifth column - usually Price
-                            config["Price"] = column_letter
-                        elif i == 5:  # Sixth column - usually MSRP or another price
-                            config["MSRP"] = column_letter
-                
-                self.log_message("Using intelligent column mapping (bypassing template)")
-        
-        # Map columns based on configuration (using column letters)
-        for output_col in output_columns:
-            if output_col in config:
-                column_letter = config[output_col].upper()
-                # Convert column letter to index (A=0, B=1, C=2, etc.)
-                try:
-                    col_index = ord(column_letter) - ord('A')
-                    if 0 <= col_index < len(df.columns):
-                        output_df[output_col] = df.iloc[:, col_index]
-                        self.log_message(f"Mapped {output_col} → Column {column_letter} ({df.columns[col_index]})")
-                    else:
-                        self.log_message(f"Warning: Column '{column_letter}' is out of range (file has {len(df.columns)} columns)")
-                        output_df[output_col] = ""
-                except Exception as e:
-                    self.log_message(f"Warning: Invalid column letter '{column_letter}': {str(e)}")
-                    output_df[output_col] = ""
-            else:
-                self.log_message(f"Warning: No mapping found for '{output_col}'")
-                output_df[output_col] = ""
-                
-        # Lead time is only in A1 cell, not in data rows
-        # Remove the Lead Time column from data rows
-        if "Lead Time" in output_df.columns:
-            output_df = output_df.drop("Lead Time", axis=1)
-        
-        # Clean up the data
-        # Round numeric columns to 2 decimal places
-        numeric_columns = ['Quantity', 'MOQ', 'MSRP', 'Price']
-        for col in numeric_columns:
-            if col in output_df.columns:
-                # Convert to numeric, handling any non-numeric values
-                output_df[col] = pd.to_numeric(output_df[col], errors='coerce')
-                # Round to 2 decimal places
-                output_df[col] = output_df[col].round(2)
-                # Fill NaN values with empty string
-                output_df[col] = output_df[col].fillna('')
-                # Format as string with proper decimal places
-                output_df[col] = output_df[col].apply(lambda x: f"{x:.2f}" if pd.notna(x) and x != '' else '')
-                # Remove '.00' from whole numbers
-                output_df[col] = output_df[col].str.replace('.00', '', regex=False)
-        
-        # Clean up text columns - remove extra spaces
-        text_columns = ['Brand Name', 'Article']
-        for col in text_columns:
-            if col in output_df.columns:
-                output_df[col] = output_df[col].astype(str).str.strip()
-                # Replace multiple spaces with single space
-                output_df[col] = output_df[col].str.replace(r'\s+', ' ', regex=True)
-                # Replace 'nan' strings with empty value
-                output_df[col] = output_df[col].replace('nan', '')
-        
-        # Remove rows with all empty values
-        output_df = output_df.dropna(how='all')
-        
-        # Apply currency conversion and markup in strict order
-        # Step 1: Currency conversion (if rate > 0)
-        currency_rate = self.currency_rate.get().strip()
-        if currency_rate and currency_rate != '':
-            # Convert comma to dot for decimal separator
-            currency_rate_normalized = currency_rate.replace(',', '.')
-            try:
-                rate = float(currency_rate_normalized)
-                if rate > 0:
-                    self.log_message(f"Applying currency conversion with rate: {rate}")
-                    # Apply to MSRP and Price columns
-                    for col in ['MSRP', 'Price']:
-                        if col in output_df.columns:
-                            # Convert back to numeric for calculation
-                            numeric_values = pd.to_numeric(output_df[col], errors='coerce')
-                            # Apply currency conversion
-                            converted_values = numeric_values * rate
-                            # Round to 2 decimal places and format
-                            output_df[col] = converted_values.round(2).apply(lambda x: f"{x:.2f}" if pd.notna(x) and x != '' else '')
-                            # Remove '.00' from whole numbers
-                            output_df[col] = output_df[col].str.replace('.00', '', regex=False)
-                    self.log_message("Currency conversion completed")
-                else:
-                    self.log_message(f"ERROR: Currency rate must be greater than 0 (entered: {currency_rate}) - skipping currency conversion")
-            except ValueError:
-                self.log_message(f"ERROR: Invalid currency rate '{currency_rate}' - please use numbers only (e.g., 3.67 or 3,67) - skipping currency conversion")
-        
-        # Step 2: Markup calculation (if percentage > 0)
-        markup_percentage = self.markup_percentage.get().strip()
-        if markup_percentage and markup_percentage != '':
-            # Convert comma to dot for decimal separator
-            markup_percentage_normalized = markup_percentage.replace(',', '.')
-            try:
-                markup = float(markup_percentage_normalized)
-                if markup > 0:
-                    self.log_message(f"Applying markup of {markup}%")
-                    # Apply to MSRP and Price columns
-                    for col in ['MSRP', 'Price']:
-                        if col in output_df.columns:
-                            # Convert back to numeric for calculation
-                            numeric_values = pd.to_numeric(output_df[col], errors='coerce')
-                            # Apply markup: Price = Price * (1 + Markup/100)
-                            markup_multiplier = 1 + (markup / 100)
-                            marked_up_values = numeric_values * markup_multiplier
-                            # Round to 2 decimal places and format
-                            output_df[col] = marked_up_values.round(2).apply(lambda x: f"{x:.2f}" if pd.notna(x) and x != '' else '')
-                            # Remove '.00' from whole numbers
-                            output_df[col] = output_df[col].str.replace('.00', '', regex=False)
-                    self.log_message("Markup calculation completed")
-                else:
-                    self.log_message(f"ERROR: Markup percentage must be greater than 0 (entered: {markup_percentage}) - skipping markup calculation")
-            except ValueError:
-                self.log_message(f"ERROR: Invalid markup percentage '{markup_percentage}' - please use numbers only (e.g., 15 or 15,5) - skipping markup calculation")
-        
-        self.log_message(f"Processed {len(output_df)} rows")
-        return output_df
-        
-    def generate_output(self, df, input_file_path):
-        output_dir = Path(self.output_directory.get())
-        
-        # Get lead time value for A1 cell
-        lead_time_value = self.lead_time.get()
-        
-        # Extract input filename without extension and create output filename
-        input_path = Path(input_file_path)
-        input_name = input_path.stem  # filename without extension
-        output_base_name = f"{input_name}_output"
-        
-        # Split into chunks if file is large (80MB OR 1,000,000 rows)
-        max_rows = 1000000  # 1 million rows
-        max_size_mb = 80    # 80 MB
-        
-        # Check if we need to split
-        should_split = False
-        split_reason = ""
-        
-        if len(df) > max_rows:
-            should_split = True
-            split_reason = f"file has {len(df):,} rows (limit: {max_rows:,} rows)"
-        else:
-            # Estimate file size (rough calculation: ~100 bytes per row)
-            estimated_size_mb = (len(df) * 100) / (1024 * 1024)
-            if estimated_size_mb > max_size_mb:
-                should_split = True
-                split_reason = f"estimated size {estimated_size_mb:.1f}MB (limit: {max_size_mb}MB)"
-        
-        if should_split:
-            # Calculate chunk size based on the limiting factor
-            if len(df) > max_rows:
-                chunk_size = max_rows
+            self.job_queue.put(("error", job, error_msg))
+    
+    def cancel_jobs(self):
+        """Cancel the running analysis and/or conversion"""
+        if self.analysis_running:
+            self.analysis_cancel.set()
+            self.analysis_job += 1  # ignore anything the cancelled analysis still reports
+            self.analysis_running = False
+            self.log_message("Input analysis cancelled")
+        if self.conversion_running:
+            self.conversion_cancel.set()
+            # Convert stays disabled until the worker reports back, so a cancelled
+            # whole-file read never runs next to a new conversion
+            self.status_label.config(text="Cancelling...")
+        self.update_cancel_button()
+    
+    def update_cancel_button(self):
+        running = self.analysis_running or self.conversion_running
+        self.cancel_button.config(state=tk.NORMAL if running else tk.DISABLED)
+    
+    def poll_jobs(self):
+        """Apply messages from background jobs on the UI thread"""
+        try:
+            while True:
+                kind, job, payload = self.job_queue.get_nowait()
+                self.handle_job_message(kind, job, payload)
+        except queue.Empty:
+            pass
+        self.root.after(100, self.poll_jobs)
+    
+    def handle_job_message(self, kind, job, payload):
+        if kind in ("analysis", "rows", "analysis_error"):
+            if job != self.analysis_job:
+                return  # superseded or cancelled
+            if kind == "analysis":
+                self.show_analysis(*payload)
+            elif kind == "rows":
+                num_rows, exact = payload
+                self.log_message(f"Input file has {'' if exact else 'about '}{num_rows:,} rows")
+                self.analysis_running = False
             else:
-                # Calculate rows for 80MB
-                chunk_size = int((max_size_mb * 1024 * 1024) / 100)
-            
-            num_chunks = (len(df) + chunk_size - 1) // chunk_size
-            self.log_message(f"Splitting into {num_chunks} files ({split_reason})...")
-            
-            for i in range(num_chunks):
-                start_idx = i * chunk_size
-                end_idx = min((i + 1) * chunk_size, len(df))
-                chunk_df = df.iloc[start_idx:end_idx]
-                
-                output_file = output_dir / f"{output_base_name}_part_{i+1}.csv"
-                self.write_csv_with_lead_time(chunk_df, output_file, lead_time_value)
-                self.log_message(f"Created: {output_file} ({len(chunk_df):,} rows)")
+                self.log_message(f"Error analyzing input file: {payload}")
+                self.analysis_running = False
+            self.update_cancel_button()
+            return
+        
+        if job != self.conversion_job:
+            return
+        if kind == "progress":
+            self.show_progress(payload)
+        elif kind == "done":
+            self.conversion_completed()
+        elif kind == "cancelled":
+            self.conversion_stopped("Conversion cancelled")
+        elif kind == "error":
+            self.conversion_error(payload)
+    
+    def show_progress(self, progress):
+        fraction = progress.fraction
+        if fraction is None:
+            if str(self.progress['mode']) != 'indeterminate':
+                self.progress.config(mode='indeterminate')
+                self.progress.start()
         else:
-            output_file = output_dir / f"{output_base_name}.csv"
-            self.write_csv_with_lead_time(df, output_file, lead_time_value)
-            self.log_message(f"Created: {output_file} ({len(df):,} rows)")
+            if str(self.progress['mode']) != 'determinate':
+                self.progress.stop()
+                self.progress.config(mode='determinate')
+            self.progress['value'] = fraction * 100
+        self.status_label.config(text=progress.describe())
     
-    def write_csv_with_lead_time(self, df, output_file, lead_time_value):
-        """Write CSV file with lead time in A1 and data starting from column A"""
-        with open(output_file, 'w', encoding='utf-8', newline='') as f:
-            # Write lead time in A1 cell with proper CSV format
-            if lead_time_value:
-                # Count the number of columns in the data to add proper semicolons
-                num_columns = len(df.columns)
-                # Create lead time row: lead_time + semicolons for remaining columns (num_columns - 1)
-                lead_time_row = str(lead_time_value) + ';' * (num_columns - 1)
-                f.write(f"{lead_time_row}\n")
-            else:
-                # Empty A1 cell with proper semicolons
-                num_columns = len(df.columns)
-                f.write(';' * (num_columns - 1) + "\n")
-            
-            # Write data without headers, starting from column A
-            df.to_csv(f, index=False, header=False, sep=';', encoding='utf-8')
+    def conversion_stopped(self, status):
+        """Reset the progress widgets after a conversion ends in any way"""
+        self.conversion_running = False
+        self.progress.stop()
+        self.progress.config(mode='determinate', value=0)
+        self.status_label.config(text=status)
+        self.convert_button.config(state=tk.NORMAL)
+        self.update_cancel_button()
             
     def log_message(self, message):
-        timestamp = pd.Timestamp.now().strftime("%H:%M:%S")
-        log_entry = f"[{timestamp}] {message}\n"
-        
-        # Update log in main thread
-        self.root.after(0, lambda: self.update_log(log_entry))
-        
-    def update_log(self, message):
-        self.log_text.insert(tk.END, message)
+        # Safe from any thread; pump_log shows it on the main thread
+        self.log_pump.write(message)
+        
+    def pump_log(self):
+        lines = self.log_pump.drain()
+        if lines:
+            self.update_log("".join(lines))
+        self.root.after(DRAIN_INTERVAL_MS, self.pump_log)
+        
+    def update_log(self, text):
+        self.log_text.insert(tk.END, text)
+        # Trim the oldest lines beyond the cap (the widget always ends with an empty line)
+        excess = int(self.log_text.index('end-1c').split('.')[0]) - 1 - self.log_pump.max_lines
+        if self.log_pump.max_lines and excess > 0:
+            self.log_text.delete('1.0', f'{excess + 1}.0')
         self.log_text.see(tk.END)
         
     def conversion_completed(self):
-        self.progress.stop()
-        self.status_label.config(text="Conversion completed successfully!")
+        self.conversion_stopped("Conversion completed successfully!")
+        self.progress['value'] = 100
         messagebox.showinfo("Success", "Price list conversion completed successfully!")
         
     def conversion_error(self, error_msg):
-        self.progress.stop()
-        self.status_label.config(text="Conversion failed!")
+        self.conversion_stopped("Conversion failed!")
         messagebox.showerror("Error", error_msg)
 
 def main():
+    parser = argparse.ArgumentParser(description="Price List Converter")
+    parser.add_argument("--log-file", default=None, help="Also append the full conversion log to this file")
+    parser.add_argument("--log-lines", type=int, default=DEFAULT_MAX_LINES,
+                        help="Lines kept in the log window (0 keeps all)")
+    parser.add_argument("--startup-time", action="store_true",
+                        help="Print how long the window took to appear (JSON) and exit")
+    args = parser.parse_args()
+    
     root = tk.Tk()
-    app = PriceListConverter(root)
-    root.mainloop()
+    app = PriceListConverter(root, args.log_file, args.log_lines)
+    if args.startup_time:
+        # Checked before the event loop runs, which starts the background imports
+        pandas_loaded = "pandas" in sys.modules
+        root.update()
+        print(json.dumps({
+            "window_seconds": round(time.perf_counter() - STARTED, 4),
+            "pandas_loaded_at_startup": pandas_loaded,
+        }))
+        root.destroy()
+        return
+    try:
+        root.mainloop()
+    finally:
+        app.log_pump.close()
 
 if __name__ == "__main__":
+    # Worker processes (output encoding, sheets, pipelined reading) of a frozen
+    # build start this executable again; this makes them run the worker instead
+    multiprocessing.freeze_support()
     main()
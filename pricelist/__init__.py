@@ -0,0 +1,43 @@
+"""Conversion core of the Price List Converter, usable without the GUI.
+
+The names below are imported on first use, so that importing a light
+submodule (e.g. ``pricelist.logpump`` from the GUI at startup) does not load
+pandas.
+"""
+import importlib
+
+_EXPORTS = {
+    "OUTPUT_COLUMNS": "conversion",
+    "ConversionEngine": "conversion",
+    "ConversionSettings": "conversion",
+    "InputReader": "conversion",
+    "count_input_rows": "conversion",
+    "detect_columns": "conversion",
+    "load_supplier_config": "conversion",
+    "read_input_file": "conversion",
+    "read_input_sample": "conversion",
+    "write_csv_with_lead_time": "conversion",
+    "available_backends": "backends",
+    "validate_backends": "backends",
+    "ColumnMatch": "detection",
+    "detect_column_matches": "detection",
+    "merge_outputs": "merge",
+    "ConversionCancelled": "progress",
+    "Progress": "progress",
+    "ProgressTracker": "progress",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module_name}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,171 @@
+"""Interchangeable XLSX reader backends with automatic fallback.
+
+``calamine`` is pandas' Rust-based reader (needs the python-calamine package)
+and is several times faster than ``openpyxl``, pandas' read-only openpyxl
+reader that is always available. The backend "auto" is openpyxl, so that
+installing python-calamine never changes the parsed values on its own;
+calamine is used when asked for. A backend that is not installed or cannot
+open a file falls back to the next one.
+
+Run ``python -m pricelist.backends input.xlsx`` to check that every installed
+backend (and the streaming row reader) parses a file to identical values.
+"""
+import argparse
+import importlib.util
+import json
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+AUTO_BACKEND = "auto"
+
+# "auto" tries them in this order: openpyxl, the reference parser, then calamine as a fallback
+READER_BACKENDS = ["openpyxl", "calamine"]
+
+# Module each backend needs
+BACKEND_MODULES = {"calamine": "python_calamine", "openpyxl": "openpyxl"}
+
+# Name of the streaming (row by row, read-only openpyxl) reader in validation reports
+STREAMING_READER = "openpyxl-stream"
+
+
+def backend_installed(backend):
+    return importlib.util.find_spec(BACKEND_MODULES[backend]) is not None
+
+
+def available_backends():
+    """Return the installed backends in the order "auto" tries them"""
+    return [backend for backend in READER_BACKENDS if backend_installed(backend)]
+
+
+def backend_candidates(backend=AUTO_BACKEND):
+    """Return the backends to try in order: the requested one first, then the others"""
+    if backend == AUTO_BACKEND:
+        return list(READER_BACKENDS)
+    if backend not in READER_BACKENDS:
+        raise ValueError(f"Unknown reader backend '{backend}' (choose from: {AUTO_BACKEND}, "
+                         f"{', '.join(READER_BACKENDS)})")
+    return [backend] + [other for other in READER_BACKENDS if other != backend]
+
+
+def resolve_backend(backend=AUTO_BACKEND):
+    """Return the installed backend open_excel_file() tries first, or None when none is installed"""
+    return next((candidate for candidate in backend_candidates(backend) if backend_installed(candidate)), None)
+
+
+def open_excel_file(input_path, backend=AUTO_BACKEND, log=None):
+    """Open a workbook with the first backend that can; return (pd.ExcelFile, backend name)"""
+    last_error = None
+    for candidate in backend_candidates(backend):
+        if not backend_installed(candidate):
+            if candidate == backend and log:
+                log(f"Reader backend '{candidate}' is not installed, falling back")
+            continue
+        try:
+            excel_file = pd.ExcelFile(input_path, engine=candidate)
+        except Exception as e:
+            # A corrupt or unusual workbook may still open with another backend
+            if log:
+                log(f"Reader backend '{candidate}' could not open {Path(input_path).name}: {str(e)}")
+            last_error = e
+            continue
+        if log and candidate != backend and backend != AUTO_BACKEND:
+            log(f"Reading with the '{candidate}' backend instead")
+        return excel_file, candidate
+    if last_error is not None:
+        raise last_error
+    raise ImportError(f"No XLSX reader backend is installed (tried: {', '.join(backend_candidates(backend))})")
+
+
+def read_with_backend(input_path, backend, sheet_name=0, nrows=None):
+    """Parse a worksheet with exactly one backend, without falling back"""
+    if backend == STREAMING_READER:
+        return _read_streaming(input_path, sheet_name)
+    with pd.ExcelFile(input_path, engine=backend) as excel_file:
+        return excel_file.parse(sheet_name, nrows=nrows)
+
+
+def _read_streaming(input_path, sheet_name=0):
+    from .readers import iter_sheet_batches, scan_sheet
+
+    scan = scan_sheet(input_path, sheet_name)
+    batches = list(iter_sheet_batches(input_path, scan, range(len(scan.columns)), sheet_name))
+    if not batches:
+        return pd.DataFrame(columns=scan.columns)
+    return pd.concat(batches, ignore_index=True)
+
+
+def _differences(reference, frame, limit):
+    """Return up to limit differences between two parsed sheets"""
+    if list(reference.columns) != list(frame.columns):
+        return [{"columns": [str(c) for c in frame.columns], "expected": [str(c) for c in reference.columns]}]
+    if len(reference) != len(frame):
+        return [{"rows": len(frame), "expected": len(reference)}]
+    differences = []
+    for position, column in enumerate(reference.columns):
+        expected = reference.iloc[:, position]
+        actual = frame.iloc[:, position]
+        if expected.dtype != actual.dtype:
+            differences.append({"column": str(column), "dtype": str(actual.dtype), "expected": str(expected.dtype)})
+        equal = (expected.to_numpy(dtype=object) == actual.to_numpy(dtype=object)) | (expected.isna() & actual.isna())
+        for row in np.flatnonzero(~np.asarray(equal, dtype=bool))[:limit]:
+            differences.append({"column": str(column), "row": int(row),
+                                "value": repr(actual.iat[row]), "expected": repr(expected.iat[row])})
+        if len(differences) >= limit:
+            return differences[:limit]
+    return differences
+
+
+def validate_backends(input_path, sheet_name=0, nrows=None, backends=None, limit=20):
+    """Parse a worksheet with every backend and compare the results to the openpyxl reader.
+
+    Returns a report with the seconds each backend took and, per backend, the
+    differences found (column names, row counts, dtypes or values; at most
+    ``limit``). The streaming reader is included unless nrows limits the rows.
+    """
+    import time
+
+    if backends is None:
+        backends = available_backends() + ([] if nrows else [STREAMING_READER])
+    reference_backend = "openpyxl"
+    report = {"input": str(input_path), "sheet": sheet_name, "reference": reference_backend, "backends": {}}
+    started = time.perf_counter()
+    reference = read_with_backend(input_path, reference_backend, sheet_name, nrows)
+    report["rows"] = len(reference)
+    report["backends"][reference_backend] = {"seconds": round(time.perf_counter() - started, 3), "differences": []}
+    for backend in backends:
+        if backend == reference_backend:
+            continue
+        started = time.perf_counter()
+        try:
+            frame = read_with_backend(input_path, backend, sheet_name, nrows)
+        except Exception as e:
+            report["backends"][backend] = {"error": str(e)}
+            continue
+        report["backends"][backend] = {
+            "seconds": round(time.perf_counter() - started, 3),
+            "differences": _differences(reference, frame, limit),
+        }
+    report["identical"] = all(not result.get("error") and not result["differences"]
+                              for result in report["backends"].values())
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check that every XLSX reader backend parses a file identically")
+    parser.add_argument("input", help="XLSX file to parse")
+    parser.add_argument("--sheet", default=0, help="Worksheet name or index (default: the first)")
+    parser.add_argument("--rows", type=int, default=None, help="Only compare the first ROWS rows")
+    parser.add_argument("--backends", nargs="+", choices=READER_BACKENDS + [STREAMING_READER], default=None,
+                        help="Backends to compare with openpyxl (default: every installed one)")
+    args = parser.parse_args(argv)
+    sheet_name = int(args.sheet) if str(args.sheet).isdigit() else args.sheet
+    report = validate_backends(args.input, sheet_name, args.rows, args.backends)
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    return 0 if report["identical"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
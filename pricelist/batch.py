@@ -0,0 +1,236 @@
+"""Headless batch conversion of many supplier files.
+
+Usage:
+    python -m pricelist.batch manifest.csv [--workers N] [--output-dir DIR]
+
+The manifest is a CSV (with a header row) or a JSON list of objects with the
+fields ``input``, ``config``, ``lead_time``, ``currency_rate`` and ``markup``.
+Optional fields are ``output_dir``, ``currency_rates`` (rates file for configs
+with a Currency column), ``bypass_template``, ``canonical_articles``,
+``streaming``, ``pipeline``, ``all_sheets``, ``sheet_outputs``,
+``output_format`` and ``delta_from`` (previous output to diff against).
+Relative paths are resolved against the manifest's directory.
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from .backends import AUTO_BACKEND, READER_BACKENDS
+from .cache import DEFAULT_CACHE_SIZE_MB
+from .conversion import DEFAULT_CONFIG_DIR, ConversionEngine, ConversionSettings
+from .currency import parse_rates_date, preload_rates_tables, prime_rates_tables
+from .output import MAX_ROWS, MAX_SIZE_MB, OUTPUT_FORMATS
+
+TRUE_VALUES = {"1", "true", "yes", "y"}
+
+
+def load_manifest(manifest_path, default_output_dir=None, config_dir=DEFAULT_CONFIG_DIR,
+                  streaming=False, batch_size=50000, cache_dir="", cache_size_mb=DEFAULT_CACHE_SIZE_MB,
+                  max_rows=MAX_ROWS, max_size_mb=MAX_SIZE_MB, write_workers=1, metrics=False, profile=False,
+                  reader_backend=AUTO_BACKEND, output_format="csv", delta=False, pipeline=False,
+                  canonical_articles=False, currency_rates="", rates_date=""):
+    """Read a manifest file and return a list of ConversionSettings.
+
+    Paths in the manifest are relative to its folder; default_output_dir
+    (for entries without output_dir) is relative to the current directory.
+    currency_rates is the rates file of entries without their own; all
+    entries take their rates on rates_date (default: today).
+    """
+    manifest_path = Path(manifest_path)
+    if manifest_path.suffix.lower() == '.json':
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            entries = json.load(f)
+    else:
+        with open(manifest_path, 'r', encoding='utf-8', newline='') as f:
+            entries = list(csv.DictReader(f))
+
+    base_dir = manifest_path.parent
+    if default_output_dir:
+        default_output_dir = Path(default_output_dir).resolve()
+    jobs = []
+    for line_no, entry in enumerate(entries, start=1):
+        entry = {str(k).strip(): ("" if v is None else str(v).strip()) for k, v in entry.items()}
+
+        if not entry.get("input"):
+            raise ValueError(f"Manifest entry {line_no}: 'input' is required")
+        input_file = base_dir / entry["input"]
+
+        lead_time = entry.get("lead_time", "")
+        if not lead_time.isdigit() or int(lead_time) <= 0:
+            raise ValueError(f"Manifest entry {line_no}: Lead Time must be a positive integer (got '{lead_time}')")
+
+        bypass_template = entry.get("bypass_template", "").lower() in TRUE_VALUES
+        supplier_config = entry.get("config", "")
+        if not bypass_template and not supplier_config:
+            raise ValueError(f"Manifest entry {line_no}: 'config' is required unless bypass_template is set")
+        if supplier_config.lower().endswith('.json'):
+            supplier_config = str(base_dir / supplier_config)
+
+        if entry.get("output_format") and entry["output_format"] not in OUTPUT_FORMATS:
+            raise ValueError(f"Manifest entry {line_no}: unknown output_format '{entry['output_format']}' "
+                             f"(choose from: {', '.join(OUTPUT_FORMATS)})")
+
+        rates_file = str(base_dir / entry["currency_rates"]) if entry.get("currency_rates") else currency_rates
+        if entry.get("output_dir"):
+            output_dir = base_dir / entry["output_dir"]
+        else:
+            output_dir = default_output_dir or input_file.parent
+
+        jobs.append(ConversionSettings(
+            input_file=str(input_file),
+            output_directory=str(output_dir),
+            lead_time=lead_time,
+            supplier_config=supplier_config,
+            currency_rate=entry.get("currency_rate", ""),
+            markup_percentage=entry.get("markup", ""),
+            currency_rates=rates_file,
+            rates_date=rates_date,
+            bypass_template=bypass_template,
+            canonical_articles=canonical_articles or entry.get("canonical_articles", "").lower() in TRUE_VALUES,
+            config_dir=config_dir,
+            streaming=streaming or entry.get("streaming", "").lower() in TRUE_VALUES,
+            batch_size=batch_size,
+            pipeline=pipeline or entry.get("pipeline", "").lower() in TRUE_VALUES,
+            cache_dir=cache_dir,
+            cache_size_mb=cache_size_mb,
+            max_rows=max_rows,
+            max_size_mb=max_size_mb,
+            write_workers=write_workers,
+            all_sheets=entry.get("all_sheets", "").lower() in TRUE_VALUES,
+            sheet_outputs=entry.get("sheet_outputs", "").lower() in TRUE_VALUES,
+            metrics=metrics,
+            profile=profile,
+            reader_backend=reader_backend,
+            output_format=entry.get("output_format") or output_format,
+            delta=delta or bool(entry.get("delta_from")),
+            delta_from=str(base_dir / entry["delta_from"]) if entry.get("delta_from") else "",
+        ))
+    return jobs
+
+
+def run_job(settings):
+    """Convert one file; runs inside a worker process"""
+    log = []
+    started = time.perf_counter()
+    try:
+        engine = ConversionEngine(settings, log=log.append)
+        created_files = engine.convert_file()
+        return {
+            "input": settings.input_file,
+            "ok": True,
+            "files": [str(f) for f in created_files],
+            "seconds": time.perf_counter() - started,
+            "log": log,
+        }
+    except Exception as e:
+        return {
+            "input": settings.input_file,
+            "ok": False,
+            "error": str(e),
+            "seconds": time.perf_counter() - started,
+            "log": log,
+        }
+
+
+def run_batch(jobs, workers=None, verbose=False, out=sys.stdout):
+    """Run all jobs in a process pool and return the list of results"""
+    workers = workers or os.cpu_count() or 1
+    results = []
+    # Rates files are parsed once here and handed to every worker, not parsed once per file
+    rates_tables = preload_rates_tables(job.currency_rates for job in jobs if job.currency_rates)
+    with ProcessPoolExecutor(max_workers=min(workers, max(len(jobs), 1)), initializer=prime_rates_tables,
+                             initargs=(rates_tables,)) as executor:
+        started = time.perf_counter()
+        futures = {executor.submit(run_job, job): job for job in jobs}
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except Exception as e:
+                # The worker died (e.g. killed when out of memory), which breaks the pool's other jobs too
+                result = {
+                    "input": futures[future].input_file,
+                    "ok": False,
+                    "error": f"{type(e).__name__}: {e}",
+                    "seconds": time.perf_counter() - started,
+                    "log": [],
+                }
+            results.append(result)
+            name = Path(result["input"]).name
+            if result["ok"]:
+                print(f"OK    {name} ({result['seconds']:.2f}s) → {', '.join(result['files'])}", file=out)
+            else:
+                print(f"FAIL  {name} ({result['seconds']:.2f}s): {result['error']}", file=out)
+            if verbose:
+                for line in result["log"]:
+                    print(f"      {line}", file=out)
+            out.flush()
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert many supplier price lists without the GUI")
+    parser.add_argument("manifest", help="CSV or JSON manifest listing the files to convert")
+    parser.add_argument("--workers", type=int, default=None, help="Number of worker processes (default: CPU count)")
+    parser.add_argument("--output-dir", default=None, help="Output directory for entries without output_dir")
+    parser.add_argument("--config-dir", default=DEFAULT_CONFIG_DIR, help="Directory containing supplier configs")
+    parser.add_argument("--currency-rates", default="",
+                        help="Rates file (CSV/JSON: currency, rate, as_of) for configs with a Currency column")
+    parser.add_argument("--rates-date", default="",
+                        help="Take currency rates as of this date, YYYY-MM-DD (default: today)")
+    parser.add_argument("--canonical-articles", action="store_true",
+                        help="Uppercase article numbers and drop their separators (spaces, - . / \\ _)")
+    parser.add_argument("--streaming", action="store_true", help="Stream inputs in row batches (bounded memory)")
+    parser.add_argument("--batch-size", type=int, default=50000, help="Rows per batch in streaming mode")
+    parser.add_argument("--pipeline", action="store_true",
+                        help="Stream with reading, converting and writing overlapped (implies --streaming)")
+    parser.add_argument("--cache-dir", default="",
+                        help="Reuse parsed inputs from this directory when files are unchanged")
+    parser.add_argument("--cache-size-mb", type=int, default=DEFAULT_CACHE_SIZE_MB,
+                        help="Maximum size of the parsed-input cache")
+    parser.add_argument("--max-rows", type=int, default=MAX_ROWS, help="Maximum data rows per output part")
+    parser.add_argument("--max-size-mb", type=float, default=MAX_SIZE_MB, help="Maximum size of an output part in MB")
+    parser.add_argument("--write-workers", type=int, default=1,
+                        help="Processes encoding the output of each file in parallel")
+    parser.add_argument("--metrics", action="store_true",
+                        help="Write a per-stage metrics report (JSON) next to each output")
+    parser.add_argument("--profile", action="store_true", help="Also write a cProfile profile next to each output")
+    parser.add_argument("--reader", choices=[AUTO_BACKEND] + READER_BACKENDS, default=AUTO_BACKEND,
+                        help="XLSX reader backend (auto: openpyxl; falls back when one fails)")
+    parser.add_argument("--output-format", choices=OUTPUT_FORMATS, default="csv",
+                        help="Output format for entries without output_format (compressed CSV or Parquet)")
+    parser.add_argument("--delta", action="store_true",
+                        help="Also write the rows added, changed and removed since the previous output")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Print the conversion log of every file")
+    args = parser.parse_args(argv)
+
+    try:
+        # The same date for every entry, even when the batch runs past midnight
+        rates_date = parse_rates_date(args.rates_date).isoformat()
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+    try:
+        jobs = load_manifest(args.manifest, args.output_dir, args.config_dir,
+                             args.streaming, args.batch_size, args.cache_dir, args.cache_size_mb,
+                             args.max_rows, args.max_size_mb, args.write_workers, args.metrics, args.profile,
+                             args.reader, args.output_format, args.delta, args.pipeline, args.canonical_articles,
+                             args.currency_rates, rates_date)
+    except (OSError, ValueError) as e:
+        print(f"Error reading manifest: {e}", file=sys.stderr)
+        return 2
+
+    started = time.perf_counter()
+    results = run_batch(jobs, args.workers, args.verbose)
+    failed = [r for r in results if not r["ok"]]
+    print(f"Converted {len(results) - len(failed)}/{len(results)} files in {time.perf_counter() - started:.2f}s"
+          + (f", {len(failed)} failed" if failed else ""))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,218 @@
+"""On-disk cache of parsed input columns, so re-converting an unchanged file skips parsing it."""
+import hashlib
+import json
+import os
+import pickle
+import shutil
+from pathlib import Path
+
+import pandas as pd
+
+DEFAULT_CACHE_DIR = "cache"
+DEFAULT_CACHE_SIZE_MB = 1024
+META_FILE = "meta.json"
+HEADER_FILE = "header.pkl"
+
+
+def file_fingerprint(input_path, sheet_name=0, backend=None):
+    """Identify an input file by its resolved path, size, modification time, sheet and XLSX reader backend.
+
+    Backends may parse the same cell differently (e.g. 5 or 5.0), so each
+    keeps its own entry.
+    """
+    input_path = Path(input_path).resolve()
+    stat = input_path.stat()
+    return {"path": str(input_path), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sheet": sheet_name,
+            "backend": backend}
+
+
+def _column_file(col_index):
+    return f"col_{col_index}.pkl"
+
+
+def _write_atomic(path, obj):
+    """Pickle obj to path so concurrent readers never see a half-written file"""
+    temp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(temp_path, 'wb') as f:
+        pickle.dump(obj, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temp_path, path)
+
+
+class InputCache:
+    """Parsed input columns stored one file per column, evicted least recently used first.
+
+    Entries are keyed by the input's fingerprint, so a file that is modified or
+    replaced is parsed again. Columns are stored separately, which lets a
+    conversion that maps only a few columns reuse (and extend) the entry that an
+    earlier conversion or file analysis created. Cache problems are logged and
+    never fail a conversion.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_size_mb=DEFAULT_CACHE_SIZE_MB, log=None):
+        self.cache_dir = Path(cache_dir)
+        self.max_size_mb = max_size_mb
+        self.log = log
+
+    def log_message(self, message):
+        if self.log:
+            self.log(message)
+
+    def _entry_dir(self, fingerprint):
+        key = hashlib.sha1(json.dumps(fingerprint, sort_keys=True).encode('utf-8')).hexdigest()
+        return self.cache_dir / key
+
+    def _open_entry(self, input_path, sheet_name, backend):
+        """Return (entry_dir, fingerprint, meta) for an input; meta is None when nothing is cached"""
+        fingerprint = file_fingerprint(input_path, sheet_name, backend)
+        entry_dir = self._entry_dir(fingerprint)
+        try:
+            with open(entry_dir / META_FILE, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return entry_dir, fingerprint, None
+        if not isinstance(meta, dict) or meta.get("fingerprint") != fingerprint:
+            return entry_dir, fingerprint, None
+        return entry_dir, fingerprint, meta
+
+    def _touch(self, entry_dir):
+        try:
+            os.utime(entry_dir / META_FILE)
+        except OSError:
+            pass
+
+    def _discard(self, entry_dir, error):
+        """Log an entry that cannot be loaded and delete it, so that it is built again"""
+        self.log_message(f"Warning: Discarding unreadable input cache entry {entry_dir.name}: {str(error)}")
+        shutil.rmtree(entry_dir, ignore_errors=True)
+
+    def header(self, input_path, parse_header, sheet_name=0, backend=None):
+        """Return the input's column names, calling parse_header() only if they are not cached"""
+        try:
+            entry_dir, fingerprint, meta = self._open_entry(input_path, sheet_name, backend)
+        except OSError:
+            meta = None
+        if meta and meta.get("has_header"):
+            try:
+                with open(entry_dir / HEADER_FILE, 'rb') as f:
+                    columns = pickle.load(f)
+            except Exception as e:
+                self._discard(entry_dir, e)
+            else:
+                self._touch(entry_dir)
+                return columns
+
+        columns = parse_header()
+        self._update(input_path, sheet_name, backend, header=columns)
+        return columns
+
+    def read(self, input_path, parse, usecols=None, sheet_name=0, backend=None):
+        """Return the parsed input (only the usecols positions if given), calling parse(usecols) for missing columns"""
+        try:
+            entry_dir, fingerprint, meta = self._open_entry(input_path, sheet_name, backend)
+        except OSError:
+            return parse(usecols)
+
+        wanted = usecols
+        if wanted is None and meta and meta.get("has_header"):
+            wanted = range(meta["num_columns"])
+        if wanted is None:
+            # Width unknown until the whole file is parsed once
+            df = parse(None)
+            self._update(input_path, sheet_name, backend, header=df.columns,
+                         columns=dict(enumerate(df[col] for col in df.columns)), num_rows=len(df))
+            return df
+        wanted = sorted(set(wanted))
+
+        cached = self._load_columns(entry_dir, meta, wanted)
+        missing = [i for i in wanted if i not in cached]
+        if missing:
+            parsed = parse(missing)
+            if cached and len(parsed) != meta["num_rows"]:
+                # Should not happen for an unchanged file; parse everything rather than mix shapes
+                cached = {}
+                missing = wanted
+                parsed = parse(wanted)
+            new_columns = dict(zip(missing, (parsed.iloc[:, position] for position in range(len(missing)))))
+            cached.update(new_columns)
+            self._update(input_path, sheet_name, backend, columns=new_columns, num_rows=len(parsed))
+        else:
+            self._touch(entry_dir)
+            self.log_message(f"Loaded {len(wanted)} parsed columns from cache")
+
+        if not wanted:
+            return pd.DataFrame(index=pd.RangeIndex(meta["num_rows"] if meta else 0))
+        return pd.concat([cached[i] for i in wanted], axis=1)
+
+    def _load_columns(self, entry_dir, meta, wanted):
+        cached = {}
+        if not meta:
+            return cached
+        stored = set(meta.get("columns", []))
+        for col_index in wanted:
+            if col_index not in stored:
+                continue
+            try:
+                with open(entry_dir / _column_file(col_index), 'rb') as f:
+                    cached[col_index] = pickle.load(f)
+            except Exception as e:
+                # Parse every wanted column again rather than trust the rest of the entry
+                self._discard(entry_dir, e)
+                return {}
+        return cached
+
+    def _update(self, input_path, sheet_name, backend, header=None, columns=None, num_rows=None):
+        """Add a header and/or columns to the entry for an input, then evict old entries"""
+        try:
+            entry_dir, fingerprint, meta = self._open_entry(input_path, sheet_name, backend)
+            if meta is None or (num_rows is not None and meta.get("num_rows") not in (None, num_rows)):
+                shutil.rmtree(entry_dir, ignore_errors=True)
+                meta = {"fingerprint": fingerprint, "num_rows": None, "has_header": False, "columns": []}
+            entry_dir.mkdir(parents=True, exist_ok=True)
+
+            if header is not None:
+                _write_atomic(entry_dir / HEADER_FILE, header)
+                meta["has_header"] = True
+                meta["num_columns"] = len(header)
+            for col_index, values in (columns or {}).items():
+                _write_atomic(entry_dir / _column_file(col_index), values)
+            if columns:
+                meta["columns"] = sorted(set(meta["columns"]) | set(columns))
+            if num_rows is not None:
+                meta["num_rows"] = num_rows
+
+            temp_meta = entry_dir / f"{META_FILE}.{os.getpid()}.tmp"
+            with open(temp_meta, 'w', encoding='utf-8') as f:
+                json.dump(meta, f)
+            os.replace(temp_meta, entry_dir / META_FILE)
+            self.evict()
+        except Exception as e:
+            self.log_message(f"Warning: Could not update input cache: {str(e)}")
+
+    def evict(self):
+        """Delete least recently used entries until the cache fits in max_size_mb"""
+        if not self.cache_dir.exists():
+            return
+        entries = []
+        total_size = 0
+        for entry_dir in self.cache_dir.iterdir():
+            if not entry_dir.is_dir():
+                continue
+            size = 0
+            for f in entry_dir.iterdir():
+                try:
+                    size += f.stat().st_size
+                except OSError:
+                    continue
+            try:
+                last_used = (entry_dir / META_FILE).stat().st_mtime
+            except OSError:
+                last_used = 0
+            entries.append((last_used, size, entry_dir))
+            total_size += size
+
+        max_size = self.max_size_mb * 1024 * 1024
+        for last_used, size, entry_dir in sorted(entries, key=lambda entry: entry[0]):
+            if total_size <= max_size:
+                break
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            total_size -= size
@@ -0,0 +1,1069 @@
+import cProfile
+import importlib.util
+import json
+import os
+import platform
+import pstats
+import re
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass, replace
+from functools import partial
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .backends import AUTO_BACKEND, open_excel_file, resolve_backend
+from .cache import DEFAULT_CACHE_SIZE_MB, InputCache
+from .currency import CurrencyRates, parse_rates_date
+from .delta import DeltaIndex, DeltaWriter, find_previous_output
+from .detection import detect_columns
+from .metrics import StageMetrics
+from .output import (
+    MAX_ROWS,
+    MAX_SIZE_MB,
+    check_output_format,
+    open_split_writer,
+    output_parts,
+    read_output_parts,
+    write_csv_with_lead_time,
+)
+from .pipeline import BackgroundWriter, BatchReader, call_in_child
+from .progress import ProgressTracker
+from .readers import (
+    count_csv_rows,
+    count_sheet_rows,
+    csv_batch_dtype,
+    iter_csv_batches,
+    iter_sheet_batches,
+    list_sheet_names,
+    read_csv_header,
+    scan_csv_dtypes,
+    scan_sheet,
+)
+from .registry import DEFAULT_CONFIG_DIR
+
+# Fixed 7-column template structure used by every conversion
+OUTPUT_COLUMNS = ["Lead Time", "Brand Name", "Article", "Quantity", "MOQ", "MSRP", "Price"]
+TEXT_COLUMNS = ['Brand Name', 'Article']
+NUMERIC_COLUMNS = ['Quantity', 'MOQ', 'MSRP', 'Price']
+PRICE_COLUMNS = ['MSRP', 'Price']
+
+# Optional input column naming each row's currency; read for conversion, never written
+CURRENCY_COLUMN = "Currency"
+
+# Rows read when a file is analyzed on Browse; detection only needs a sample
+ANALYSIS_SAMPLE_ROWS = 1000
+
+# Characters dropped from canonical article numbers, e.g. "0 986-452.041" → "0986452041"
+ARTICLE_SEPARATORS = " \t\u00a0-./\\_"
+ARTICLE_SEPARATOR_TABLE = str.maketrans("", "", ARTICLE_SEPARATORS)
+
+# Cleaned Brand Name of every brand seen by this process, shared by all the files (and
+# batches) it converts; a price list has a few hundred brands, so the cache stays small
+_BRAND_MEMO = {}
+BRAND_MEMO_MAX_ENTRIES = 100000
+
+
+@dataclass
+class ConversionSettings:
+    """Everything a single conversion needs, independent of any UI"""
+    input_file: str
+    output_directory: str
+    lead_time: str = "0"
+    supplier_config: str = ""
+    currency_rate: str = ""
+    markup_percentage: str = ""
+    currency_rates: str = ""  # rates file (CSV/JSON) for configs that map a Currency column
+    rates_date: str = ""  # YYYY-MM-DD the rates are taken on (default: today)
+    bypass_template: bool = False
+    auto_detect_columns: bool = True
+    canonical_articles: bool = False  # uppercase Article and drop separators (spaces, - . / \ _)
+    config_dir: str = DEFAULT_CONFIG_DIR
+    streaming: bool = False
+    batch_size: int = 50000
+    pipeline: bool = False  # streaming: read, convert and write batches concurrently
+    cache_dir: str = ""  # empty disables the parsed-input cache
+    cache_size_mb: int = DEFAULT_CACHE_SIZE_MB
+    max_rows: int = MAX_ROWS  # per output part
+    max_size_mb: float = MAX_SIZE_MB  # per output part
+    write_workers: int = 1  # processes encoding output rows in parallel
+    sheet_name: object = 0  # worksheet to convert (index or name)
+    all_sheets: bool = False  # convert every worksheet instead of sheet_name
+    sheet_outputs: bool = False  # with all_sheets: one output per sheet instead of a combined one
+    sheet_workers: int = None  # processes converting sheets (default: CPU count)
+    metrics: bool = False  # write a per-stage metrics report next to the output
+    profile: bool = False  # also dump a cProfile profile next to the output
+    reader_backend: str = AUTO_BACKEND  # XLSX reader: "auto", "calamine" or "openpyxl"
+    output_format: str = "csv"  # "csv", "csv.gz", "csv.zst" or "parquet"
+    delta: bool = False  # also write the rows added, changed and removed since the previous output
+    delta_from: str = ""  # previous output to diff against (default: the output being replaced)
+    interruptible_read: bool = False  # read a whole input in a child process, so cancelling stops the read
+
+
+def resolve_config_path(supplier_config, config_dir=DEFAULT_CONFIG_DIR):
+    """Return the JSON file for a supplier config given its name or a direct path"""
+    candidate = Path(supplier_config)
+    if candidate.suffix.lower() == '.json' and candidate.exists():
+        return candidate
+    return Path(config_dir) / f"{supplier_config}.json"
+
+
+def load_supplier_config(supplier_config, config_dir=DEFAULT_CONFIG_DIR):
+    """Load a supplier column mapping from the configs directory"""
+    config_file = resolve_config_path(supplier_config, config_dir)
+    with open(config_file, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def sheet_mapping(config, sheet_name):
+    """Return the column mapping of a config for one worksheet.
+
+    A config may hold per-sheet mappings under "sheets" (sheet name → mapping);
+    sheets without one use the config's own workbook-wide mapping.
+    """
+    sheets = config.get("sheets") or {}
+    if isinstance(sheet_name, str) and sheet_name in sheets:
+        return sheets[sheet_name]
+    return {col: value for col, value in config.items() if col != "sheets"}
+
+
+class InputReader:
+    """Reads the header, a sample or selected columns of one XLSX or CSV input file.
+
+    An XLSX workbook is opened at most once per reader, however many reads
+    follow, and not at all when an InputCache already holds what is asked for.
+    It is opened with the requested reader backend, or the next one that can
+    open it (see pricelist.backends); ``backend_used`` tells which one did.
+    """
+
+    def __init__(self, input_path, log=None, cache=None, sheet_name=0, backend=AUTO_BACKEND):
+        self.input_path = Path(input_path)
+        self.log = log
+        self.cache = cache
+        self.sheet_name = sheet_name
+        self.backend = backend
+        self.backend_used = None
+        self.is_excel = self.input_path.suffix.lower() == '.xlsx'
+        # Cached columns are only reused by the backend that parsed them
+        self.cache_backend = resolve_backend(backend) if self.is_excel else None
+        self._excel_file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        if self._excel_file is not None:
+            self._excel_file.close()
+            self._excel_file = None
+
+    def excel_file(self):
+        if self._excel_file is None:
+            self._excel_file, self.backend_used = open_excel_file(self.input_path, self.backend, self.log)
+            if len(self._excel_file.sheet_names) > 1 and self.sheet_name == 0 and self.log:
+                self.log(f"Multiple sheets found: {self._excel_file.sheet_names} "
+                         f"(converting the first; enable all sheets to convert every one)")
+        return self._excel_file
+
+    def _parse(self, usecols=None, nrows=None):
+        if self.is_excel:
+            return self.excel_file().parse(self.sheet_name, usecols=usecols, nrows=nrows)
+        return pd.read_csv(self.input_path, usecols=usecols, nrows=nrows)
+
+    def header(self):
+        """Return the column names without reading any rows"""
+        if self.cache is not None:
+            return self.cache.header(self.input_path, lambda: self._parse(nrows=0).columns, self.sheet_name,
+                                     self.cache_backend)
+        return self._parse(nrows=0).columns
+
+    def sample(self, nrows):
+        """Return the first nrows data rows with all columns"""
+        return self._parse(nrows=nrows)
+
+    def read(self, usecols=None):
+        """Return all rows, optionally only the usecols positions.
+
+        With an InputCache, columns parsed earlier are loaded from disk and only
+        the rest are parsed (and added to the cache).
+        """
+        if self.cache is not None:
+            return self.cache.read(self.input_path, self._parse, usecols, self.sheet_name, self.cache_backend)
+        return self._parse(usecols)
+
+
+def read_input_columns(input_path, usecols, sheet_name=0, backend=AUTO_BACKEND, cache_dir="",
+                       cache_size_mb=DEFAULT_CACHE_SIZE_MB, log_workbook=True):
+    """Read the usecols of an input in a child process (see ConversionEngine.read_in_child).
+
+    Returns the rows, the reader backend that opened the workbook and the
+    messages logged meanwhile; log_workbook=False leaves out the workbook
+    messages the parent already logged when it opened the file for the header.
+    """
+    messages = []
+    cache = InputCache(cache_dir, cache_size_mb, messages.append) if cache_dir else None
+    with InputReader(input_path, messages.append if log_workbook else None, cache, sheet_name, backend) as reader:
+        return reader.read(usecols), reader.backend_used, messages
+
+
+def read_input_file(input_path, log=None, usecols=None, cache=None, backend=AUTO_BACKEND):
+    """Read an XLSX or CSV input file into a DataFrame, optionally only the usecols positions"""
+    with InputReader(input_path, log, cache, backend=backend) as reader:
+        return reader.read(usecols)
+
+
+def read_input_header(input_path, cache=None, backend=AUTO_BACKEND):
+    """Return the column names of an XLSX or CSV input file without reading its rows"""
+    with InputReader(input_path, cache=cache, backend=backend) as reader:
+        return reader.header()
+
+
+def read_input_sample(input_path, nrows=ANALYSIS_SAMPLE_ROWS, backend=AUTO_BACKEND):
+    """Return the header and first nrows rows of an input file, for analysis"""
+    with InputReader(input_path, backend=backend) as reader:
+        return reader.sample(nrows)
+
+
+def count_input_rows(input_path):
+    """Return (row_count, exact) for an input file without parsing its cells.
+
+    XLSX files report the size recorded in the sheet's dimension when present
+    (which may include trailing empty rows); otherwise rows are counted. CSV
+    files count line breaks, so quoted values spanning lines are overcounted.
+    """
+    input_path = Path(input_path)
+    if input_path.suffix.lower() == '.xlsx':
+        return count_sheet_rows(input_path)
+    return count_csv_rows(input_path)
+
+
+def column_letter_index(column_letter):
+    """Convert column letter to index (A=0, B=1, ..., Z=25, AA=26, AB=27, etc.)"""
+    if not column_letter or not column_letter.isascii() or not column_letter.isalpha():
+        raise ValueError(f"expected letters A-Z, got '{column_letter}'")
+    col_index = 0
+    for letter in column_letter.upper():
+        col_index = col_index * 26 + (ord(letter) - ord('A') + 1)
+    return col_index - 1
+
+
+def column_index_letter(col_index):
+    """Convert column index to letter (0=A, 25=Z, 26=AA, etc.)"""
+    column_letter = ""
+    col_index += 1
+    while col_index:
+        col_index, remainder = divmod(col_index - 1, 26)
+        column_letter = chr(ord('A') + remainder) + column_letter
+    return column_letter
+
+
+def detected_column_letters(columns, detected_columns):
+    """Turn detected columns (output column → header name) into a mapping to column letters.
+
+    Headers that columns does not contain are left out; of duplicate headers
+    the first one is used.
+    """
+    positions = {}
+    for i, name in enumerate(columns):
+        positions.setdefault(name, i)
+    return {output_col: column_index_letter(positions[name])
+            for output_col, name in detected_columns.items() if name in positions}
+
+
+def select_plan_columns(plan):
+    """Return the sorted input positions a column plan needs and the plan relative to that selection"""
+    indices = sorted({i for i in plan.values() if i is not None})
+    positions = {col_index: position for position, col_index in enumerate(indices)}
+    relative_plan = {col: (None if i is None else positions[i]) for col, i in plan.items()}
+    return indices, relative_plan
+
+
+def map_columns(df, plan):
+    """Build the output frame from the planned input column positions"""
+    output_df = pd.DataFrame(columns=OUTPUT_COLUMNS)
+    for output_col in OUTPUT_COLUMNS:
+        col_index = plan.get(output_col)
+        if col_index is None:
+            output_df[output_col] = ""
+        else:
+            output_df[output_col] = df.iloc[:, col_index]
+
+    # Lead time is only in A1 cell, not in data rows
+    # Remove the Lead Time column from data rows
+    if "Lead Time" in output_df.columns:
+        output_df = output_df.drop("Lead Time", axis=1)
+    return output_df
+
+
+def clean_output(output_df, canonical_articles=False):
+    """Normalize a mapped output frame: numeric columns to rounded floats, text columns to clean strings.
+
+    With canonical_articles, Article numbers are uppercased and stripped of separators.
+    """
+    # Round numeric columns to 2 decimal places; they stay float64 until written
+    for col in NUMERIC_COLUMNS:
+        if col in output_df.columns:
+            # Convert to numeric, handling any non-numeric values
+            numeric_values = pd.to_numeric(output_df[col], errors='coerce').astype('float64')
+            output_df[col] = numeric_values.round(2)
+
+    # Clean up text columns - remove extra spaces
+    if "Brand Name" in output_df.columns:
+        output_df["Brand Name"] = clean_text(output_df["Brand Name"], memo=_BRAND_MEMO, categorical=True)
+    if "Article" in output_df.columns:
+        output_df["Article"] = clean_text(output_df["Article"], canonical=canonical_articles)
+    return output_df
+
+
+def canonical_article(text):
+    """Uppercase an article number and drop its separators"""
+    return text.upper().translate(ARTICLE_SEPARATOR_TABLE)
+
+
+def clean_text(values, canonical=False, memo=None, categorical=False):
+    """Clean a text column: str(value) with whitespace stripped and runs of it collapsed to one space.
+
+    Missing values and 'nan' become ''; with canonical, article numbers are
+    also canonicalized. The column is factorized and each distinct value is
+    cleaned once, so a column of a few hundred brands costs a few hundred
+    string operations however many rows it has. memo (a dict) keeps cleaned
+    values across calls. Returns an object array, or a Categorical with
+    categorical.
+    """
+    codes, uniques = pd.factorize(values)
+    if uniques.dtype == object and len({type(value) for value in uniques} - {str}) > 1:
+        # 1, 1.0 and True are one value to factorize but three texts; go by text instead
+        codes, uniques = pd.factorize(values.astype(str))
+    texts = pd.Series(uniques).astype(str).to_numpy(dtype=object)
+    cleaned = np.empty(len(texts) + 1, dtype=object)
+    cleaned[-1] = ""  # missing values (code -1)
+    pending = np.arange(len(texts))
+    if memo is not None:
+        cleaned[:-1] = [memo.get(value) if type(value) is str else None for value in uniques]
+        pending = np.flatnonzero(cleaned[:-1] == None)  # noqa: E711 (elementwise)
+    fresh = [" ".join(text.split()) for text in texts[pending]]
+    fresh = ["" if text == "nan" else text for text in fresh]
+    if canonical:
+        fresh = [canonical_article(text) for text in fresh]
+    cleaned[pending] = fresh
+    if memo is not None:
+        for i, text in zip(pending, fresh):
+            if type(uniques[i]) is str and len(memo) < BRAND_MEMO_MAX_ENTRIES:
+                memo[uniques[i]] = text
+    if categorical:
+        # Values that differ only in spacing clean to the same category
+        category_codes, categories = pd.factorize(cleaned)
+        return pd.Categorical.from_codes(category_codes[codes], categories)
+    return cleaned[codes]
+
+
+def apply_pricing(output_df, rate=None, markup=None):
+    """Apply currency conversion, then markup, to MSRP and Price in one vectorized pass.
+
+    rate is one rate for every row or an array with the rate of each row.
+    Each step is rounded to 2 decimal places, so the result matches applying
+    currency conversion and markup one after the other.
+    """
+    if np.ndim(rate) == 0 and not rate and not markup:
+        return output_df
+    # Markup: Price = Price * (1 + Markup/100)
+    markup_multiplier = 1 + (markup / 100) if markup else None
+    for col in PRICE_COLUMNS:
+        if col in output_df.columns:
+            values = output_df[col].to_numpy(dtype='float64')
+            if np.ndim(rate) or rate:
+                values = np.round(values * rate, 2)
+            if markup_multiplier:
+                values = np.round(values * markup_multiplier, 2)
+            output_df[col] = values
+    return output_df
+
+
+def arrow_strings_available():
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+def compact_output(output_df):
+    """Hold a processed frame in compact dtypes until it is written.
+
+    Brand Name becomes categorical (a list has a few hundred brands) and
+    Article an Arrow-backed string column when pyarrow is installed; the
+    numeric columns stay float64. The writers format the amounts as text
+    (format_amounts) only while encoding each block of rows.
+    """
+    if "Brand Name" in output_df.columns:
+        output_df["Brand Name"] = output_df["Brand Name"].astype("category")
+    if "Article" in output_df.columns and arrow_strings_available():
+        output_df["Article"] = output_df["Article"].astype("string[pyarrow]")
+    return output_df
+
+
+class ConversionEngine:
+    """Runs the read → process → write conversion without any Tk dependency"""
+
+    def __init__(self, settings, log=None, progress=None):
+        self.settings = settings
+        self.log = log
+        self.progress = progress or ProgressTracker()
+        self.metrics = StageMetrics(enabled=settings.metrics)
+        self.cache = None
+        if settings.cache_dir:
+            self.cache = InputCache(settings.cache_dir, settings.cache_size_mb, self.log_message)
+
+    def log_message(self, message):
+        if self.log:
+            self.log(message)
+
+    def uses_original_columns(self, detected_columns=None):
+        """True when the mapping is built from the input's own column names"""
+        settings = self.settings
+        return settings.bypass_template and not (settings.auto_detect_columns and detected_columns)
+
+    def load_config(self, detected_columns=None, columns=None):
+        """Determine the column mapping source for this conversion"""
+        settings = self.settings
+        if settings.bypass_template:
+            # Use auto-detected columns or original column names
+            if not self.uses_original_columns(detected_columns):
+                self.log_message("Using auto-detected column mapping")
+                return detected_columns
+            # Create config that maps original columns to themselves
+            config = {}
+            for col in columns:
+                config[col] = col
+            self.log_message("Using original column names (bypassing template)")
+            return config
+
+        # Load configuration from file
+        config = load_supplier_config(settings.supplier_config, settings.config_dir)
+        self.log_message(f"Loaded configuration: {settings.supplier_config}")
+        return sheet_mapping(config, settings.sheet_name)
+
+    def convert_file(self, input_dataframe=None, detected_columns=None):
+        """Convert the configured input file and return the list of created files"""
+        profiler = cProfile.Profile() if self.settings.profile else None
+        if profiler:
+            profiler.enable()
+        try:
+            created_files = self.run_conversion(input_dataframe, detected_columns)
+        finally:
+            if profiler:
+                profiler.disable()
+        if self.settings.metrics or profiler:
+            self.write_reports(created_files, detected_columns, profiler)
+        return created_files
+
+    def run_conversion(self, input_dataframe=None, detected_columns=None):
+        settings = self.settings
+        self.log_message("Starting conversion...")
+        # A missing compression or Parquet package should fail before the input is read
+        check_output_format(settings.output_format)
+
+        if settings.all_sheets and Path(settings.input_file).suffix.lower() == '.xlsx':
+            return self.convert_all_sheets()
+
+        if settings.streaming or settings.pipeline:
+            return self.convert_file_streaming(detected_columns)
+
+        processed_data = self.process_input(input_dataframe, detected_columns)
+        self.progress.check_cancelled()
+
+        # Generate output
+        self.progress.stage("Writing output", total_rows=len(processed_data))
+        with self.metrics.stage("output", rows=len(processed_data)):
+            created_files = self.generate_output(processed_data, settings.input_file)
+
+        self.log_message("Conversion completed successfully!")
+        return created_files
+
+    def read_in_child(self, reader, usecols):
+        """Read the usecols of the input in a child process, so that cancelling stops the read at once.
+
+        pandas cannot interrupt a whole-file read. The rows are pickled back to
+        this process, which takes time and briefly holds them twice, so this is
+        only done when settings.interruptible_read asks for it.
+        """
+        settings = self.settings
+        # The requested backend, so that the child uses the same cache entry
+        read = partial(read_input_columns, reader.input_path, usecols, reader.sheet_name, reader.backend,
+                       settings.cache_dir, settings.cache_size_mb, log_workbook=reader.backend_used is None)
+        df, backend_used, messages = call_in_child(read, self.progress)
+        reader.backend_used = reader.backend_used or backend_used
+        for message in messages:
+            self.log_message(message)
+        return df
+
+    def process_input(self, input_dataframe=None, detected_columns=None):
+        """Read (unless input_dataframe is given) and transform the input; return the output frame"""
+        settings = self.settings
+        if input_dataframe is not None:
+            df = input_dataframe
+            config = self.load_config(detected_columns, df.columns)
+            self.log_message(f"Input file loaded: {len(df)} rows, {len(df.columns)} columns")
+
+            # Process data
+            processed_data = self.process_dataframe(df, config, detected_columns)
+        else:
+            with InputReader(settings.input_file, self.log_message, self.cache, settings.sheet_name,
+                             settings.reader_backend) as reader:
+                # Resolve the mapping from the header first so only mapped columns are parsed
+                with self.metrics.stage("read header"):
+                    columns = reader.header()
+                config = self.load_config(detected_columns, columns)
+                config = self.resolve_mapping(columns, config, detected_columns)
+                plan = self.column_plan(columns, config)
+                usecols, relative_plan = select_plan_columns(plan)
+                if not usecols:
+                    # Nothing to read; column_plan has said so
+                    return self.transform(pd.DataFrame(), relative_plan)
+
+                self.progress.stage("Reading input")
+                with self.metrics.stage("read") as stage:
+                    if settings.interruptible_read:
+                        df = self.read_in_child(reader, usecols)
+                    else:
+                        df = reader.read(usecols)
+                    stage["rows_out"] = len(df)
+                self.progress.check_cancelled()
+            self.log_message(f"Input file loaded: {len(df)} rows, {len(columns)} columns "
+                             f"({len(usecols)} parsed)"
+                             + (f" with the {reader.backend_used} reader" if reader.backend_used else ""))
+
+            # Process data
+            self.progress.stage("Converting", total_rows=len(df))
+            processed_data = self.transform(df, relative_plan)
+        return processed_data
+
+    def convert_all_sheets(self):
+        """Convert every worksheet in its own worker process.
+
+        Sheets are converted concurrently, but their results are collected in
+        workbook order, so the combined output (or the set of per-sheet
+        outputs) is the same however many workers run.
+        """
+        settings = self.settings
+        input_path = Path(settings.input_file)
+        sheet_names = list_sheet_names(input_path)
+        self.log_message(f"Converting {len(sheet_names)} sheets: {sheet_names}")
+        if settings.streaming and not settings.sheet_outputs:
+            self.log_message("Note: streaming applies only to one output per sheet; sheets are read in full")
+
+        jobs = [replace(settings, all_sheets=False, sheet_name=name) for name in sheet_names]
+        workers = min(settings.sheet_workers or os.cpu_count() or 1, max(len(jobs), 1))
+        writer = None if settings.sheet_outputs else self.open_writer(input_path)
+        created_files = []
+        failed = []
+        executor = ProcessPoolExecutor(max_workers=workers)
+        futures = [executor.submit(convert_sheet, job, not settings.sheet_outputs) for job in jobs]
+        try:
+            for done_sheets, (sheet_name, future) in enumerate(zip(sheet_names, futures)):
+                self.progress.stage(f"Converting sheets ({done_sheets}/{len(sheet_names)} done)")
+                # Wait in short steps so a cancel request is noticed quickly
+                while not wait([future], timeout=0.2, return_when=FIRST_COMPLETED).done:
+                    self.progress.check_cancelled()
+                self.progress.check_cancelled()
+                result, log, error = future.result()
+                for line in log:
+                    self.log_message(f"[{sheet_name}] {line}")
+                if error:
+                    self.log_message(f"[{sheet_name}] ERROR: {error}")
+                    failed.append(sheet_name)
+                elif writer is None:
+                    created_files.extend(result)
+                else:
+                    writer.write(result)
+            if writer is not None:
+                created_files = writer.close()
+        except BaseException:
+            if writer is not None:
+                writer.abort()
+            # Sheets still running write their own files; remove those once they finish
+            for future in futures:
+                future.add_done_callback(_remove_sheet_outputs)
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+        executor.shutdown()
+
+        if failed:
+            remove_files(created_files)
+            raise ValueError(f"Conversion failed for sheets: {', '.join(map(str, failed))}")
+        self.log_message("Conversion completed successfully!")
+        return created_files
+
+    def convert_file_streaming(self, detected_columns=None):
+        """Convert the input in fixed-size row batches so memory stays bounded.
+
+        Each batch goes through mapping, cleaning, currency and markup and is
+        appended straight to the CSV output, so the first output rows are
+        written long before the whole input has been read. With
+        settings.pipeline the batches are read in a child process and written
+        on a background thread while this thread converts, so reading,
+        converting and writing overlap.
+        """
+        settings = self.settings
+        input_path = Path(settings.input_file)
+        self.log_message(f"Streaming input file in batches of {settings.batch_size:,} rows")
+
+        if input_path.suffix.lower() == '.xlsx':
+            config, columns, num_rows, read_batches = self.open_sheet_stream(input_path, detected_columns)
+            self.log_message(f"Input file loaded: {num_rows} rows, {len(columns)} columns")
+        else:
+            config, columns, num_rows, read_batches = self.open_csv_stream(input_path, detected_columns)
+            self.log_message(f"Input file opened: {len(columns)} columns")
+
+        config = self.resolve_mapping(columns, config, detected_columns)
+        plan = self.column_plan(columns, config)
+        rate = self.parse_currency_rate()
+        rates = self.load_currency_rates(plan, rate)
+        if rate and rates is None:
+            self.log_message(f"Applying currency conversion with rate: {rate}")
+        markup = self.parse_markup()
+        if markup:
+            self.log_message(f"Applying markup of {markup}%")
+
+        # Only the mapped columns are parsed; positions are relative to that selection
+        indices, batch_plan = select_plan_columns(plan)
+        text_indices = [plan[col] for col in TEXT_COLUMNS + [CURRENCY_COLUMN] if plan.get(col) is not None]
+
+        self.progress.stage("Converting", total_rows=num_rows)
+        writer = self.open_writer(input_path)
+        pipelined = settings.pipeline and bool(indices)
+        if pipelined:
+            self.log_message("Pipelined: reading in a child process and writing on a background thread")
+            writer = BackgroundWriter(writer, self.metrics, progress=self.progress)
+            batches = BatchReader(partial(read_batches, indices, text_indices), progress=self.progress)
+        else:
+            batches = read_batches(indices, text_indices, self.progress) if indices else []
+        processed_rows = 0
+        try:
+            for batch in self.metrics.iterate("read", batches):
+                output_df = self.transform_batch(batch, batch_plan, rate, markup, rates)
+                if pipelined:
+                    writer.write(output_df)  # measured as "output" on the writer thread
+                else:
+                    with self.metrics.stage("output", rows=len(output_df)):
+                        writer.write(output_df)
+                processed_rows += len(output_df)
+            with self.metrics.stage("output"):
+                if processed_rows == 0:
+                    writer.write(map_columns(pd.DataFrame(), {}))
+                created_files = writer.close()
+        except BaseException:
+            writer.abort()
+            raise
+        finally:
+            if pipelined:
+                batches.close()
+
+        if rates is not None:
+            self.log_unknown_currencies(rates)
+        self.log_message(f"Processed {processed_rows} rows")
+        self.log_message("Conversion completed successfully!")
+        return created_files
+
+    def open_sheet_stream(self, input_path, detected_columns=None):
+        """Prepare batch reading of the configured worksheet of an XLSX file.
+
+        The sheet is read twice with openpyxl's read-only iterator: a scan pass
+        counts rows and infers the whole-column dtypes of the mapped columns so
+        that every batch parses exactly like pd.read_excel would. The output is
+        identical to the in-memory conversion. settings.reader_backend does not
+        apply: pandas' calamine reader loads a whole sheet at once.
+        """
+        settings = self.settings
+        sheet_names = list_sheet_names(input_path)
+        if len(sheet_names) > 1 and settings.sheet_name == 0:
+            self.log_message(f"Multiple sheets found: {sheet_names} "
+                             f"(converting the first; enable all sheets to convert every one)")
+
+        if settings.bypass_template:
+            # Detected or fallback mappings may pick any column by its header, so all of them are scanned
+            config = None
+            candidate_indices = None
+        else:
+            config = self.load_config(detected_columns)
+            candidate_indices = set()
+            for column_letter in config.values():
+                try:
+                    candidate_indices.add(column_letter_index(column_letter))
+                except (TypeError, AttributeError, ValueError):
+                    continue
+
+        # The sheet's recorded dimension is a cheap estimate of the rows to scan
+        self.progress.stage("Scanning input", total_rows=count_sheet_rows(input_path, settings.sheet_name)[0])
+        scan = scan_sheet(input_path, settings.sheet_name, candidate_indices, settings.batch_size, self.progress)
+        if config is None:
+            config = self.load_config(detected_columns, scan.columns)
+
+        read_batches = partial(read_sheet_batches, input_path, scan, settings.sheet_name, settings.batch_size)
+        return config, scan.columns, scan.num_rows, read_batches
+
+    def open_csv_stream(self, input_path, detected_columns=None):
+        """Prepare chunked reading of a CSV file.
+
+        The row count is not known in advance; the splitting writer does not
+        need it. The text columns (Brand Name, Article, Currency) are scanned
+        once before the chunks are read, so that every chunk parses them with
+        the dtype pd.read_csv infers for the whole file and the output is
+        identical to the in-memory conversion.
+        """
+        columns = list(read_csv_header(input_path))
+        config = self.load_config(detected_columns, columns)
+
+        read_batches = partial(read_csv_batches, input_path, columns, self.settings.batch_size)
+
+        # Line breaks give an upper bound on the rows, good enough for progress and ETA
+        num_rows, _ = count_csv_rows(input_path)
+        return config, columns, num_rows, read_batches
+
+    def resolve_mapping(self, columns, config, detected_columns=None):
+        """Apply the bypass-template rules to get the output column → column letter mapping"""
+        settings = self.settings
+        if not settings.bypass_template:
+            return config
+
+        # Bypass template: use auto-detected columns or intelligent mapping
+        if settings.auto_detect_columns and detected_columns:
+            # Detection names the input columns by header
+            config = detected_column_letters(columns, detected_columns)
+            for output_col in detected_columns.keys() - config.keys():
+                self.log_message(f"Warning: Detected column '{detected_columns[output_col]}' for {output_col} "
+                                 f"is not in the input")
+            return config
+
+        # Intelligent mapping based on column content and position
+        config = {}
+        lowered = [col.lower().strip() for col in columns]
+
+        for i, col in enumerate(lowered):
+            column_letter = column_index_letter(i)  # A, B, C, etc.
+
+            # Smart mapping based on column name patterns
+            if any(word in col for word in ['part', 'sku', 'code', 'article', 'item', 'product']):
+                config["Article"] = column_letter
+            elif any(word in col for word in ['brand', 'manufacturer', 'maker', 'mfg', 'company']):
+                config["Brand Name"] = column_letter
+            elif any(word in col for word in ['quantity', 'stock', 'qty', 'amount', 'count', 'available']):
+                config["Quantity"] = column_letter
+            elif any(word in col for word in ['moq', 'minimum', 'min']):
+                config["MOQ"] = column_letter
+            elif any(word in col for word in ['msrp', 'list', 'retail', 'recommended', 'suggested']):
+                config["MSRP"] = column_letter
+            elif any(word in col for word in ['price', 'cost', 'unit', 'selling']):
+                config["Price"] = column_letter
+            elif any(word in col for word in ['lead', 'delivery', 'time']):
+                config["Lead Time"] = column_letter
+
+        # Fallback to position-based mapping if smart mapping didn't work
+        if not config:
+            for i, col in enumerate(columns):
+                column_letter = column_index_letter(i)
+                if i == 0:  # First column - usually Article/Part Number
+                    config["Article"] = column_letter
+                elif i == 1:  # Second column - usually Brand
+                    config["Brand Name"] = column_letter
+                elif i == 2:  # Third column - usually Description (skip)
+                    continue
+                elif i == 3:  # Fourth column - usually Quantity
+                    config["Quantity"] = column_letter
+                elif i == 4:  # Fifth column - usually Price
+                    config["Price"] = column_letter
+                elif i == 5:  # Sixth column - usually MSRP or another price
+                    config["MSRP"] = column_letter
+
+        self.log_message("Using intelligent column mapping (bypassing template)")
+        return config
+
+    def column_plan(self, columns, config):
+        """Resolve each output column to an input column index (None when unmapped)"""
+        plan = {}
+        # Map columns based on configuration (using column letters); Currency only when the config maps it
+        planned_columns = OUTPUT_COLUMNS + ([CURRENCY_COLUMN] if CURRENCY_COLUMN in config else [])
+        for output_col in planned_columns:
+            plan[output_col] = None
+            if output_col in config:
+                column_letter = config[output_col].upper()
+                try:
+                    col_index = column_letter_index(column_letter)
+                    if 0 <= col_index < len(columns):
+                        plan[output_col] = col_index
+                        self.log_message(f"Mapped {output_col} → Column {column_letter} ({columns[col_index]})")
+                    else:
+                        self.log_message(f"Warning: Column '{column_letter}' is out of range (file has {len(columns)} columns)")
+                except Exception as e:
+                    self.log_message(f"Warning: Invalid column letter '{column_letter}': {str(e)}")
+            else:
+                self.log_message(f"Warning: No mapping found for '{output_col}'")
+        if all(col_index is None for col_index in plan.values()):
+            self.log_message("Warning: No columns were mapped - the output will have no rows")
+        return plan
+
+    def parse_currency_rate(self):
+        """Return the currency rate to apply, or None (logging why) when it is missing or invalid"""
+        currency_rate = self.settings.currency_rate.strip()
+        if not currency_rate:
+            return None
+        # Convert comma to dot for decimal separator
+        currency_rate_normalized = currency_rate.replace(',', '.')
+        try:
+            rate = float(currency_rate_normalized)
+        except ValueError:
+            self.log_message(f"ERROR: Invalid currency rate '{currency_rate}' - please use numbers only (e.g., 3.67 or 3,67) - skipping currency conversion")
+            return None
+        if rate > 0:
+            return rate
+        self.log_message(f"ERROR: Currency rate must be greater than 0 (entered: {currency_rate}) - skipping currency conversion")
+        return None
+
+    def load_currency_rates(self, plan, rate=None):
+        """Return the per-row CurrencyRates when plan maps a Currency column, else None.
+
+        The rates file is parsed once per process and reused while it is
+        unchanged. Rows with an empty currency cell get the file-wide rate.
+        """
+        settings = self.settings
+        if plan.get(CURRENCY_COLUMN) is None:
+            if settings.currency_rates:
+                self.log_message("Warning: a currency rates file is set but the config maps no Currency column "
+                                 "- converting every row with the currency rate")
+            return None
+        if not settings.currency_rates:
+            raise ValueError("The supplier config maps a Currency column; "
+                             "choose a currency rates file to convert its rows")
+        rates = CurrencyRates.load(settings.currency_rates, parse_rates_date(settings.rates_date))
+        self.log_message(f"Applying per-row currency conversion with the rates of {rates.on}: {rates.describe()}"
+                         + (f" (rows without a currency: {rate})" if rate else ""))
+        return rates
+
+    def log_unknown_currencies(self, rates):
+        for currency, rows in sorted(rates.unknown.items()):
+            self.log_message(f"Warning: no rate for currency '{currency}' on {rates.on} "
+                             f"- prices of {rows:,} rows left empty")
+
+    def parse_markup(self):
+        """Return the markup percentage to apply, or None (logging why) when it is missing or invalid"""
+        markup_percentage = self.settings.markup_percentage.strip()
+        if not markup_percentage:
+            return None
+        # Convert comma to dot for decimal separator
+        markup_percentage_normalized = markup_percentage.replace(',', '.')
+        try:
+            markup = float(markup_percentage_normalized)
+        except ValueError:
+            self.log_message(f"ERROR: Invalid markup percentage '{markup_percentage}' - please use numbers only (e.g., 15 or 15,5) - skipping markup calculation")
+            return None
+        if markup > 0:
+            return markup
+        self.log_message(f"ERROR: Markup percentage must be greater than 0 (entered: {markup_percentage}) - skipping markup calculation")
+        return None
+
+    def process_dataframe(self, df, config, detected_columns=None):
+        config = self.resolve_mapping(df.columns, config, detected_columns)
+        plan = self.column_plan(df.columns, config)
+        return self.transform(df, plan)
+
+    def transform(self, df, plan):
+        """Map, clean, convert currency and mark up the columns selected by plan"""
+        # Apply currency conversion and markup in strict order
+        # Step 1: Currency conversion (if rate > 0)
+        rate = self.parse_currency_rate()
+        rates = self.load_currency_rates(plan, rate)
+        if rate and rates is None:
+            self.log_message(f"Applying currency conversion with rate: {rate}")
+
+        # Step 2: Markup calculation (if percentage > 0)
+        markup = self.parse_markup()
+        if markup:
+            self.log_message(f"Applying markup of {markup}%")
+
+        output_df = self.transform_batch(df, plan, rate, markup, rates)
+        if rates is not None:
+            self.log_unknown_currencies(rates)
+        if rate or rates is not None:
+            self.log_message("Currency conversion completed")
+        if markup:
+            self.log_message("Markup calculation completed")
+
+        self.log_message(f"Processed {len(output_df)} rows")
+        return output_df
+
+    def transform_batch(self, df, plan, rate=None, markup=None, rates=None):
+        """Run the mapping, cleaning, pricing and compacting steps on a whole file or one batch.
+
+        With rates (CurrencyRates), each row is converted with the rate of its
+        Currency cell instead of rate.
+        """
+        metrics = self.metrics
+        with metrics.stage("map", rows=len(df)):
+            output_df = map_columns(df, plan)
+
+        # Clean up the data
+        with metrics.stage("clean", rows=len(output_df)):
+            output_df = clean_output(output_df, self.settings.canonical_articles)
+
+        # Currency conversion, then markup, each rounded to 2 decimals, in one pass over the prices
+        if rates is not None or rate or markup:
+            with metrics.stage("pricing", rows=len(output_df)):
+                if rates is not None:
+                    rate = rates.lookup(df.iloc[:, plan[CURRENCY_COLUMN]], default=rate)
+                output_df = apply_pricing(output_df, rate=rate, markup=markup)
+
+        # Numbers stay numeric; they are formatted as text only when written
+        with metrics.stage("compact", rows=len(output_df)):
+            output_df = compact_output(output_df)
+        return output_df
+
+    def output_base_name(self, input_path):
+        """Output file name (without extension) for input_path, including the sheet if one was named"""
+        sheet_name = self.settings.sheet_name
+        if isinstance(sheet_name, str):
+            safe_sheet_name = re.sub(r'[\\/:*?"<>|\s]+', '_', sheet_name).strip('_')
+            return f"{Path(input_path).stem}_{safe_sheet_name}_output"
+        return f"{Path(input_path).stem}_output"
+
+    def open_writer(self, input_path):
+        """Return the splitting writer (CSV, compressed CSV or Parquet) for the output of input_path.
+
+        In delta mode the writer also writes the rows added, changed and
+        removed since the previous output, which is read before anything is
+        overwritten.
+        """
+        base_name = self.output_base_name(input_path)
+        index = self.open_delta_index(base_name) if self.settings.delta else None
+        writer = self.split_writer(base_name, self.progress)
+        if index is None:
+            return writer
+        # Progress and cancellation follow the full output
+        return DeltaWriter(index, writer, lambda kind: self.split_writer(f"{base_name}_{kind}"), self.metrics,
+                           self.log_message, numeric_columns=NUMERIC_COLUMNS)
+
+    def split_writer(self, base_name, progress=None):
+        settings = self.settings
+        return open_split_writer(settings.output_format, settings.output_directory, base_name, settings.lead_time,
+                                 self.log_message, max_rows=settings.max_rows, max_size_mb=settings.max_size_mb,
+                                 workers=settings.write_workers, numeric_columns=NUMERIC_COLUMNS,
+                                 progress=progress, metrics=self.metrics)
+
+    def open_delta_index(self, base_name):
+        """Read and index the previous output: settings.delta_from, or the output about to be replaced"""
+        settings = self.settings
+        if settings.delta_from:
+            parts = output_parts(settings.delta_from)
+        else:
+            parts = find_previous_output(settings.output_directory, base_name, settings.output_format)
+        columns = [col for col in OUTPUT_COLUMNS if col != "Lead Time"]
+        with self.metrics.stage("delta index") as stage:
+            previous = read_output_parts(parts, columns)
+            index = DeltaIndex(previous)
+            stage["rows_out"] = len(previous)
+        if parts:
+            self.log_message(f"Delta mode: previous output has {len(previous):,} rows ({len(parts)} file(s))")
+        else:
+            self.log_message("Delta mode: no previous output found, every row counts as added")
+        return index
+
+    def generate_output(self, df, input_file_path):
+        """Write the processed data as one or more output files and return their paths"""
+        writer = self.open_writer(input_file_path)
+        try:
+            writer.write(df)
+            return writer.close()
+        except BaseException:
+            # Never leave partial parts behind
+            writer.abort()
+            raise
+
+    def write_reports(self, created_files, detected_columns=None, profiler=None):
+        """Write the metrics report (and profile) of this conversion next to its output files"""
+        settings = self.settings
+        base_path = Path(settings.output_directory) / self.output_base_name(settings.input_file)
+        report = {
+            "input_file": str(settings.input_file),
+            "output_files": [str(f) for f in created_files],
+            "settings": {
+                "streaming": settings.streaming,
+                "batch_size": settings.batch_size,
+                "pipeline": settings.pipeline,
+                "interruptible_read": settings.interruptible_read,
+                "canonical_articles": settings.canonical_articles,
+                "currency_rates": settings.currency_rates or None,
+                "rates_date": settings.rates_date or None,
+                "write_workers": settings.write_workers,
+                "sheet_name": settings.sheet_name,
+                "all_sheets": settings.all_sheets,
+                "cache": bool(settings.cache_dir),
+                "reader_backend": settings.reader_backend,
+                "output_format": settings.output_format,
+                "delta": settings.delta,
+            },
+            "detected_columns": detected_columns or None,
+            "environment": {
+                "python": platform.python_version(),
+                "pandas": pd.__version__,
+                "numpy": np.__version__,
+                "cpu_count": os.cpu_count(),
+            },
+        }
+        report.update(self.metrics.report())
+        if profiler:
+            profile_path = base_path.with_name(f"{base_path.name}_profile.prof")
+            profiler.dump_stats(profile_path)
+            # A readable summary as well, for machines without a profile viewer
+            with open(profile_path.with_suffix('.txt'), 'w', encoding='utf-8') as f:
+                pstats.Stats(profiler, stream=f).sort_stats('cumulative').print_stats(40)
+            report["profile"] = str(profile_path)
+            self.log_message(f"Profile written: {profile_path}")
+        if settings.metrics:
+            report_path = base_path.with_name(f"{base_path.name}_metrics.json")
+            with open(report_path, 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2, ensure_ascii=False, default=str)
+            self.log_message(f"Metrics report written: {report_path}")
+
+
+def read_sheet_batches(input_path, scan, sheet_name, batch_size, indices, text_indices, progress=None):
+    """Batches of a scanned worksheet holding the columns at indices (text columns parse like the scan)"""
+    return iter_sheet_batches(input_path, scan, indices, sheet_name, batch_size, progress)
+
+
+def read_csv_batches(input_path, columns, batch_size, indices, text_indices, progress=None):
+    """Batches of a CSV file holding the columns at indices (text columns parse like the whole file)"""
+    dtypes = scan_csv_dtypes(input_path, text_indices, batch_size, progress)
+    dtype = {columns[i]: csv_batch_dtype(d) for i, d in dtypes.items() if csv_batch_dtype(d) is not None}
+    return iter_csv_batches(input_path, indices, dtype, batch_size)
+
+
+def convert_sheet(settings, combine):
+    """Convert one worksheet in a worker process; return (result, log lines, error).
+
+    The result is the processed frame when the sheets are combined, otherwise
+    the files written for this sheet.
+    """
+    log = []
+    try:
+        engine = ConversionEngine(settings, log=log.append)
+        if combine:
+            return engine.process_input(), log, None
+        return engine.convert_file(), log, None
+    except Exception as e:
+        return None, log, str(e)
+
+
+def remove_files(paths):
+    """Delete output files, ignoring ones that are already gone"""
+    for path in paths:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def _remove_sheet_outputs(future):
+    """Done-callback for the sheets of a cancelled conversion: delete what they wrote"""
+    if future.cancelled() or future.exception() is not None:
+        return
+    result, log, error = future.result()
+    if isinstance(result, list):
+        remove_files(result)
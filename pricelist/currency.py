@@ -0,0 +1,210 @@
+"""Per-row currency conversion from a local table of exchange rates.
+
+A supplier config may map a ``Currency`` column next to the output columns
+(e.g. ``"Currency": "G"``). MSRP and Price of every row are then converted
+with the rate of the currency named in that row, instead of one rate for the
+whole file. Rates come from a CSV or JSON file of ``currency, rate, as_of``
+records; a currency's rate is its latest record dated on or before the
+conversion date, and undated records apply from any date.
+"""
+import csv
+import json
+from collections import Counter
+from datetime import date
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Parsed rates files of this process by (resolved path, size, modification time), so the
+# files of a batch (and the batches of a streamed file) share one parse
+_TABLES = {}
+
+
+def currency_code(value):
+    """Normalize a currency cell or record for lookup: ' eur ' → 'EUR'"""
+    return str(value).strip().upper()
+
+
+def parse_rate(value):
+    """Return a positive rate given as a number or as text with either decimal separator (3.67 or 3,67)"""
+    rate = float(str(value).strip().replace(',', '.'))
+    if not rate > 0:
+        raise ValueError(f"rate must be greater than 0 (got {value})")
+    return rate
+
+
+def parse_rates_date(text):
+    """Return the date rates are taken on: text as YYYY-MM-DD, or today when empty"""
+    text = str(text or "").strip()
+    if not text:
+        return date.today()
+    try:
+        return date.fromisoformat(text)
+    except ValueError:
+        raise ValueError(f"Invalid rates date '{text}' - use YYYY-MM-DD") from None
+
+
+def _json_records(data):
+    """Records of a JSON rates file: a list of records, or currency → rate (or → list of records)"""
+    if isinstance(data, list):
+        return data
+    if not isinstance(data, dict):
+        raise ValueError("expected a list of records or an object keyed by currency")
+    records = []
+    for currency, value in data.items():
+        for item in value if isinstance(value, list) else [value]:
+            if isinstance(item, dict):
+                records.append({**item, "currency": currency})
+            else:
+                records.append({"currency": currency, "rate": item})
+    return records
+
+
+def _csv_records(f):
+    header = f.readline()
+    f.seek(0)
+    # Rates are often written with decimal commas; such files use ; between fields
+    delimiter = ';' if ';' in header and ',' not in header else ','
+    return list(csv.DictReader(f, delimiter=delimiter))
+
+
+def read_rates_table(path):
+    """Parse a rates file into currency → [(as_of or None, rate), ...] in file order"""
+    path = Path(path)
+    try:
+        if path.suffix.lower() == '.json':
+            with open(path, 'r', encoding='utf-8') as f:
+                records = _json_records(json.load(f))
+        else:
+            with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+                records = _csv_records(f)
+    except (ValueError, csv.Error) as e:
+        raise ValueError(f"Invalid currency rates file {path.name}: {e}") from None
+
+    table = {}
+    for record_no, record in enumerate(records, start=1):
+        if not isinstance(record, dict):
+            raise ValueError(f"Currency rates file {path.name}, record {record_no}: expected an object")
+        record = {str(k).strip().lower(): ("" if v is None else v) for k, v in record.items()}
+        currency = currency_code(record.get("currency", ""))
+        if not currency:
+            raise ValueError(f"Currency rates file {path.name}, record {record_no}: 'currency' is required")
+        try:
+            rate = parse_rate(record.get("rate", ""))
+        except ValueError:
+            raise ValueError(f"Currency rates file {path.name}, record {record_no}: invalid rate "
+                             f"'{record.get('rate', '')}' for {currency}") from None
+        as_of = str(record.get("as_of", "")).strip()
+        try:
+            as_of = date.fromisoformat(as_of) if as_of else None
+        except ValueError:
+            raise ValueError(f"Currency rates file {path.name}, record {record_no}: invalid as_of '{as_of}' "
+                             f"- use YYYY-MM-DD") from None
+        table.setdefault(currency, []).append((as_of, rate))
+    return table
+
+
+def _table_key(path):
+    path = Path(path).resolve()
+    stat = path.stat()
+    return str(path), stat.st_size, stat.st_mtime_ns
+
+
+def load_rates_table(path):
+    """Return the parsed rates file, parsing it only the first time this process sees this version of it"""
+    key = _table_key(path)
+    table = _TABLES.get(key)
+    if table is None:
+        table = read_rates_table(path)
+        # A replaced file leaves no stale version behind
+        for old_key in [k for k in _TABLES if k[0] == key[0]]:
+            del _TABLES[old_key]
+        _TABLES[key] = table
+    return table
+
+
+def preload_rates_tables(paths):
+    """Parse rates files ahead of a batch; return what prime_rates_tables() needs in each worker.
+
+    Files that cannot be read are left out, so the conversions using them
+    fail with the error on their own.
+    """
+    tables = {}
+    for path in set(paths):
+        try:
+            table = load_rates_table(path)
+        except (OSError, ValueError):
+            continue
+        tables[_table_key(path)] = table
+    return tables
+
+
+def prime_rates_tables(tables):
+    """Process pool initializer: reuse rates files parsed by the parent process"""
+    _TABLES.update(tables)
+
+
+def rates_on(table, on):
+    """Rate of each currency on a date: its latest record dated on or before it (undated ones rank oldest).
+
+    Of records with the same date, the last one in the file wins.
+    """
+    rates = {}
+    for currency, records in table.items():
+        best = None
+        for as_of, rate in records:
+            as_of = as_of or date.min
+            if as_of <= on and (best is None or as_of >= best[0]):
+                best = (as_of, rate)
+        if best is not None:
+            rates[currency] = best[1]
+    return rates
+
+
+class CurrencyRates:
+    """The rates in effect on one date, looked up for a whole Currency column at once.
+
+    lookup() factorizes the column, so each distinct currency is normalized
+    and looked up once and the rows get their rates by indexing. Rows of a
+    currency without a rate are counted in unknown (across all lookups).
+    """
+
+    def __init__(self, rates, on):
+        self.rates = rates
+        self.on = on
+        self.unknown = Counter()
+
+    @classmethod
+    def load(cls, path, on):
+        return cls(rates_on(load_rates_table(path), on), on)
+
+    def lookup(self, currencies, default=None):
+        """Return the rate of every row as a float array.
+
+        Rows with an empty currency cell get default (1.0, i.e. unconverted,
+        when None); rows of a currency without a rate get NaN, so their prices
+        are left empty rather than written in the wrong currency.
+        """
+        codes, uniques = pd.factorize(np.asarray(currencies, dtype=object))
+        blank_rate = 1.0 if default is None else default
+        unique_rates = np.empty(len(uniques) + 1, dtype='float64')
+        unique_rates[-1] = blank_rate  # missing cells (code -1)
+        missing = []
+        for i, value in enumerate(uniques):
+            code = currency_code(value)
+            if not code:
+                unique_rates[i] = blank_rate
+            elif code in self.rates:
+                unique_rates[i] = self.rates[code]
+            else:
+                unique_rates[i] = np.nan
+                missing.append((i, code))
+        if missing:
+            counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+            for i, code in missing:
+                self.unknown[code] += int(counts[i])
+        return unique_rates[codes]
+
+    def describe(self):
+        return ", ".join(f"{currency} {rate:g}" for currency, rate in sorted(self.rates.items()))
@@ -0,0 +1,216 @@
+"""Delta mode: the rows added, changed and removed since the previous converted output."""
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .output import OUTPUT_SUFFIXES, output_parts, output_text
+
+# Rows are matched on these columns; every other column is compared
+KEY_COLUMNS = ["Brand Name", "Article"]
+
+# Nearly every value of these differs; hashing them without categorizing first is faster
+DISTINCT_COLUMNS = {"Article"}
+
+# Output files written next to the full output, by the rows they hold
+DELTA_KINDS = ["added", "changed", "removed"]
+
+_HASH_MULTIPLIER = np.uint64(0x9E3779B97F4A7C15)
+
+
+def find_previous_output(output_dir, base_name, output_format):
+    """Return the parts of an earlier output named base_name in output_dir, preferring output_format"""
+    suffixes = sorted(OUTPUT_SUFFIXES, key=lambda suffix: suffix != f".{output_format}")
+    for suffix in suffixes:
+        parts = output_parts(Path(output_dir) / f"{base_name}{suffix}")
+        if parts:
+            return parts
+    return []
+
+
+def hash_columns(df, columns):
+    """Combine the values of columns into one uint64 hash per row"""
+    combined = np.zeros(len(df), dtype=np.uint64)
+    for col in columns:
+        values = pd.util.hash_array(df[col].to_numpy(dtype=object), categorize=col not in DISTINCT_COLUMNS)
+        combined = (combined * _HASH_MULTIPLIER) ^ values
+    return combined
+
+
+def _cumcount(codes):
+    """Number each value's occurrences in codes: 0 for its first, 1 for its second, ..."""
+    if len(codes) == 0 or np.bincount(codes).max() == 1:
+        return np.zeros(len(codes), dtype=np.int64)  # the usual case: every code once
+    order = np.argsort(codes, kind='stable')
+    sorted_codes = codes[order]
+    group_starts = np.flatnonzero(np.concatenate(([True], sorted_codes[1:] != sorted_codes[:-1])))
+    group_sizes = np.diff(np.append(group_starts, len(codes)))
+    ranks = np.empty(len(codes), dtype=np.int64)
+    ranks[order] = np.arange(len(codes)) - np.repeat(group_starts, group_sizes)
+    return ranks
+
+
+class _Groups:
+    """Rows grouped by a hash, matched occurrence by occurrence: the n-th lookup of a hash gets its n-th row"""
+
+    def __init__(self, hashes):
+        self.codes, uniques = pd.factorize(hashes)
+        self.index = pd.Index(uniques)
+        self.order = np.argsort(self.codes, kind='stable')
+        self.sizes = np.bincount(self.codes, minlength=len(uniques))
+        self.starts = np.concatenate(([0], np.cumsum(self.sizes)[:-1])).astype(np.int64)
+        self.seen = np.zeros(len(uniques), dtype=np.int64)
+
+    def match(self, hashes):
+        """Return the positions in hashes that found a row, and those rows"""
+        codes = self.index.get_indexer(hashes)
+        positions = np.flatnonzero(codes >= 0)
+        codes = codes[positions]
+        occurrence = self.seen[codes] + _cumcount(codes)
+        np.add.at(self.seen, codes, 1)
+        fits = occurrence < self.sizes[codes]
+        return positions[fits], self.order[self.starts[codes[fits]] + occurrence[fits]]
+
+
+class DeltaIndex:
+    """The previous output indexed by (Brand Name, Article), for diffing new rows against it.
+
+    Rows are hashed and looked up in hash tables (pandas Indexes), so diffing
+    costs one pass over the new rows. A new row identical to a previous one
+    is unchanged, wherever it moved to. Otherwise a row whose key occurs once
+    in the previous output is changed (or added, if that row was taken
+    already), and a row with no previous key is added. Rows whose key occurs
+    several times in the previous output are paired with its leftover rows
+    in order once all rows are in (resolve()), since a later batch may still
+    hold the exact match.
+    """
+
+    def __init__(self, previous):
+        self.previous = previous.reset_index(drop=True)
+        self._value_columns = [col for col in self.previous.columns if col not in KEY_COLUMNS]
+        key_hashes = hash_columns(self.previous, KEY_COLUMNS)
+        self._value_hashes = hash_columns(self.previous, self._value_columns)
+        self._rows = _Groups(key_hashes * _HASH_MULTIPLIER ^ self._value_hashes)
+        self._keys = _Groups(key_hashes)
+        self._matched = np.zeros(len(self.previous), dtype=bool)
+        self._pending = []  # (rows, key codes) waiting for resolve()
+        self.counts = dict.fromkeys(DELTA_KINDS, 0)
+
+    def diff(self, frame):
+        """Return (added, changed) rows of frame and remember which previous rows were seen"""
+        frame = frame.reset_index(drop=True)
+        key_hashes = hash_columns(frame, KEY_COLUMNS)
+        value_hashes = hash_columns(frame, self._value_columns)
+        positions, previous_rows = self._rows.match(key_hashes * _HASH_MULTIPLIER ^ value_hashes)
+        free = ~self._matched[previous_rows]
+        self._matched[previous_rows[free]] = True
+        unchanged = np.zeros(len(frame), dtype=bool)
+        unchanged[positions[free]] = True
+
+        rest = np.flatnonzero(~unchanged)
+        codes = self._keys.index.get_indexer(key_hashes[rest])
+        known = codes >= 0
+        added = rest[~known]
+        repeated = np.zeros(len(codes), dtype=bool)
+        repeated[known] = self._keys.sizes[codes[known]] > 1
+        if repeated.any():
+            self._pending.append((frame.iloc[rest[repeated]], codes[repeated]))
+
+        single = known & ~repeated
+        candidates = rest[single]
+        previous_rows = self._keys.order[self._keys.starts[codes[single]]]
+        takes = (_cumcount(codes[single]) == 0) & ~self._matched[previous_rows]
+        self._matched[previous_rows[takes]] = True
+        changed = candidates[takes]
+        added = np.sort(np.concatenate([added, candidates[~takes]]))
+
+        self.counts["added"] += len(added)
+        self.counts["changed"] += len(changed)
+        return frame.iloc[added], frame.iloc[changed]
+
+    def resolve(self):
+        """Pair the deferred rows with the unmatched previous rows of their key; return (added, changed)"""
+        if not self._pending:
+            empty = self.previous.iloc[:0]
+            return empty, empty
+        pending = pd.concat([rows for rows, codes in self._pending], ignore_index=True)
+        codes = np.concatenate([codes for rows, codes in self._pending]).astype(np.int64)
+        self._pending = []
+
+        # Unmatched previous rows, grouped by key in file order, looked up by (key, rank)
+        unmatched = self._keys.order[~self._matched[self._keys.order]]
+        unmatched_codes = self._keys.codes[unmatched].astype(np.int64)
+        stride = len(self.previous) + 1
+        lookup = pd.Index(unmatched_codes * stride + _cumcount(unmatched_codes))
+        found = lookup.get_indexer(codes * stride + _cumcount(codes))
+        paired = found >= 0
+        previous_rows = unmatched[found[paired]]
+        self._matched[previous_rows] = True
+
+        positions = np.flatnonzero(paired)
+        differs = hash_columns(pending.iloc[positions], self._value_columns) != self._value_hashes[previous_rows]
+        added = pending[~paired]
+        changed = pending.iloc[positions[differs]]
+        self.counts["added"] += len(added)
+        self.counts["changed"] += len(changed)
+        return added, changed
+
+    def removed(self):
+        """Return the previous rows that no new row matched (call after resolve())"""
+        removed = self.previous[~self._matched]
+        self.counts["removed"] = len(removed)
+        return removed
+
+
+class DeltaWriter:
+    """Write the full output and, next to it, the added, changed and removed rows.
+
+    Wraps the writer of the full output; writers for the three delta files
+    come from open_writer(kind). Every file is written, even when it holds
+    no rows, so an importer always finds all of them. Rows are diffed in
+    their written form: numeric_columns are formatted as text first, like
+    the previous output they are compared with.
+    """
+
+    def __init__(self, index, writer, open_writer, metrics=None, log=None, numeric_columns=()):
+        self.index = index
+        self.numeric_columns = list(numeric_columns)
+        self.log = log
+        self.writer = writer
+        self.delta_writers = {kind: open_writer(kind) for kind in DELTA_KINDS}
+        self.metrics = metrics or writer.metrics
+        self._columns = None
+
+    def write(self, df):
+        with self.metrics.stage("encode", rows=len(df)):
+            df = output_text(df, self.numeric_columns)
+        self._columns = df.columns
+        self.writer.write(df)
+        with self.metrics.stage("delta", rows=len(df)):
+            added, changed = self.index.diff(df)
+        self.delta_writers["added"].write(added)
+        self.delta_writers["changed"].write(changed)
+
+    def close(self):
+        created_files = self.writer.close()
+        with self.metrics.stage("delta"):
+            added, changed = self.index.resolve()
+            removed = self.index.removed()
+            if self._columns is not None:
+                removed = removed.reindex(columns=self._columns, fill_value="")
+        # Written even when empty, so the files exist whatever changed
+        self.delta_writers["added"].write(added)
+        self.delta_writers["changed"].write(changed)
+        self.delta_writers["removed"].write(removed)
+        for kind in DELTA_KINDS:
+            created_files = created_files + self.delta_writers[kind].close()
+        if self.log:
+            counts = self.index.counts
+            self.log(f"Delta: {counts['added']:,} added, {counts['changed']:,} changed, "
+                     f"{counts['removed']:,} removed")
+        return created_files
+
+    def abort(self):
+        self.writer.abort()
+        for delta_writer in self.delta_writers.values():
+            delta_writer.abort()
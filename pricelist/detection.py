@@ -0,0 +1,203 @@
+"""Column auto-detection from header names and a sample of cell values."""
+import re
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+# Header patterns for each output column, most specific first
+HEADER_PATTERNS = {
+    "Lead Time": [
+        r"lead\s*time", r"delivery\s*time", r"delivery", r"lead", r"time",
+        r"срок\s*поставки", r"время\s*доставки", r"поставка"
+    ],
+    "Brand Name": [
+        r"brand", r"manufacturer", r"maker", r"producer", r"company", r"mfg",
+        r"бренд", r"производитель", r"марка", r"фирма"
+    ],
+    "Article": [
+        r"article", r"part\s*number", r"part\s*no", r"sku", r"code", r"item\s*number",
+        r"product\s*code", r"model", r"артикул", r"номер\s*детали", r"код", r"товар"
+    ],
+    "Quantity": [
+        r"quantity", r"stock", r"qty", r"amount", r"count", r"available",
+        r"avl\s*qty", r"in\s*stock", r"количество", r"запас", r"остаток", r"шт"
+    ],
+    "MOQ": [
+        r"moq", r"minimum\s*order", r"min\.?\s*order", r"min\.?\s*qty", r"min\.?\s*quantity",
+        r"мин\.?\s*заказ", r"минимальный\s*заказ", r"мин\.?\s*количество"
+    ],
+    "MSRP": [
+        r"msrp", r"list\s*price", r"retail\s*price", r"rrp", r"price\s*list",
+        r"suggested\s*price", r"recommended\s*price", r"total\s*price",
+        r"розничная\s*цена", r"список\s*цен", r"рекомендуемая\s*цена", r"ррц"
+    ],
+    "Price": [
+        r"price", r"cost", r"sale\s*price", r"selling\s*price", r"unit\s*price",
+        r"unit\s*cost", r"wholesale\s*price", r"цена", r"стоимость", r"продажная\s*цена"
+    ]
+}
+
+# Compiled once; every header is matched against these
+_COMPILED_PATTERNS = {
+    output_col: [re.compile(pattern, re.IGNORECASE) for pattern in patterns]
+    for output_col, patterns in HEADER_PATTERNS.items()
+}
+
+# Rows of the input used to profile cell values
+DETECTION_SAMPLE_ROWS = 1000
+
+# Share of the confidence that comes from the header; the rest comes from the values
+HEADER_WEIGHT = 0.6
+
+# Mappings below this confidence are not reported
+MIN_CONFIDENCE = 0.4
+
+
+@dataclass
+class ColumnProfile:
+    """Summary of the sampled values of one input column"""
+    numeric: float      # share of filled cells that hold a number
+    integer: float      # share of numbers that are whole
+    negative: float     # share of numbers below zero
+    median: float       # median of the numbers (nan when there are none)
+    distinct: float     # distinct values / filled cells
+    text_length: float  # mean length of the filled cells as text
+
+
+@dataclass
+class ColumnMatch:
+    """An input column detected for an output column"""
+    column: object
+    confidence: float
+    header_score: float
+    content_score: float = None  # None when no values were sampled
+
+
+def header_score(header, output_col):
+    """Score how well a header names output_col: 0 without a pattern match, else 0.5-1 by match coverage"""
+    header = str(header).lower().strip()
+    if not header:
+        return 0.0
+    best_coverage = 0.0
+    for pattern in _COMPILED_PATTERNS[output_col]:
+        match = pattern.search(header)
+        if match:
+            best_coverage = max(best_coverage, len(match.group(0)) / len(header))
+    return 0.5 + 0.5 * best_coverage if best_coverage else 0.0
+
+
+def profile_column(values):
+    """Profile a sample of cell values, or return None when all of them are empty"""
+    if values.dtype.kind in 'iuf':
+        numbers = values.to_numpy(dtype='float64')
+        numbers = numbers[~np.isnan(numbers)]
+        if not len(numbers):
+            return None
+        text = None
+        filled = len(numbers)
+    else:
+        text = values[values.notna()].astype(str).str.strip()
+        text = text[text != '']
+        filled = len(text)
+        if not filled:
+            return None
+        # Accept '1 234,50' style numbers as well
+        normalized = text.str.replace(' ', '', regex=False).str.replace(',', '.', regex=False)
+        numbers = pd.to_numeric(normalized, errors='coerce').to_numpy(dtype='float64')
+        numbers = numbers[np.isfinite(numbers)]
+
+    num_numbers = len(numbers)
+    return ColumnProfile(
+        numeric=num_numbers / filled,
+        integer=float(np.mean(numbers == np.floor(numbers))) if num_numbers else 0.0,
+        negative=float(np.mean(numbers < 0)) if num_numbers else 0.0,
+        median=float(np.median(numbers)) if num_numbers else np.nan,
+        distinct=(pd.unique(numbers).size if text is None else text.nunique()) / filled,
+        text_length=float(text.str.len().mean()) if text is not None else 0.0,
+    )
+
+
+def content_score(profile, output_col):
+    """Score (0-1) how plausible the sampled values are for output_col"""
+    if output_col == "Lead Time":
+        if profile.numeric < 0.5:
+            return 0.6  # e.g. '3-5 days'
+        return profile.numeric * profile.integer * (1.0 if 0 <= profile.median <= 365 else 0.3)
+    if output_col == "Brand Name":
+        # Brands are short text repeated across many rows
+        return ((1 - profile.numeric) * (1.0 if profile.distinct < 0.5 else 0.6)
+                * (1.0 if profile.text_length <= 40 else 0.5))
+    if output_col == "Article":
+        # Articles are mostly unique; numeric articles are whole numbers
+        if profile.numeric > 0.5 and profile.integer < 0.5:
+            return 0.1
+        return (0.4 + 0.6 * profile.distinct) * (1.0 if profile.text_length <= 40 else 0.5)
+    if output_col in ("Quantity", "MOQ"):
+        score = profile.numeric * (0.4 + 0.6 * profile.integer) * (1 - profile.negative)
+        if output_col == "MOQ":
+            # Minimum order quantities are small and repeat a lot
+            score *= (1.0 if profile.median <= 100 else 0.5) * (1.0 if profile.distinct < 0.5 else 0.7)
+        return score
+    # MSRP and Price: non-negative amounts, often with cents
+    return profile.numeric * (1 - profile.negative) * (0.7 + 0.3 * (1 - profile.integer))
+
+
+def detect_column_matches(df, sample_rows=DETECTION_SAMPLE_ROWS):
+    """Detect the input column for each output column, with a confidence score.
+
+    Every (output column, input column) pair is scored from the header and,
+    when df has rows, from a profile of the first sample_rows values. Pairs
+    are then assigned best first so each input column is used at most once.
+    """
+    sample = df.head(sample_rows)
+    # Only columns whose header matches some pattern are profiled
+    profiles = {}
+
+    def profile(i):
+        if i not in profiles:
+            profiles[i] = profile_column(sample.iloc[:, i]) if len(sample) else None
+        return profiles[i]
+
+    candidates = []
+    for i, column in enumerate(df.columns):
+        for output_col in HEADER_PATTERNS:
+            score = header_score(column, output_col)
+            if not score:
+                continue
+            match = ColumnMatch(column=column, confidence=score, header_score=score)
+            if profile(i) is not None:
+                match.content_score = content_score(profile(i), output_col)
+                match.confidence = HEADER_WEIGHT * score + (1 - HEADER_WEIGHT) * match.content_score
+            if match.confidence >= MIN_CONFIDENCE:
+                candidates.append((match.confidence, i, output_col, match))
+
+    detected = {}
+    positions = {}
+    for confidence, i, output_col, match in sorted(candidates, key=lambda c: (-c[0], c[1])):
+        if output_col not in detected and i not in positions.values():
+            detected[output_col] = match
+            positions[output_col] = i
+
+    if "MSRP" in detected and "Price" in detected:
+        _order_price_columns(detected, profiles[positions["MSRP"]], profiles[positions["Price"]])
+    return {output_col: detected[output_col] for output_col in HEADER_PATTERNS if output_col in detected}
+
+
+def _order_price_columns(detected, msrp_profile, price_profile):
+    """Swap MSRP and Price when both headers fit either role but Price holds the larger amounts"""
+    msrp, price = detected["MSRP"], detected["Price"]
+    if msrp_profile is None or price_profile is None:
+        return
+    if not (header_score(msrp.column, "Price") and header_score(price.column, "MSRP")):
+        return
+    if msrp_profile.median < price_profile.median:
+        detected["MSRP"], detected["Price"] = (
+            ColumnMatch(price.column, price.confidence, price.header_score, price.content_score),
+            ColumnMatch(msrp.column, msrp.confidence, msrp.header_score, msrp.content_score),
+        )
+
+
+def detect_columns(df):
+    """Automatically detect which columns match the required output columns"""
+    return {output_col: match.column for output_col, match in detect_column_matches(df).items()}
@@ -0,0 +1,51 @@
+"""Thread-safe log channel that a UI drains in batches."""
+import queue
+import time
+
+# Lines kept in the log widget; older lines are trimmed
+DEFAULT_MAX_LINES = 5000
+
+# How often the UI drains the log, in milliseconds
+DRAIN_INTERVAL_MS = 100
+
+
+class LogPump:
+    """Collect log lines from any thread and hand them to the UI thread in batches.
+
+    write() only puts the line on a queue, so workers never wait for the UI.
+    drain() takes the lines queued so far, appends all of them to log_file
+    when one is given, and returns at most the newest max_lines of them (the
+    widget would trim the older ones right away).
+    """
+
+    def __init__(self, log_file=None, max_lines=DEFAULT_MAX_LINES):
+        self.max_lines = max_lines
+        self._queue = queue.SimpleQueue()
+        self._file = open(log_file, 'a', encoding='utf-8') if log_file else None
+
+    def write(self, message):
+        timestamp = time.strftime("%H:%M:%S")
+        self._queue.put(f"[{timestamp}] {message}\n")
+
+    def drain(self):
+        """Return the lines written since the last drain (oldest first)"""
+        lines = []
+        # Only what is queued now; a busy worker must not keep the UI thread here
+        for _ in range(self._queue.qsize()):
+            try:
+                lines.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        if lines and self._file is not None:
+            self._file.writelines(lines)
+            self._file.flush()
+        if self.max_lines and len(lines) > self.max_lines:
+            lines = lines[-self.max_lines:]
+        return lines
+
+    def close(self):
+        """Write out anything still queued and close the log file"""
+        self.drain()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
@@ -0,0 +1,254 @@
+"""Merge the converted outputs of many suppliers into one list with the best offer per article.
+
+Usage:
+    python -m pricelist.merge OUTPUT_DIR [NAME=]converted_output.csv ... [--name best_prices]
+                              [--lead-time N] [--output-format csv] [--partitions N]
+
+Every input is a converted output (any of its parts, in any output format);
+the supplier is named after the file (``prices_output.csv`` → ``prices``)
+unless given as ``NAME=path``. Rows are matched on normalized Brand Name and
+Article, and for each article the row with the lowest Price wins. Rows
+without an Article match nothing and are passed through unchanged. The
+merged list is written in the lead-time format with a Supplier column added,
+split by the usual rules.
+"""
+import argparse
+import os
+import pickle
+import re
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .conversion import ARTICLE_SEPARATOR_TABLE, NUMERIC_COLUMNS, OUTPUT_COLUMNS
+from .output import (
+    MAX_ROWS,
+    MAX_SIZE_MB,
+    OUTPUT_FORMATS,
+    iter_output_frames,
+    open_split_writer,
+    output_parts,
+    read_output_lead_time,
+    split_output_name,
+)
+
+# Columns of a converted output's rows (the lead time is its first row), and of the merged list
+ROW_COLUMNS = [col for col in OUTPUT_COLUMNS if col != "Lead Time"]
+MERGED_COLUMNS = ROW_COLUMNS + ["Supplier"]
+
+# Rows read from an input at a time
+READ_CHUNK_ROWS = 500000
+
+# Input bytes per on-disk partition; each partition is merged in memory on its own
+PARTITION_TARGET_BYTES = 64 * 1024 * 1024
+MAX_PARTITIONS = 1024
+
+
+def supplier_name(path):
+    """Name a supplier after its converted output: ``prices_output_part_2.csv`` → ``prices``"""
+    base_name = re.sub(r"_part_\d+$", "", split_output_name(path)[0])
+    return base_name[:-len("_output")] if base_name.endswith("_output") else base_name
+
+
+def _normalize_unique(values, normalize):
+    """Apply a vectorized string normalization to each distinct value once"""
+    codes, uniques = pd.factorize(values)
+    normalized = normalize(pd.Series(uniques, dtype=object)).to_numpy(dtype=object)
+    return normalized[codes] if len(uniques) else np.array([], dtype=object)
+
+
+def merge_keys(frame):
+    """Key matching the same article across suppliers: casefolded brand, article uppercased without separators.
+
+    Rows without an article get no key (NaN): they name no article to match.
+    """
+    brands = _normalize_unique(frame["Brand Name"].to_numpy(dtype=object),
+                               lambda s: s.str.casefold().str.split().str.join(" "))
+    articles = _normalize_unique(frame["Article"].to_numpy(dtype=object),
+                                 lambda s: s.str.upper().str.translate(ARTICLE_SEPARATOR_TABLE))
+    articles = pd.Series(articles, dtype=object)
+    keys = pd.Series(brands, dtype=object) + "\x1f" + articles
+    return keys.where(articles.notna() & (articles != ""))
+
+
+def best_rows(frame):
+    """Keep the cheapest row per key; ties go to the earlier row (earlier supplier).
+
+    Rows without a price only win when no supplier prices the article.
+    """
+    ranked_price = frame["_price"].fillna(np.inf)
+    winners = ranked_price.groupby(frame["_key"].to_numpy(), sort=False).idxmin()
+    return frame.loc[np.sort(winners.to_numpy())]
+
+
+class PartitionSpill:
+    """Rows hash-partitioned by key into files on disk, appended as pickled frames"""
+
+    def __init__(self, directory, num_partitions):
+        self.directory = Path(directory)
+        self.num_partitions = num_partitions
+        self.rows = 0
+
+    def path(self, partition):
+        return self.directory / f"partition_{partition}.pkl"
+
+    def append(self, frame):
+        partitions = pd.util.hash_array(frame["_key"].to_numpy(dtype=object), categorize=False) % np.uint64(
+            self.num_partitions)
+        for partition, rows in frame.groupby(partitions.astype(np.int64), sort=False):
+            self._dump(partition, rows)
+        self.rows += len(frame)
+
+    def append_unkeyed(self, frame):
+        """Keep rows without a key aside, in a file of their own after the partitions"""
+        self._dump(self.num_partitions, frame)
+
+    def _dump(self, partition, rows):
+        with open(self.path(partition), 'ab') as f:
+            pickle.dump(rows, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def read(self, partition):
+        """Return every row appended to a partition, in the order appended"""
+        frames = []
+        try:
+            with open(self.path(partition), 'rb') as f:
+                while True:
+                    try:
+                        frames.append(pickle.load(f))
+                    except EOFError:
+                        break
+        except FileNotFoundError:
+            return None
+        return pd.concat(frames, ignore_index=True)
+
+
+def choose_partitions(parts):
+    total_bytes = sum(os.path.getsize(part) for part in parts)
+    return int(min(max(1, -(-total_bytes // PARTITION_TARGET_BYTES)), MAX_PARTITIONS))
+
+
+def merge_outputs(suppliers, output_dir, base_name="best_prices", lead_time_value=None, output_format="csv",
+                  max_rows=MAX_ROWS, max_size_mb=MAX_SIZE_MB, num_partitions=None, work_dir=None, log=None):
+    """Merge converted outputs into the best offer per article; return the files written.
+
+    suppliers maps supplier names to converted output files (any part of
+    each). Inputs are read in chunks and hash-partitioned by key into
+    temporary files, so memory holds one chunk or one partition at a time.
+    Without lead_time_value the longest lead time of the inputs is used.
+    """
+    def log_message(message):
+        if log:
+            log(message)
+
+    supplier_parts = {}
+    for name, path in suppliers.items():
+        parts = output_parts(path)
+        if not parts:
+            raise FileNotFoundError(f"No converted output found for {name}: {path}")
+        supplier_parts[name] = parts
+    all_parts = [part for parts in supplier_parts.values() for part in parts]
+    if lead_time_value is None:
+        lead_times = [int(value) for value in map(read_output_lead_time, all_parts) if str(value).isdigit()]
+        lead_time_value = str(max(lead_times)) if lead_times else ""
+    num_partitions = num_partitions or choose_partitions(all_parts)
+    log_message(f"Merging {len(supplier_parts)} suppliers into {num_partitions} partition(s)")
+
+    with tempfile.TemporaryDirectory(prefix="pricelist_merge_", dir=work_dir) as temp_dir:
+        spill = PartitionSpill(temp_dir, num_partitions)
+        passed_rows = 0
+        # Phase 1: stream every supplier's rows into partitions, cheapest per key of each chunk only
+        for supplier, (name, parts) in enumerate(supplier_parts.items()):
+            supplier_rows = unkeyed_rows = 0
+            for frame in iter_output_frames(parts, ROW_COLUMNS, READ_CHUNK_ROWS):
+                frame = frame.reset_index(drop=True)
+                frame["_key"] = merge_keys(frame).to_numpy()
+                frame["_price"] = pd.to_numeric(frame["Price"], errors='coerce')
+                frame["_supplier"] = np.int32(supplier)
+                supplier_rows += len(frame)
+                unkeyed = frame["_key"].isna().to_numpy()
+                if unkeyed.any():
+                    spill.append_unkeyed(frame[unkeyed])
+                    unkeyed_rows += int(unkeyed.sum())
+                    frame = frame[~unkeyed]
+                spill.append(best_rows(frame))
+            log_message(f"{name}: {supplier_rows:,} rows"
+                        + (f" ({unkeyed_rows:,} without an article, passed through)" if unkeyed_rows else ""))
+            passed_rows += unkeyed_rows
+
+        # Phase 2: merge each partition on its own and write the winners
+        names = np.array(list(supplier_parts), dtype=object)
+        writer = open_split_writer(output_format, output_dir, base_name, lead_time_value, log,
+                                   max_rows=max_rows, max_size_mb=max_size_mb, numeric_columns=NUMERIC_COLUMNS)
+        merged_rows = 0
+        try:
+            for partition in range(num_partitions):
+                frame = spill.read(partition)
+                if frame is None:
+                    continue
+                # Rows were appended supplier by supplier, so ties still go to the earlier supplier
+                winners = best_rows(frame)
+                winners = winners.assign(Supplier=names[winners["_supplier"].to_numpy()])[MERGED_COLUMNS]
+                writer.write(winners)
+                merged_rows += len(winners)
+            # Rows without an article, as they came
+            frame = spill.read(num_partitions)
+            if frame is not None:
+                writer.write(frame.assign(Supplier=names[frame["_supplier"].to_numpy()])[MERGED_COLUMNS])
+            if merged_rows + passed_rows == 0:
+                writer.write(pd.DataFrame({col: pd.Series(dtype=object) for col in MERGED_COLUMNS}))
+            created_files = writer.close()
+        except BaseException:
+            writer.abort()
+            raise
+    log_message(f"Merged {spill.rows:,} candidate rows into {merged_rows:,} articles"
+                + (f"; {passed_rows:,} rows without an article passed through" if passed_rows else ""))
+    return created_files
+
+
+def parse_supplier(argument):
+    """``NAME=path`` or just ``path`` (named after the file)"""
+    if "=" in argument and not Path(argument).exists():
+        name, path = argument.split("=", 1)
+        return name, path
+    return supplier_name(argument), argument
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Merge converted supplier outputs into the best offer per article")
+    parser.add_argument("output_dir", help="Directory to write the merged list to")
+    parser.add_argument("outputs", nargs="+", help="Converted outputs, optionally as NAME=path")
+    parser.add_argument("--name", default="best_prices", help="Base name of the merged file(s)")
+    parser.add_argument("--lead-time", default=None, help="Lead time of the merged list (default: the longest input)")
+    parser.add_argument("--output-format", choices=OUTPUT_FORMATS, default="csv")
+    parser.add_argument("--max-rows", type=int, default=MAX_ROWS, help="Maximum data rows per output part")
+    parser.add_argument("--max-size-mb", type=float, default=MAX_SIZE_MB, help="Maximum size of an output part in MB")
+    parser.add_argument("--partitions", type=int, default=None,
+                        help="On-disk partitions (default: one per 64 MB of input)")
+    parser.add_argument("--work-dir", default=None, help="Where to keep the partitions (default: the temp directory)")
+    args = parser.parse_args(argv)
+
+    suppliers = {}
+    for argument in args.outputs:
+        name, path = parse_supplier(argument)
+        if name in suppliers:
+            print(f"Error: supplier '{name}' is given twice; name them as NAME=path", file=sys.stderr)
+            return 2
+        suppliers[name] = path
+    started = time.perf_counter()
+    try:
+        created_files = merge_outputs(suppliers, args.output_dir, args.name, args.lead_time, args.output_format,
+                                      args.max_rows, args.max_size_mb, args.partitions, args.work_dir, log=print)
+    except (OSError, ValueError, ImportError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+    print(f"Merged {len(suppliers)} suppliers in {time.perf_counter() - started:.2f}s → "
+          f"{', '.join(map(str, created_files))}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,144 @@
+"""Per-stage timing and memory metrics for a conversion."""
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# How often the resident set size is sampled while a stage runs
+RSS_SAMPLE_SECONDS = 0.005
+
+_MB = 1024 * 1024
+
+
+def current_rss():
+    """Resident set size of this process in bytes, or None where it cannot be read"""
+    try:
+        with open("/proc/self/statm", 'rb') as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import psutil
+    except ImportError:
+        return None
+    return psutil.Process().memory_info().rss
+
+
+class RssSampler:
+    """Track the peak resident set size in a background thread while in use as a context manager"""
+
+    def __init__(self):
+        self.start_rss = current_rss()
+        self.peak_rss = self.start_rss
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+
+    def _sample(self):
+        while not self._stop.wait(RSS_SAMPLE_SECONDS):
+            self.peak_rss = max(self.peak_rss, current_rss())
+
+    def __enter__(self):
+        if self.start_rss is not None:
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.start_rss is not None:
+            self._stop.set()
+            self._thread.join()
+            self.peak_rss = max(self.peak_rss, current_rss())
+
+
+class StageMetrics:
+    """Wall time, CPU time, peak memory and row counts of the stages of one conversion.
+
+    Stages opened inside another stage (on the same thread) are recorded
+    under it. A stage that runs repeatedly (once per batch or block) is summed
+    into one record with a call count. CPU time is that of the thread running
+    the stage, so stages running concurrently on other threads do not count
+    towards it. When disabled, stage() does nothing but yield.
+    """
+
+    def __init__(self, enabled=False, sample_memory=True):
+        self.enabled = enabled
+        self.sample_memory = sample_memory
+        self.stages = {}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.started = time.perf_counter()
+        self.cpu_started = time.process_time()
+
+    @contextmanager
+    def stage(self, name, rows=None):
+        """Measure the enclosed code as stage name; set "rows_out" on the yielded dict to count output rows"""
+        call = {}
+        if not self.enabled:
+            yield call
+            return
+        open_stages = self._open_stages()
+        with self._lock:
+            siblings = open_stages[-1].setdefault("stages", {}) if open_stages else self.stages
+            record = siblings.setdefault(name, {"calls": 0, "seconds": 0.0, "cpu_seconds": 0.0})
+        open_stages.append(record)
+        sampler = RssSampler() if self.sample_memory else None
+        wall_started = time.perf_counter()
+        cpu_started = time.thread_time()
+        try:
+            if sampler is None:
+                yield call
+            else:
+                with sampler:
+                    yield call
+        finally:
+            open_stages.pop()
+            with self._lock:
+                record["calls"] += 1
+                record["seconds"] += time.perf_counter() - wall_started
+                record["cpu_seconds"] += time.thread_time() - cpu_started
+                if rows is not None:
+                    record["rows_in"] = record.get("rows_in", 0) + rows
+                if "rows_out" in call:
+                    record["rows_out"] = record.get("rows_out", 0) + call["rows_out"]
+                if sampler is not None and sampler.start_rss is not None:
+                    record["peak_rss_mb"] = max(record.get("peak_rss_mb", 0.0), sampler.peak_rss / _MB)
+
+    def _open_stages(self):
+        """Stages open on the calling thread, outermost first"""
+        if not hasattr(self._local, "stages"):
+            self._local.stages = []
+        return self._local.stages
+
+    def iterate(self, name, iterable):
+        """Yield from iterable, measuring each step as stage name (e.g. reading batches)"""
+        iterator = iter(iterable)
+        while True:
+            with self.stage(name) as call:
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+                if hasattr(item, "shape"):
+                    call["rows_out"] = item.shape[0]
+            yield item
+
+    def report(self):
+        """Return the recorded stages with totals, rounded for a JSON report"""
+        return {
+            "total_seconds": round(time.perf_counter() - self.started, 4),
+            "total_cpu_seconds": round(time.process_time() - self.cpu_started, 4),
+            "stages": _rounded(self.stages),
+        }
+
+
+def _rounded(stages):
+    rounded = {}
+    for name, record in stages.items():
+        record = dict(record)
+        for key in ("seconds", "cpu_seconds"):
+            record[key] = round(record[key], 4)
+        if "peak_rss_mb" in record:
+            record["peak_rss_mb"] = round(record["peak_rss_mb"], 1)
+        if "stages" in record:
+            record["stages"] = _rounded(record["stages"])
+        rounded[name] = record
+    return rounded
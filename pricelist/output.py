@@ -0,0 +1,591 @@
+"""Lead-time CSV (plain or compressed) and Parquet output, and the rules for splitting large outputs into parts."""
+import glob
+import gzip
+import os
+import re
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .metrics import StageMetrics
+
+# Split into chunks if file is large (80MB OR 1,000,000 rows)
+MAX_ROWS = 1000000  # 1 million rows
+MAX_SIZE_MB = 80    # 80 MB
+
+# Rows encoded to CSV at a time; bounds the memory used for encoded text
+ENCODE_BATCH_ROWS = 50000
+
+# Output formats: the semicolon CSV, the same CSV compressed, or Parquet
+OUTPUT_FORMATS = ["csv", "csv.gz", "csv.zst", "parquet"]
+CSV_COMPRESSION = {"csv": None, "csv.gz": "gzip", "csv.zst": "zstd"}
+COMPRESSION_SUFFIXES = {"gzip": ".gz", "zstd": ".zst"}
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 3
+
+# File name endings of converted outputs, longest first
+OUTPUT_SUFFIXES = [".csv.gz", ".csv.zst", ".parquet", ".csv"]
+
+# Parquet files hold the lead time in their key-value metadata under this key
+PARQUET_LEAD_TIME_KEY = "lead_time"
+PARQUET_COMPRESSION = "snappy"
+
+# Compressed blocks smaller than this say little about the compression ratio
+_RATIO_SAMPLE_BYTES = 64 * 1024
+
+_NEWLINE = ord("\n")
+
+
+# Decimal part of an amount by its cents value; '.00' is dropped for whole numbers
+_CENTS_SUFFIXES = np.array([''] + [f".{cents:02d}" for cents in range(1, 100)], dtype=object)
+
+# Above this magnitude a double no longer holds every cent exactly
+_MAX_EXACT_AMOUNT = 1e13
+
+
+def format_amounts(values):
+    """Format amounts rounded to 2 decimals like f"{x:.2f}" without '.00'; missing values become ''"""
+    values = np.asarray(values, dtype='float64')
+    formatted = np.full(len(values), '', dtype=object)
+
+    exact = np.isfinite(values) & (np.abs(values) < _MAX_EXACT_AMOUNT)
+    amounts = values[exact]
+    cents = np.abs(np.rint(amounts * 100).astype(np.int64))
+    text = (cents // 100).astype(str).astype(object) + _CENTS_SUFFIXES[cents % 100]
+    negative = np.signbit(amounts)
+    text[negative] = '-' + text[negative]
+    formatted[exact] = text
+
+    # Huge and infinite values are rare; format them one by one
+    for i in np.flatnonzero(~exact & ~np.isnan(values)):
+        formatted[i] = f"{values[i]:.2f}".replace('.00', '')
+    return formatted
+
+
+def lead_time_row(lead_time_value, num_columns):
+    """Return the A1 lead time row padded with semicolons for the remaining columns"""
+    if lead_time_value:
+        # Create lead time row: lead_time + semicolons for remaining columns (num_columns - 1)
+        return str(lead_time_value) + ';' * (num_columns - 1) + "\n"
+    # Empty A1 cell with proper semicolons
+    return ';' * (num_columns - 1) + "\n"
+
+
+def write_lead_time_row(f, lead_time_value, num_columns):
+    """Write the A1 lead time row padded with semicolons for the remaining columns"""
+    f.write(lead_time_row(lead_time_value, num_columns))
+
+
+def compressor(compression):
+    """Return a function compressing bytes into one self-contained gzip member or zstd frame.
+
+    Members (frames) written one after another form a valid .gz (.zst) file,
+    so blocks can be compressed independently and a part can end after any of
+    them.
+    """
+    if compression == "gzip":
+        return partial(gzip.compress, compresslevel=GZIP_LEVEL, mtime=0)
+    if compression == "zstd":
+        try:
+            import zstandard
+        except ImportError:
+            raise ImportError("zstd output needs the zstandard package (pip install zstandard)") from None
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress
+    raise ValueError(f"Unknown compression '{compression}'")
+
+
+def check_output_format(output_format):
+    """Raise ValueError for an unknown output format, ImportError if its package is missing"""
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Unknown output format '{output_format}' (choose from: {', '.join(OUTPUT_FORMATS)})")
+    if output_format == "parquet":
+        try:
+            import pyarrow.parquet  # noqa: F401
+        except ImportError:
+            raise ImportError("Parquet output needs the pyarrow package (pip install pyarrow)") from None
+    elif CSV_COMPRESSION[output_format]:
+        compressor(CSV_COMPRESSION[output_format])
+
+
+def write_csv_with_lead_time(df, output_file, lead_time_value, compression=None):
+    """Write CSV file with lead time in A1 and data starting from column A, optionally gzip or zstd compressed"""
+    if compression:
+        compress = compressor(compression)
+        with open(output_file, 'wb') as f:
+            f.write(compress(lead_time_row(lead_time_value, len(df.columns)).encode('utf-8')))
+            f.write(compress(df.to_csv(index=False, header=False, sep=';').encode('utf-8')))
+        return
+
+    with open(output_file, 'w', encoding='utf-8', newline='') as f:
+        # Write lead time in A1 cell with proper CSV format
+        write_lead_time_row(f, lead_time_value, len(df.columns))
+
+        # Write data without headers, starting from column A
+        df.to_csv(f, index=False, header=False, sep=';', encoding='utf-8')
+
+
+def output_text(df, numeric_columns=()):
+    """Return df as it is written: numeric columns formatted by format_amounts, other columns as they are"""
+    formatted = {col: format_amounts(df[col]) for col in numeric_columns
+                 if col in df.columns and pd.api.types.is_numeric_dtype(df[col])}
+    return df.assign(**formatted) if formatted else df
+
+
+def encode_rows(df, numeric_columns=()):
+    """Encode df as CSV data rows (amounts formatted as text); return (bytes, end offset of each row)"""
+    df = output_text(df, numeric_columns)
+    data = df.to_csv(index=False, header=False, sep=';').encode('utf-8')
+    row_ends = np.flatnonzero(np.frombuffer(data, dtype=np.uint8) == _NEWLINE) + 1
+    if len(row_ends) != len(df):
+        # Some values contain line breaks; measure the rows one by one
+        row_lengths = [len(df.iloc[[i]].to_csv(index=False, header=False, sep=';').encode('utf-8'))
+                       for i in range(len(df))]
+        row_ends = np.cumsum(row_lengths, dtype=np.int64)
+    return data, row_ends
+
+
+def split_output_name(path):
+    """Return (base name, suffix) of a converted output file, e.g. ("prices_output_part_2", ".csv.gz")"""
+    name = Path(path).name
+    for suffix in OUTPUT_SUFFIXES:
+        if name.endswith(suffix):
+            return name[:-len(suffix)], suffix
+    raise ValueError(f"Not a converted output file: {name}")
+
+
+def output_parts(path):
+    """Return every part of the converted output that path belongs to, in order.
+
+    path may be the single output file or any of its numbered parts; for
+    ``prices_output.csv`` or ``prices_output_part_2.csv`` this returns
+    ``prices_output_part_1.csv``, ``prices_output_part_2.csv``, ... if the
+    output was split, otherwise ``prices_output.csv`` (if it exists).
+    """
+    path = Path(path)
+    base_name, suffix = split_output_name(path)
+    base_name = re.sub(r"_part_\d+$", "", base_name)
+    single = path.with_name(f"{base_name}{suffix}")
+    numbered = {}
+    for part in path.parent.glob(f"{base_name}_part_*{suffix}"):
+        match = re.fullmatch(rf"{re.escape(base_name)}_part_(\d+){re.escape(suffix)}", part.name)
+        if match:
+            numbered[int(match.group(1))] = part
+    if numbered:
+        return [numbered[number] for number in sorted(numbered)]
+    return [single] if single.exists() else []
+
+
+def read_output_lead_time(part):
+    """Return the lead time of a converted output part (its A1 cell or Parquet metadata) as text"""
+    if str(part).endswith(".parquet"):
+        import pyarrow.parquet as pq
+
+        metadata = pq.read_schema(part).metadata or {}
+        return metadata.get(PARQUET_LEAD_TIME_KEY.encode('utf-8'), b"").decode('utf-8')
+    first_row = pd.read_csv(part, sep=';', header=None, nrows=1, dtype=str, keep_default_na=False,
+                            compression='infer')
+    return first_row.iat[0, 0] if first_row.shape[1] else ""
+
+
+def iter_output_frames(parts, columns, chunksize=None):
+    """Yield the rows of converted output parts (lead time row skipped) as frames of text columns.
+
+    With chunksize, CSV parts are read that many rows at a time; Parquet parts
+    are read whole (each holds at most max_rows rows).
+    """
+    for part in parts:
+        if str(part).endswith(".parquet"):
+            frame = pd.read_parquet(part)
+            for col in frame.columns:
+                if pd.api.types.is_numeric_dtype(frame[col]):
+                    frame[col] = format_amounts(frame[col])
+                else:
+                    frame[col] = frame[col].fillna("")
+            yield frame.astype(object)
+            continue
+        frames = pd.read_csv(part, sep=';', header=None, skiprows=1, names=columns, dtype=str,
+                             keep_default_na=False, compression='infer', chunksize=chunksize)
+        if chunksize is None:
+            yield frames.astype(object)
+            continue
+        with frames:
+            for frame in frames:
+                yield frame.astype(object)
+
+
+def read_output_parts(parts, columns):
+    """Read converted output parts (lead time row skipped) into one frame of text columns"""
+    frames = list(iter_output_frames(parts, columns))
+    if not frames:
+        return pd.DataFrame({col: pd.Series(dtype=object) for col in columns})
+    return pd.concat(frames, ignore_index=True)
+
+
+def open_split_writer(output_format, output_dir, base_name, lead_time_value, log=None, max_rows=MAX_ROWS,
+                      max_size_mb=MAX_SIZE_MB, workers=1, numeric_columns=(), progress=None, metrics=None):
+    """Return the splitting writer for output_format (CSV, compressed CSV or Parquet)"""
+    if output_format == "parquet":
+        return SplitParquetWriter(output_dir, base_name, lead_time_value, log, max_rows=max_rows,
+                                  numeric_columns=numeric_columns, progress=progress, metrics=metrics)
+    return SplitCsvWriter(output_dir, base_name, lead_time_value, log, max_rows=max_rows, max_size_mb=max_size_mb,
+                          workers=workers, numeric_columns=numeric_columns, progress=progress, metrics=metrics,
+                          compression=CSV_COMPRESSION[output_format])
+
+
+class SplitWriter:
+    """Output parts named ``<base><suffix>``, renamed to ``<base>_part_1<suffix>`` once a second part starts.
+
+    Subclasses write the parts; this class names them, keeps the list of
+    files created and removes them all on abort(). Once an output is
+    complete, files left by an earlier output of the same name that this one
+    did not replace (e.g. its part 3 when this output has two parts) are
+    deleted, so the parts on disk are always the parts of one output.
+    """
+
+    suffix = ".csv"
+
+    def __init__(self, output_dir, base_name, lead_time_value, log=None, max_rows=MAX_ROWS,
+                 max_size_mb=MAX_SIZE_MB, progress=None, metrics=None):
+        self.output_dir = Path(output_dir)
+        self.base_name = base_name
+        self.lead_time_value = lead_time_value
+        self.log = log
+        self.max_rows = max_rows
+        self.max_bytes = int(max_size_mb * 1024 * 1024)
+        self.max_size_mb = max_size_mb
+        self.progress = progress
+        self.metrics = metrics or StageMetrics()
+        self.created_files = []
+        self._numbered = False
+        self._part_rows = 0
+        self._part_number = 0
+
+    def _part_path(self, part_number):
+        if self._numbered:
+            return self.output_dir / f"{self.base_name}_part_{part_number}{self.suffix}"
+        return self.output_dir / f"{self.base_name}{self.suffix}"
+
+    def _close_part(self):
+        """Finish the current part; return False if none was open"""
+        raise NotImplementedError
+
+    def _next_part_path(self):
+        """Finish the current part (numbering the first one if needed) and return the path of the next"""
+        if self._close_part():
+            if not self._numbered:
+                # More rows than fit in one file: number the first part too
+                self._numbered = True
+                first_part = self._part_path(1)
+                os.replace(self.created_files[0], first_part)
+                self.created_files[0] = first_part
+                if self.log:
+                    self.log(f"Output exceeds {self.max_size_mb} MB or {self.max_rows:,} rows, "
+                             f"splitting into parts...")
+            self._log_created()
+        self._part_number += 1
+        output_file = self._part_path(self._part_number)
+        self.created_files.append(output_file)
+        self._part_rows = 0
+        return output_file
+
+    def _log_created(self):
+        if self.log:
+            size = os.path.getsize(self.created_files[-1])
+            self.log(f"Created: {self.created_files[-1]} ({self._part_rows:,} rows, "
+                     f"{size / (1024 * 1024):.1f} MB)")
+
+    def _remove_stale(self):
+        """Delete the single file or numbered parts of an earlier output of this name that were not rewritten"""
+        created = {Path(f).name for f in self.created_files}
+        own_name = re.compile(rf"{re.escape(self.base_name)}(_part_\d+)?{re.escape(self.suffix)}")
+        for path in sorted(self.output_dir.glob(f"{glob.escape(self.base_name)}*{self.suffix}")):
+            if path.name in created or not own_name.fullmatch(path.name):
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            if self.log:
+                self.log(f"Removed stale output part: {path}")
+
+    def _remove_created(self):
+        for output_file in self.created_files:
+            try:
+                os.remove(output_file)
+            except OSError:
+                pass
+        self.created_files = []
+
+
+class SplitCsvWriter(SplitWriter):
+    """Append processed batches to lead-time CSV files, starting a new part when one is full.
+
+    Rows are encoded once and their exact byte length is counted, so every
+    part (including its lead time row) stays within max_size_mb and max_rows.
+    The first file is named ``<base>.csv`` and renamed to ``<base>_part_1.csv``
+    as soon as a second part is needed. Parts are written from slices of the
+    encoded bytes, never from copies of the DataFrame. Float numeric_columns
+    are formatted as amounts while a block is encoded, so processed frames
+    can stay numeric until then.
+
+    With compression ("gzip" or "zstd") the lead time row and every block of
+    rows are compressed separately into ``<base>.csv.gz`` (``.csv.zst``)
+    parts and max_size_mb limits the compressed size. How many rows fit is
+    estimated from the compression ratio so far; a block that compresses
+    worse is compressed again with fewer rows, so the limit always holds.
+
+    With workers > 1, full blocks of rows are encoded concurrently in a
+    process pool while earlier blocks are written. Blocks are always written
+    in input order, so the parts are the same as with a single worker.
+
+    A ProgressTracker, if given, receives the rows and bytes written and can
+    cancel the write between blocks; abort() then removes the partial files.
+    StageMetrics, if given, record the encode, split (starting parts),
+    compress and write (file output) steps.
+    """
+
+    def __init__(self, output_dir, base_name, lead_time_value, log=None,
+                 max_rows=MAX_ROWS, max_size_mb=MAX_SIZE_MB, workers=1, numeric_columns=(), progress=None,
+                 metrics=None, compression=None):
+        super().__init__(output_dir, base_name, lead_time_value, log, max_rows, max_size_mb, progress, metrics)
+        self.workers = workers
+        self.numeric_columns = list(numeric_columns)
+        self.compression = compression
+        self.suffix = ".csv" + COMPRESSION_SUFFIXES.get(compression, "")
+        self._compress = compressor(compression) if compression else None
+        self._ratio = 1.0  # compressed / encoded bytes of the blocks written so far
+        self._executor = None
+        self._pending = deque()  # encoding blocks, oldest first
+        self._file = None
+        self._part_bytes = 0
+
+    def _close_part(self):
+        if self._file is None:
+            return False
+        self._file.close()
+        self._file = None
+        return True
+
+    def _open_part(self, num_columns):
+        output_file = self._next_part_path()
+        self._file = open(output_file, 'wb')
+        header = lead_time_row(self.lead_time_value, num_columns).encode('utf-8')
+        if self._compress:
+            header = self._compress(header)
+        self._file.write(header)
+        self._part_bytes = len(header)
+        if self.progress:
+            self.progress.update(bytes_written=len(header))
+
+    def write(self, df):
+        num_columns = len(df.columns)
+        if self._file is None:
+            with self.metrics.stage("split"):
+                self._open_part(num_columns)
+        for start in range(0, len(df), ENCODE_BATCH_ROWS):
+            if self.progress:
+                self.progress.check_cancelled()
+            block = df.iloc[start:start + ENCODE_BATCH_ROWS]
+            if self.workers > 1 and len(block) == ENCODE_BATCH_ROWS:
+                # Only full blocks are worth sending to a worker process
+                if self._executor is None:
+                    self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                future = self._executor.submit(encode_rows, block, self.numeric_columns)
+                self._pending.append((future, num_columns, len(block)))
+                # Keep every worker busy without holding the whole output in memory
+                while len(self._pending) > 2 * self.workers:
+                    self._write_next_pending()
+            else:
+                self._flush_pending()
+                with self.metrics.stage("encode", rows=len(block)):
+                    data, row_ends = encode_rows(block, self.numeric_columns)
+                self._write_encoded(memoryview(data), row_ends, num_columns)
+
+    def _write_next_pending(self):
+        future, num_columns, num_rows = self._pending.popleft()
+        # With workers, this is the time spent waiting for a worker's block
+        with self.metrics.stage("encode", rows=num_rows):
+            data, row_ends = future.result()
+        self._write_encoded(memoryview(data), row_ends, num_columns)
+
+    def _flush_pending(self):
+        while self._pending:
+            self._write_next_pending()
+
+    def _write_encoded(self, data, row_ends, num_columns):
+        if self._compress:
+            self._write_compressed(data, row_ends, num_columns)
+            return
+        row = 0
+        row_start = 0
+        while row < len(row_ends):
+            room_rows = self.max_rows - self._part_rows
+            room_bytes = self.max_bytes - self._part_bytes
+            # Rows that still fit: those ending within the remaining bytes
+            fitting = int(np.searchsorted(row_ends[row:row + room_rows], row_start + room_bytes, side='right'))
+            if fitting == 0:
+                if self._part_rows == 0:
+                    fitting = 1  # a single row larger than the limit still has to go somewhere
+                else:
+                    with self.metrics.stage("split"):
+                        self._open_part(num_columns)
+                    continue
+            row_end = int(row_ends[row + fitting - 1])
+            with self.metrics.stage("write", rows=fitting):
+                self._file.write(data[row_start:row_end])
+            self._part_rows += fitting
+            self._part_bytes += row_end - row_start
+            if self.progress:
+                self.progress.update(rows=fitting, bytes_written=row_end - row_start)
+            row += fitting
+            row_start = row_end
+
+    def _write_compressed(self, data, row_ends, num_columns):
+        row = 0
+        row_start = 0
+        while row < len(row_ends):
+            room_rows = self.max_rows - self._part_rows
+            room_bytes = self.max_bytes - self._part_bytes
+            # Rows expected to fit once compressed, judging by the ratio so far
+            fitting = int(np.searchsorted(row_ends[row:row + room_rows], row_start + room_bytes / self._ratio,
+                                          side='right'))
+            if fitting == 0 and self._part_rows == 0:
+                fitting = 1
+            payload = None
+            while fitting:
+                row_end = int(row_ends[row + fitting - 1])
+                with self.metrics.stage("compress", rows=fitting):
+                    payload = self._compress(data[row_start:row_end])
+                if len(payload) <= room_bytes:
+                    break
+                if self._part_rows == 0 and fitting == 1:
+                    break  # a single row larger than the limit still has to go somewhere
+                # Compressed worse than expected: retry with proportionally fewer rows
+                fitting = max(min(fitting - 1, int(fitting * room_bytes / len(payload) * 0.9)),
+                              1 if self._part_rows == 0 else 0)
+            if not fitting:
+                with self.metrics.stage("split"):
+                    self._open_part(num_columns)
+                continue
+            if row_end - row_start >= _RATIO_SAMPLE_BYTES:
+                self._ratio = max(len(payload) / (row_end - row_start), 1e-3)
+            with self.metrics.stage("write", rows=fitting):
+                self._file.write(payload)
+            self._part_rows += fitting
+            self._part_bytes += len(payload)
+            if self.progress:
+                self.progress.update(rows=fitting, bytes_written=len(payload))
+            row += fitting
+            row_start = row_end
+
+    def close(self):
+        """Finish the last part and return the paths of all files written"""
+        try:
+            if self._file is not None:
+                self._flush_pending()
+        finally:
+            if self._executor is not None:
+                self._executor.shutdown(cancel_futures=True)
+                self._executor = None
+            self._pending.clear()
+            if self._close_part():
+                self._log_created()
+        self._remove_stale()
+        return self.created_files
+
+    def abort(self):
+        """Stop writing and delete every file created so far"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        self._pending.clear()
+        self._close_part()
+        self._remove_created()
+
+
+class SplitParquetWriter(SplitWriter):
+    """Write processed batches to Parquet files, starting a new file every max_rows rows.
+
+    The lead time is stored in each file's key-value metadata under
+    PARQUET_LEAD_TIME_KEY instead of a first row. Brand Name and Article are
+    strings and the numeric_columns float64, with missing amounts as nulls.
+    Every write() adds row groups to the open file. A Parquet file's size is
+    only known once it is closed, so max_size_mb does not apply; parts are
+    split by rows only.
+    """
+
+    suffix = ".parquet"
+
+    def __init__(self, output_dir, base_name, lead_time_value, log=None, max_rows=MAX_ROWS,
+                 numeric_columns=(), progress=None, metrics=None):
+        super().__init__(output_dir, base_name, lead_time_value, log, max_rows, progress=progress, metrics=metrics)
+        check_output_format("parquet")
+        self.numeric_columns = set(numeric_columns)
+        self._writer = None
+        self._schema = None
+
+    def _close_part(self):
+        if self._writer is None:
+            return False
+        self._writer.close()
+        self._writer = None
+        return True
+
+    def _table(self, df):
+        import pyarrow as pa
+
+        if self._schema is None:
+            fields = [pa.field(str(col), pa.float64() if col in self.numeric_columns else pa.string())
+                      for col in df.columns]
+            self._schema = pa.schema(fields, metadata={PARQUET_LEAD_TIME_KEY: str(self.lead_time_value or "")})
+        arrays = []
+        for col, field in zip(df.columns, self._schema):
+            if field.type == pa.float64():
+                values = pd.to_numeric(df[col], errors='coerce').to_numpy(dtype='float64')
+            else:
+                values = df[col].astype(str).to_numpy(dtype=object)
+            arrays.append(pa.array(values, type=field.type, from_pandas=True))
+        return pa.Table.from_arrays(arrays, schema=self._schema)
+
+    def write(self, df):
+        import pyarrow.parquet as pq
+
+        start = 0
+        while start < len(df) or (self._writer is None and not self.created_files):
+            if self.progress:
+                self.progress.check_cancelled()
+            if self._writer is None or self._part_rows >= self.max_rows:
+                with self.metrics.stage("split"):
+                    output_file = self._next_part_path()
+                    table = self._table(df.iloc[:0])
+                    self._writer = pq.ParquetWriter(output_file, table.schema, compression=PARQUET_COMPRESSION)
+            count = min(self.max_rows - self._part_rows, ENCODE_BATCH_ROWS, len(df) - start)
+            if count <= 0:
+                break
+            with self.metrics.stage("encode", rows=count):
+                table = self._table(df.iloc[start:start + count])
+            with self.metrics.stage("write", rows=count):
+                self._writer.write_table(table)
+            self._part_rows += count
+            if self.progress:
+                self.progress.update(rows=count)
+            start += count
+
+    def close(self):
+        """Finish the last file and return the paths of all files written"""
+        if self._close_part():
+            self._log_created()
+        self._remove_stale()
+        return self.created_files
+
+    def abort(self):
+        """Stop writing and delete every file created so far"""
+        try:
+            self._close_part()
+        except Exception:
+            self._writer = None
+        self._remove_created()
@@ -0,0 +1,163 @@
+"""Pipelined streaming: read, convert and write batches concurrently.
+
+The batches of an input are read in a child process and the converted
+batches are written by a background thread, while the converting thread
+transforms the batch in between. Batches wait in bounded queues between
+the stages, so at most a few of them are held at once and a slow stage
+holds back the others instead of piling up rows. Once the stages overlap, a
+conversion takes about as long as its slowest stage rather than the sum of
+all three.
+"""
+import multiprocessing
+import queue
+import threading
+from functools import partial
+
+# Batches that may wait between two stages
+PIPELINE_DEPTH = 2
+
+# How often a stage waiting on a queue checks for cancellation, in seconds
+_POLL_SECONDS = 0.2
+
+
+def _read_into_queue(read_batches, batch_queue):
+    """Child process: put every batch of read_batches() on batch_queue, then a closing message"""
+    try:
+        for batch in read_batches():
+            batch_queue.put(("batch", batch))
+    except BaseException as e:
+        batch_queue.put(("error", e))
+        return
+    batch_queue.put(("done", None))
+
+
+class BatchReader:
+    """Iterate over the batches of read_batches() while a child process reads ahead.
+
+    read_batches must be picklable (e.g. a functools.partial of a module
+    level function). Batches travel to this process pickled, through a queue
+    holding at most depth of them. Iteration checks progress (if given) for
+    cancellation while it waits; close() stops the reader early.
+    """
+
+    def __init__(self, read_batches, depth=PIPELINE_DEPTH, progress=None):
+        self.progress = progress
+        context = multiprocessing.get_context()
+        self._queue = context.Queue(maxsize=depth)
+        self._process = context.Process(target=_read_into_queue, args=(read_batches, self._queue), daemon=True)
+        self._process.start()
+
+    def __iter__(self):
+        while True:
+            kind, value = self._get()
+            if kind == "done":
+                return
+            if kind == "error":
+                raise value
+            yield value
+
+    def _get(self):
+        while True:
+            if self.progress:
+                self.progress.check_cancelled()
+            try:
+                return self._queue.get(timeout=_POLL_SECONDS)
+            except queue.Empty:
+                if not self._process.is_alive() and self._queue.empty():
+                    raise RuntimeError(f"Reader process stopped unexpectedly (exit code {self._process.exitcode})")
+
+    def close(self):
+        if self._process.is_alive():
+            self._process.terminate()
+        self._process.join()
+        self._queue.close()
+        self._queue.cancel_join_thread()
+
+
+def _call_once(func):
+    yield func()
+
+
+def call_in_child(func, progress=None):
+    """Return func() computed in a child process, which is stopped as soon as progress is cancelled.
+
+    func must be picklable, like read_batches of BatchReader; so must its result.
+    """
+    reader = BatchReader(partial(_call_once, func), depth=1, progress=progress)
+    try:
+        return next(iter(reader))
+    finally:
+        reader.close()
+
+
+class BackgroundWriter:
+    """Hand batches to a writer (split, delta) that writes them on a background thread.
+
+    write() returns as soon as the batch is queued; it only blocks while
+    depth batches are already waiting. An error raised by the writer
+    (including a cancellation) is raised again by the next write() or by
+    close(). Each batch is measured as the "output" stage on the writer
+    thread, so the metrics report keeps its usual shape.
+    """
+
+    def __init__(self, writer, metrics, depth=PIPELINE_DEPTH, progress=None):
+        self.writer = writer
+        self.metrics = metrics
+        self.progress = progress
+        self._queue = queue.Queue(maxsize=depth)
+        self._error = None
+        self._stopping = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="pricelist-writer", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            df = self._queue.get()
+            if df is None or self._stopping.is_set():
+                return
+            try:
+                with self.metrics.stage("output", rows=len(df)):
+                    self.writer.write(df)
+            except BaseException as e:
+                self._error = e
+                return
+
+    def _check(self):
+        if self._error is not None:
+            raise self._error
+        if self.progress:
+            self.progress.check_cancelled()
+
+    def _put(self, item):
+        while True:
+            self._check()
+            try:
+                self._queue.put(item, timeout=_POLL_SECONDS)
+                return
+            except queue.Full:
+                continue
+
+    def write(self, df):
+        self._put(df)
+
+    def close(self):
+        """Wait for the queued batches to be written, then close the writer and return its files"""
+        self._put(None)
+        self._thread.join()
+        self._check()
+        return self.writer.close()
+
+    def abort(self):
+        """Drop the queued batches, stop the thread and abort the writer"""
+        self._stopping.set()
+        while True:
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                break
+        try:
+            self._queue.put_nowait(None)
+        except queue.Full:
+            pass
+        self._thread.join()
+        self.writer.abort()
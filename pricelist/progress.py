@@ -0,0 +1,104 @@
+"""Progress reporting and cooperative cancellation for long-running conversions."""
+import threading
+import time
+from dataclasses import dataclass
+
+
+class ConversionCancelled(Exception):
+    """Raised inside a conversion when its cancel event has been set"""
+
+
+@dataclass
+class Progress:
+    """A snapshot of how far a conversion has got"""
+    stage: str
+    rows: int = 0
+    total_rows: int = None  # None while unknown
+    bytes_written: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def fraction(self):
+        """Share of rows done (0-1), or None when the total is unknown"""
+        if not self.total_rows:
+            return None
+        return min(self.rows / self.total_rows, 1.0)
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def eta_seconds(self):
+        """Estimated seconds left, or None when it cannot be estimated yet"""
+        if not self.total_rows or not self.rows or self.elapsed <= 0:
+            return None
+        return max(self.total_rows - self.rows, 0) / self.rows_per_second
+
+    def describe(self):
+        """One-line summary for a status bar"""
+        parts = [self.stage]
+        if self.total_rows:
+            parts.append(f"{self.rows:,} / {self.total_rows:,} rows ({self.fraction:.0%})")
+        elif self.rows:
+            parts.append(f"{self.rows:,} rows")
+        if self.bytes_written:
+            parts.append(f"{self.bytes_written / (1024 * 1024):.1f} MB written")
+        if self.rows and self.elapsed > 0:
+            parts.append(f"{self.rows_per_second:,.0f} rows/s")
+        eta = self.eta_seconds
+        if eta is not None:
+            parts.append(f"ETA {int(eta) // 60}:{int(eta) % 60:02d}")
+        return " · ".join(parts)
+
+
+class ProgressTracker:
+    """Collects progress from a conversion and passes throttled snapshots to a report callback.
+
+    The callback runs on the converting thread, so it should only hand the
+    snapshot over (e.g. put it on a queue). check_cancelled() raises
+    ConversionCancelled once cancel_event is set; the engine calls it between
+    batches and blocks, so a conversion stops well within a second, except
+    during a whole-file read unless that read runs in a child process
+    (ConversionSettings.interruptible_read).
+    """
+
+    def __init__(self, report=None, cancel_event=None, interval=0.2):
+        self.report = report
+        self.cancel_event = cancel_event or threading.Event()
+        self.interval = interval
+        self.started = time.perf_counter()
+        self._last_report = 0.0
+        self.progress = Progress(stage="Starting")
+
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    def check_cancelled(self):
+        if self.cancel_event.is_set():
+            raise ConversionCancelled("Conversion cancelled")
+
+    def stage(self, stage, total_rows=None, rows=0):
+        """Start a new stage; rows (and the rate) are counted from zero again"""
+        self.progress = Progress(stage=stage, rows=rows, total_rows=total_rows,
+                                 bytes_written=self.progress.bytes_written)
+        self.started = time.perf_counter()
+        self._publish(force=True)
+
+    def update(self, rows=0, bytes_written=0, total_rows=None):
+        """Add rows and bytes written to the current stage and report if due"""
+        self.progress.rows += rows
+        self.progress.bytes_written += bytes_written
+        if total_rows is not None:
+            self.progress.total_rows = total_rows
+        self._publish()
+        self.check_cancelled()
+
+    def _publish(self, force=False):
+        now = time.perf_counter()
+        if self.report is None or (not force and now - self._last_report < self.interval):
+            return
+        self._last_report = now
+        self.progress.elapsed = now - self.started
+        snapshot = Progress(**vars(self.progress))
+        self.report(snapshot)
@@ -0,0 +1,282 @@
+"""Bounded-memory readers for large XLSX and CSV input files."""
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+from pandas.io.parsers import TextParser
+
+# Worksheet rows read between cancellation checks; XLSX rows are slow to read,
+# so a whole batch can take several seconds
+CANCEL_CHECK_ROWS = 2000
+
+
+def _convert_cell(cell):
+    """Convert an openpyxl cell exactly like pandas' openpyxl reader does"""
+    from openpyxl.cell.cell import TYPE_ERROR, TYPE_NUMERIC
+
+    if cell.value is None:
+        return ""  # compat with xlrd
+    elif cell.data_type == TYPE_ERROR:
+        return np.nan
+    elif cell.data_type == TYPE_NUMERIC:
+        val = int(cell.value)
+        if val == cell.value:
+            return val
+        return float(cell.value)
+    return cell.value
+
+
+def iter_sheet_rows(input_path, sheet_name=0):
+    """Yield the converted rows of a worksheet one at a time (trailing empty cells trimmed)"""
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(input_path, read_only=True, data_only=True, keep_links=False)
+    try:
+        if isinstance(sheet_name, int):
+            sheet = workbook.worksheets[sheet_name]
+        else:
+            sheet = workbook[sheet_name]
+        sheet.reset_dimensions()
+        for row in sheet.rows:
+            converted_row = [_convert_cell(cell) for cell in row]
+            while converted_row and converted_row[-1] == "":
+                converted_row.pop()
+            yield converted_row
+    finally:
+        workbook.close()
+
+
+def parse_rows(rows, names, dtype=None):
+    """Turn raw cell rows into a DataFrame using the same parser as pd.read_excel"""
+    parser = TextParser(rows, header=None, names=names, dtype=dtype, skip_blank_lines=False)
+    return parser.read()
+
+
+def _merge_dtypes(current, new):
+    """Combine per-batch dtypes into the dtype pandas would infer for the whole column"""
+    if current is None or current == new:
+        return new
+    if {current.kind, new.kind} <= {'i', 'f'}:
+        return np.dtype('float64')
+    return np.dtype(object)
+
+
+@dataclass
+class SheetScan:
+    """Shape and column dtypes of a worksheet, gathered without holding its rows"""
+    columns: list
+    num_rows: int
+    dtypes: dict = field(default_factory=dict)
+
+    def column_dtype(self, index):
+        """Dtype that forces a batch column to parse like the whole-sheet column"""
+        dtype = self.dtypes.get(index)
+        if dtype is None or dtype.kind in 'iufO':
+            return dtype
+        # Other inferred dtypes are reproduced by letting the parser infer them again
+        return None
+
+
+def _column_values(batch, indices):
+    return [[row[i] if i < len(row) else "" for i in indices] for row in batch]
+
+
+def scan_sheet(input_path, sheet_name=0, column_indices=None, batch_size=50000, progress=None):
+    """First streaming pass: count data rows, measure width and infer column dtypes.
+
+    pd.read_excel infers one dtype per column from all of its values, so the
+    streaming conversion needs the same whole-column dtypes before it can parse
+    individual batches identically. Only ``column_indices`` are inferred (all
+    columns when None). A ProgressTracker, if given, is updated after every
+    batch and may cancel the scan every CANCEL_CHECK_ROWS rows.
+    """
+    rows = iter_sheet_rows(input_path, sheet_name)
+    header = next(rows, [])
+    width = len(header)
+    num_rows = 0
+    pending_empty_rows = 0
+    dtypes = {}
+    inferred_batches = 0
+    indices = None if column_indices is None else sorted(i for i in set(column_indices) if i >= 0)
+    batch = []
+
+    def infer(batch):
+        nonlocal inferred_batches
+        batch_indices = range(width) if indices is None else indices
+        if not batch_indices:
+            return
+        frame = parse_rows(_column_values(batch, batch_indices), names=list(range(len(batch_indices))))
+        for position, index in enumerate(batch_indices):
+            current = dtypes.get(index)
+            if current is None and inferred_batches:
+                # Column is wider than the earlier batches, which only had missing values there
+                current = np.dtype('float64')
+            dtypes[index] = _merge_dtypes(current, frame.dtypes.iloc[position])
+        inferred_batches += 1
+
+    for row in rows:
+        if progress and (num_rows + pending_empty_rows) % CANCEL_CHECK_ROWS == 0:
+            progress.check_cancelled()
+        if not row:
+            # Empty rows only count if more data follows (pandas trims trailing empty rows)
+            pending_empty_rows += 1
+            continue
+        batch.extend([[]] * pending_empty_rows)
+        num_rows += pending_empty_rows + 1
+        pending_empty_rows = 0
+        width = max(width, len(row))
+        batch.append(row)
+        if len(batch) >= batch_size:
+            infer(batch)
+            if progress:
+                progress.update(rows=len(batch))
+            batch = []
+    if batch:
+        infer(batch)
+
+    return SheetScan(columns=_header_names(header, width), num_rows=num_rows, dtypes=dtypes)
+
+
+def _header_names(header, width):
+    """Column names pandas assigns to a header row padded to the sheet width"""
+    if width == 0:
+        return []
+    header = header + [""] * (width - len(header))
+    parser = TextParser([header], header=0, skip_blank_lines=False)
+    return list(parser.read().columns)
+
+
+def iter_sheet_batches(input_path, scan, column_indices, sheet_name=0, batch_size=50000, progress=None):
+    """Second streaming pass: yield DataFrames holding ``column_indices`` for each batch of rows.
+
+    A ProgressTracker, if given, may cancel the pass every CANCEL_CHECK_ROWS rows.
+    """
+    column_indices = list(column_indices)
+    names = [scan.columns[i] for i in column_indices]
+    dtype = {}
+    for name, index in zip(names, column_indices):
+        column_dtype = scan.column_dtype(index)
+        if column_dtype is not None:
+            dtype[name] = column_dtype
+
+    rows = iter_sheet_rows(input_path, sheet_name)
+    next(rows, None)  # header
+    remaining = scan.num_rows
+    batch = []
+    for row in rows:
+        if remaining == 0:
+            break
+        remaining -= 1
+        if progress and remaining % CANCEL_CHECK_ROWS == 0:
+            progress.check_cancelled()
+        batch.append(row)
+        if len(batch) >= batch_size:
+            yield parse_rows(_column_values(batch, column_indices), names=names, dtype=dtype or None)
+            batch = []
+    if batch:
+        yield parse_rows(_column_values(batch, column_indices), names=names, dtype=dtype or None)
+    rows.close()
+
+
+def list_sheet_names(input_path):
+    """Return the worksheet names of a workbook without reading any cells"""
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(input_path, read_only=True, data_only=True, keep_links=False)
+    try:
+        return list(workbook.sheetnames)
+    finally:
+        workbook.close()
+
+
+def count_sheet_rows(input_path, sheet_name=0):
+    """Return (data_rows, exact) for a worksheet without converting any cells.
+
+    The dimension recorded in the sheet is used when present; it can include
+    trailing empty rows that pd.read_excel drops, so that count is not exact.
+    """
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(input_path, read_only=True, data_only=True, keep_links=False)
+    try:
+        if isinstance(sheet_name, int):
+            sheet = workbook.worksheets[sheet_name]
+        else:
+            sheet = workbook[sheet_name]
+        if sheet.max_row is not None:
+            return max(sheet.max_row - 1, 0), False
+
+        # No dimension recorded: walk the rows, skipping trailing empty ones like pandas
+        num_rows = 0
+        last_data_row = 0
+        for row in sheet.iter_rows(values_only=True):
+            num_rows += 1
+            if any(value is not None for value in row):
+                last_data_row = num_rows
+        return max(last_data_row - 1, 0), True
+    finally:
+        workbook.close()
+
+
+def count_csv_rows(input_path, block_size=1024 * 1024):
+    """Return (data_rows, exact) for a CSV file by counting line breaks in binary blocks"""
+    num_lines = 0
+    last_byte = b"\n"
+    with open(input_path, 'rb') as f:
+        while True:
+            block = f.read(block_size)
+            if not block:
+                break
+            num_lines += block.count(b"\n")
+            last_byte = block[-1:]
+    if last_byte != b"\n":
+        num_lines += 1  # last line without a trailing newline
+    # Blank lines and quoted line breaks are counted too, so this is an upper bound
+    return max(num_lines - 1, 0), False
+
+
+def read_csv_header(input_path):
+    """Return the column names of a CSV file without reading its rows"""
+    return pd.read_csv(input_path, nrows=0).columns
+
+
+def csv_batch_dtype(dtype):
+    """Dtype that forces a CSV chunk column to parse like the whole-file column (None: let it infer)"""
+    if dtype is None:
+        return None
+    if dtype.kind == 'O':
+        return str
+    if dtype.kind in 'iuf':
+        return dtype
+    return None
+
+
+def scan_csv_dtypes(input_path, column_indices, chunksize=50000, progress=None):
+    """First streaming pass over a CSV file: the dtypes pandas infers for whole columns.
+
+    pd.read_csv infers one dtype per column from all of its values, but a
+    single chunk may infer another (e.g. int64 for a chunk of a text column
+    holding only digits, so '0456' would become 456). Only ``column_indices``
+    are read. A ProgressTracker, if given, may cancel the scan after every
+    chunk.
+    """
+    column_indices = sorted(set(column_indices))
+    dtypes = {}
+    if not column_indices:
+        return dtypes
+    with pd.read_csv(input_path, usecols=column_indices, chunksize=chunksize) as reader:
+        for chunk in reader:
+            if progress:
+                progress.check_cancelled()
+            for position, index in enumerate(column_indices):
+                dtypes[index] = _merge_dtypes(dtypes.get(index), chunk.dtypes.iloc[position])
+            if all(dtype.kind == 'O' for dtype in dtypes.values()):
+                break  # text stays text whatever follows, the usual case for brands and articles
+    return dtypes
+
+
+def iter_csv_batches(input_path, column_indices, dtype=None, chunksize=50000):
+    """Yield DataFrames holding ``column_indices`` for consecutive chunks of a CSV file"""
+    with pd.read_csv(input_path, usecols=list(column_indices), dtype=dtype or None,
+                     chunksize=chunksize) as reader:
+        yield from reader
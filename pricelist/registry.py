@@ -0,0 +1,140 @@
+"""Indexed registry of supplier configs, for instant search over thousands of files."""
+import json
+import os
+import time
+from bisect import bisect_left
+from pathlib import Path
+
+DEFAULT_CONFIG_DIR = "configs"
+
+# Names are indexed by every substring up to this length
+NGRAM_SIZE = 3
+
+
+def _ngrams(text, size):
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+
+class ConfigRegistry:
+    """Names of the supplier configs in a directory, indexed for substring and prefix search.
+
+    Every lowercase substring of up to NGRAM_SIZE characters maps to the
+    names containing it, so a search looks up (or intersects) a few small
+    sets instead of scanning every name. refresh() rescans the directory only
+    when its modification time changed and re-indexes only the names added or
+    removed. Metadata is read when first asked for and kept until the file's
+    modification time changes.
+    """
+
+    def __init__(self, config_dir=DEFAULT_CONFIG_DIR, log=None):
+        self.config_dir = Path(config_dir)
+        self.log = log
+        self.names = []  # sorted
+        self._lower_names = []  # (lowercase name, name), sorted
+        self._index = {}  # n-gram -> set of names
+        self._dir_mtime_ns = None
+        self._metadata = {}  # name -> (mtime_ns, metadata)
+
+    def log_message(self, message):
+        if self.log:
+            self.log(message)
+
+    def __contains__(self, name):
+        lower_name = name.lower()
+        position = bisect_left(self._lower_names, (lower_name, name))
+        return position < len(self._lower_names) and self._lower_names[position] == (lower_name, name)
+
+    def refresh(self, force=False):
+        """Pick up configs added or removed since the last refresh; return True if the names changed"""
+        try:
+            dir_mtime_ns = self.config_dir.stat().st_mtime_ns
+        except OSError:
+            dir_mtime_ns = None
+        if not force and dir_mtime_ns == self._dir_mtime_ns and self._dir_mtime_ns is not None:
+            return False
+        self._dir_mtime_ns = dir_mtime_ns
+
+        names = set()
+        if dir_mtime_ns is not None:
+            try:
+                with os.scandir(self.config_dir) as entries:
+                    names = {entry.name[:-len(".json")] for entry in entries
+                             if entry.name.endswith(".json") and entry.is_file()}
+            except OSError as e:
+                self.log_message(f"Error reading config directory: {str(e)}")
+        current = set(self.names)
+        if names == current:
+            return False
+
+        for name in current - names:
+            self._unindex(name)
+            self._metadata.pop(name, None)
+        for name in names - current:
+            self._add_to_index(name)
+        self.names = sorted(names)
+        self._lower_names = sorted((name.lower(), name) for name in names)
+        return True
+
+    def _grams(self, name):
+        lower_name = name.lower()
+        grams = set()
+        for size in range(1, NGRAM_SIZE + 1):
+            grams |= _ngrams(lower_name, size)
+        return grams
+
+    def _add_to_index(self, name):
+        for gram in self._grams(name):
+            self._index.setdefault(gram, set()).add(name)
+
+    def _unindex(self, name):
+        for gram in self._grams(name):
+            names = self._index.get(gram)
+            if names is not None:
+                names.discard(name)
+                if not names:
+                    del self._index[gram]
+
+    def search(self, term):
+        """Return the names containing term (case-insensitive), sorted"""
+        term = term.lower()
+        if not term:
+            return list(self.names)
+        if len(term) <= NGRAM_SIZE:
+            return sorted(self._index.get(term, ()))
+        # Names holding every n-gram of the term, smallest set first, then confirmed
+        candidate_sets = sorted((self._index.get(gram, set()) for gram in _ngrams(term, NGRAM_SIZE)), key=len)
+        candidates = set.intersection(*candidate_sets)
+        return sorted(name for name in candidates if term in name.lower())
+
+    def prefix(self, term):
+        """Return the names starting with term (case-insensitive), sorted"""
+        term = term.lower()
+        matches = []
+        for lower_name, name in self._lower_names[bisect_left(self._lower_names, (term, "")):]:
+            if not lower_name.startswith(term):
+                break
+            matches.append(name)
+        return sorted(matches)
+
+    def path(self, name):
+        return self.config_dir / f"{name}.json"
+
+    def metadata(self, name):
+        """Return the creation date and path of a config, or None if it cannot be read"""
+        config_file = self.path(name)
+        try:
+            stat = config_file.stat()
+            cached = self._metadata.get(name)
+            if cached is not None and cached[0] == stat.st_mtime_ns:
+                return cached[1]
+            with open(config_file, 'r', encoding='utf-8') as f:
+                json.load(f)
+        except Exception as e:
+            self.log_message(f"Error loading metadata for {name}: {str(e)}")
+            return None
+        metadata = {
+            'creation_date': time.strftime("%Y-%m-%d %H:%M", time.localtime(stat.st_ctime)),
+            'file_path': config_file
+        }
+        self._metadata[name] = (stat.st_mtime_ns, metadata)
+        return metadata
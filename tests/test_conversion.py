@@ -0,0 +1,78 @@
+"""Whole conversions, from an input file on disk to the written output."""
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from pricelist.conversion import ConversionEngine, ConversionSettings  # noqa: E402
+from pricelist.detection import detect_columns  # noqa: E402
+
+
+def write_input(df, path):
+    if path.suffix == '.xlsx':
+        df.to_excel(path, index=False)
+    else:
+        df.to_csv(path, index=False)
+    return path
+
+
+def convert(tmp_path, input_path, detected_columns=None, **settings):
+    output_dir = tmp_path / "output"
+    output_dir.mkdir(exist_ok=True)
+    settings = ConversionSettings(input_file=str(input_path), output_directory=str(output_dir), lead_time="7",
+                                  **settings)
+    files = ConversionEngine(settings).convert_file(detected_columns=detected_columns)
+    return b"".join(Path(f).read_bytes() for f in files)
+
+
+@pytest.mark.parametrize("suffix", [".csv", ".xlsx"])
+@pytest.mark.parametrize("streaming", [False, True])
+def test_bypass_template_converts_auto_detected_columns(tmp_path, suffix, streaming):
+    df = pd.DataFrame({"Notes": ["x", "y", "z"], "Brand": ["Bosch", "Mann", "Febi"],
+                       "Article": ["0 986-452", "W 712", "01089"], "Qty": [5, 3, 12], "Price": [10.5, 7.0, 0.25]})
+    input_path = write_input(df, tmp_path / f"prices{suffix}")
+    detected = detect_columns(df)
+    assert detected["Brand Name"] == "Brand" and detected["Price"] == "Price"
+
+    output = convert(tmp_path, input_path, detected, bypass_template=True, streaming=streaming)
+    assert output.decode('utf-8').splitlines() == [
+        "7;;;;;",
+        "Bosch;0 986-452;5;;;10.50",
+        "Mann;W 712;3;;;7",
+        "Febi;01089;12;;;0.25",
+    ]
+
+
+def mixed_type_prices(rows=23):
+    """A price list whose columns change type after the first few rows (the first streamed batches)"""
+    brands = ["Bosch", " bosch ", "MANN  FILTER", "Febi", ""]
+    return pd.DataFrame({
+        "Brand": [brands[i % len(brands)] for i in range(rows)],
+        "Name": [f"Part {i}" for i in range(rows)],
+        # Whole numbers first, then text articles and one with a leading zero
+        "Article": [1089 + i if i < 7 else (f"A-{i}.{i % 3}" if i != 11 else "01089") for i in range(rows)],
+        # Integers, then decimals and text
+        "Price": [10 + i if i < 8 else (round(0.375 * i, 3) if i != 15 else "n/a") for i in range(rows)],
+        "MSRP": [20 + i if i < 12 else 20.005 + i for i in range(rows)],
+        "Quantity": [i % 4 if i < 9 else ("12+" if i == 9 else i * 1.5) for i in range(rows)],
+        "Notes": ["" for _ in range(rows)],
+        # Empty throughout the first batches
+        "MOQ": [None] * 6 + [(i % 3) + 1 for i in range(6, rows)],
+    })
+
+
+@pytest.mark.parametrize("suffix", [".csv", ".xlsx"])
+def test_streaming_output_matches_in_memory(tmp_path, suffix):
+    input_path = write_input(mixed_type_prices(), tmp_path / f"prices{suffix}")
+    config = tmp_path / "supplier.json"
+    config.write_text('{"Brand Name": "A", "Article": "C", "Price": "D", "MSRP": "E", "Quantity": "F", "MOQ": "H"}')
+    settings = dict(supplier_config=str(config), currency_rate="3,67", markup_percentage="15")
+
+    expected = convert(tmp_path, input_path, **settings)
+    assert expected.count(b"\n") == 24
+    for batch_size in (1, 5, 7, 50):
+        assert convert(tmp_path, input_path, streaming=True, batch_size=batch_size, **settings) == expected
+    assert convert(tmp_path, input_path, pipeline=True, batch_size=5, **settings) == expected
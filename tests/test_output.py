@@ -0,0 +1,79 @@
+"""Splitting outputs into parts within the row and size limits."""
+import gzip
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from pricelist.output import open_split_writer  # noqa: E402
+
+NUMERIC_COLUMNS = ["Quantity", "Price"]
+
+
+def price_rows(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "Brand Name": rng.choice(["Bosch", "Mann Filter", "Febi", "Лада"], rows),
+        "Article": [f"{value:x}-{i}" for i, value in enumerate(rng.integers(0, 2 ** 40, rows))],
+        "Quantity": rng.integers(0, 500, rows),
+        "Price": np.round(rng.lognormal(3, 2, rows), 2),
+    })
+
+
+def write_output(directory, output_format, frames, max_rows, max_size_mb):
+    writer = open_split_writer(output_format, directory, "prices_output", "7", max_rows=max_rows,
+                               max_size_mb=max_size_mb, numeric_columns=NUMERIC_COLUMNS)
+    for df in frames:
+        writer.write(df)
+    return writer.close()
+
+
+def part_text(path):
+    data = Path(path).read_bytes()
+    return (gzip.decompress(data) if str(path).endswith(".gz") else data).decode('utf-8')
+
+
+@pytest.mark.parametrize("output_format, max_size_mb", [("csv", 0.02), ("csv.gz", 0.006)])
+def test_parts_stay_within_limits_and_join_back(tmp_path, output_format, max_size_mb):
+    df = price_rows(6000)
+    frames = [df.iloc[:2500], df.iloc[2500:2501], df.iloc[2501:]]
+    (tmp_path / "whole").mkdir()
+    whole = write_output(tmp_path / "whole", output_format, frames, max_rows=10 ** 6, max_size_mb=100)
+    assert len(whole) == 1
+
+    max_rows = 700
+    parts = write_output(tmp_path, output_format, frames, max_rows, max_size_mb)
+    assert len(parts) > 6000 // max_rows
+    assert [Path(part).name for part in parts] == [
+        f"prices_output_part_{i}.{output_format}" for i in range(1, len(parts) + 1)]
+
+    data_lines = []
+    part_rows = []
+    for part in parts:
+        assert Path(part).stat().st_size <= max_size_mb * 1024 * 1024
+        lead_time, *lines = part_text(part).splitlines(keepends=True)
+        assert lead_time == "7;;;\n"
+        assert 0 < len(lines) <= max_rows
+        data_lines.extend(lines)
+        part_rows.append(len(lines))
+    # The size limit ended every part before max_rows
+    assert max(part_rows[:-1]) < max_rows
+    assert "".join(data_lines) == part_text(whole[0]).split("\n", 1)[1]
+
+
+@pytest.mark.parametrize("output_format", ["csv", "csv.gz"])
+def test_stale_parts_of_an_earlier_output_are_removed(tmp_path, output_format):
+    df = price_rows(3000, seed=1)
+    earlier = write_output(tmp_path, output_format, [df], max_rows=400, max_size_mb=100)
+    assert [part_text(part).count("\n") - 1 for part in earlier] == [400] * 7 + [200]
+
+    fewer = write_output(tmp_path, output_format, [df], max_rows=1000, max_size_mb=100)
+    assert sorted(tmp_path.iterdir()) == sorted(map(Path, fewer)) and len(fewer) == 3
+
+    single = write_output(tmp_path, output_format, [df], max_rows=10 ** 6, max_size_mb=100)
+    assert list(tmp_path.iterdir()) == [Path(single[0])]
+    assert Path(single[0]).name == f"prices_output.{output_format}"
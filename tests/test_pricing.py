@@ -0,0 +1,102 @@
+"""Prices must come out exactly as the original text-based pipeline wrote them.
+
+The original converter rounded every numeric column to 2 decimals, formatted
+it with f"{x:.2f}" and removed '.00', then parsed that text back for the
+currency step and again for the markup step, rounding and formatting after
+each. baseline_prices() below is that pipeline; the current one keeps the
+amounts as floats and formats them once when writing.
+"""
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from pricelist.conversion import apply_pricing, clean_output  # noqa: E402
+from pricelist.output import format_amounts  # noqa: E402
+
+RAW_PRICES = [
+    "10", "10.5", "0.125", "1.005", "2.675", "-3.335", "-0", "-0.001", "0.004", "999999.995",
+    "", None, "n/a", "nan", np.nan, np.inf, -np.inf, 12345678.9, 1e13 + 0.5, 1e15, -0.0, 0, 7.0,
+]
+
+
+def baseline_format(values):
+    """The original formatting step: round, f"{x:.2f}", drop '.00'"""
+    values = pd.to_numeric(values, errors='coerce').round(2)
+    text = values.apply(lambda x: f"{x:.2f}" if pd.notna(x) and x != '' else '')
+    return text.str.replace('.00', '', regex=False)
+
+
+def baseline_prices(raw, rate=None, markup=None):
+    """The original pipeline: format, then currency and markup each on the formatted text"""
+    text = baseline_format(pd.Series(raw, dtype=object))
+    if rate:
+        text = baseline_format(pd.to_numeric(text, errors='coerce') * rate)
+    if markup:
+        text = baseline_format(pd.to_numeric(text, errors='coerce') * (1 + markup / 100))
+    return list(text)
+
+
+def current_prices(raw, rate=None, markup=None):
+    df = pd.DataFrame({"MSRP": pd.Series(raw, dtype=object), "Price": pd.Series(raw, dtype=object)})
+    df = clean_output(df)
+    df = apply_pricing(df, rate=rate, markup=markup)
+    assert list(format_amounts(df["MSRP"])) == list(format_amounts(df["Price"]))
+    return list(format_amounts(df["Price"]))
+
+
+def test_format_amounts_matches_baseline():
+    values = pd.to_numeric(pd.Series(RAW_PRICES, dtype=object), errors='coerce').round(2)
+    assert list(format_amounts(values)) == list(baseline_format(values))
+
+
+def test_format_amounts_special_values():
+    assert list(format_amounts([np.nan, np.inf, -np.inf, -0.0, 0.0, 100.0, 100.1, 0.05])) == [
+        "", "inf", "-inf", "-0", "0", "100", "100.10", "0.05"]
+
+
+def test_format_amounts_random_amounts():
+    rng = np.random.default_rng(4)
+    values = np.round(np.concatenate([rng.normal(0, 1000, 20000), rng.uniform(-1, 1, 5000)]), 2)
+    assert list(format_amounts(values)) == list(baseline_format(pd.Series(values)))
+
+
+@pytest.mark.parametrize("rate, markup", [
+    (None, None), (3.67, None), (None, 15.0), (3.67, 15.0), (1.0543, 15.5), (0.3, 33.333), (117.0, 0.5),
+])
+def test_pricing_matches_baseline(rate, markup):
+    assert current_prices(RAW_PRICES, rate, markup) == baseline_prices(RAW_PRICES, rate, markup)
+
+
+def test_pricing_rounds_between_steps():
+    # Markup applies to the converted price as rounded (and written) by the currency step
+    raw = ["1.125", "0.445", "2.675", "10.005"]
+    for rate, markup in [(1.0, 10.0), (0.5, 10.0), (1.1, 1.0)]:
+        assert current_prices(raw, rate, markup) == baseline_prices(raw, rate, markup)
+    # 0.05 * 3 → 0.15, * 1.1 → 0.16; rounding only once would give 0.17
+    assert current_prices(["0.05"], 3.0, 10.0) == baseline_prices(["0.05"], 3.0, 10.0) == ["0.16"]
+    assert list(format_amounts(np.round(np.array([0.05]) * 3 * 1.1, 2))) == ["0.17"]
+
+
+def test_pricing_random_amounts():
+    rng = np.random.default_rng(7)
+    raw = [round(value, int(decimals))
+           for value, decimals in zip(rng.lognormal(3, 2, 20000), rng.integers(0, 4, 20000))]
+    assert current_prices(raw, 3.67, 15.0) == baseline_prices(raw, 3.67, 15.0)
+
+
+def test_empty_cells_stay_empty():
+    assert current_prices(["", None, np.nan, "abc"], 3.67, 15.0) == ["", "", "", ""]
+    assert current_prices([], 3.67, 15.0) == []
+
+
+def test_per_row_rates_match_baseline_per_rate():
+    raw = ["10", "2.675", "", "-0.001", "1.005", "99.99"]
+    rates = [3.67, 0.51, 2.0, 4.1, 3.67, 0.51]
+    # Each row as the baseline converted it in a file of that rate's currency
+    expected = [baseline_prices(raw, rate, 15.0)[i] for i, rate in enumerate(rates)]
+    assert current_prices(raw, np.array(rates), 15.0) == expected